@@ -0,0 +1,634 @@
+"""This module implements AutoProver, an automated proof search engine over
+the inference rules of a Logic.
+
+The search combines two strategies.
+
+   Forward saturation:  Within each scope (the top level of the proof or a
+   subproof) every new fact is combined with the facts already known, using
+   the rules whose premises are all wffs.  Conclusions are kept only if they
+   belong to the problem's universe:  the sub-wffs of the premises, goal and
+   hypotheses, and their negations.  Equivalences rewrite facts provided the
+   result does not grow by more than one symbol.  New facts are processed
+   smallest first and a fact already known in the scope (or any enclosing
+   scope) is never derived again.
+
+   Backward chaining:  A goal which saturation does not reach is reduced to
+   subgoals by the rules whose conclusion forms it instantiates, by the
+   subproof rules (Gensler's RAA, Fitch's ->I and -I), and by rewriting it
+   with an equivalence.  Backward chaining is iteratively deepened.
+
+Before searching, a truth-functionally invalid sequent is rejected outright
+(see Semantics).  A successful search is written out as a Proof in the same form the GUI
+builds interactively.
+"""
+
+import heapq
+import itertools
+import time
+
+from Form import WFF, StructuredWFF, Sequent
+from DiscriminationTree import DiscriminationTree
+from PatternCompiler import compileMatcher, compileInstantiator
+from Substitution import Substitution
+from Proof import Proof
+from Semantics import Semantics, NotTruthFunctionalError
+
+
+class ProofSearchFailure( Exception ):
+   """No proof was found within the search budgets."""
+
+
+class _Context( object ):
+   """The facts known within one scope of the search:  the top level of the
+   proof or one subproof.  Each fact maps to its justification:
+
+      ( 'premise', )
+      ( 'hypothesis', )
+      ( 'rule',     rule, premiseWFFList, mapping, conclusionIndex )
+      ( 'equiv',    rule, sourceWFF, mapping )
+      ( 'subproof', rule, subContext, subConclusionWFF, mapping, conclusionIndex )
+   """
+   __slots__ = ( 'parent', 'hypothesis', 'facts', 'fresh', 'byKey', 'agenda', 'children' )
+
+   def __init__( self, parent=None, hypothesis=None ):
+      self.parent     = parent
+      self.hypothesis = hypothesis
+      self.facts      = { }     # wff -> justification
+      self.fresh      = { }     # wff -> justification re-deriving an outer fact
+      self.byKey      = { }     # ( primary, arity ) -> [ wff ]
+      self.agenda     = [ ]     # heap of ( size, seq, wff ) awaiting saturation
+      self.children   = { }     # hypothesis -> _Context
+
+   def lookup( self, wff ):
+      """Return ( justification, owningContext ) or ( None, None )."""
+      ctx = self
+      while ctx is not None:
+         just = ctx.facts.get( wff )
+         if just is not None:
+            return just, ctx
+         ctx = ctx.parent
+      return None, None
+
+   def isKnown( self, wff ):
+      ctx = self
+      while ctx is not None:
+         if wff in ctx.facts:
+            return True
+         ctx = ctx.parent
+      return False
+
+   def visible( self, key=None ):
+      """Iterate over the facts visible in this scope, optionally only those
+      with the given top key."""
+      ctx = self
+      while ctx is not None:
+         if key is None:
+            yield from ctx.facts
+         else:
+            yield from ctx.byKey.get( key, ( ) )
+         ctx = ctx.parent
+
+   def descendants( self ):
+      yield self
+      for child in self.children.values( ):
+         yield from child.descendants( )
+
+
+def _topKey( aWFF ):
+   return ( aWFF.primary( ), len( aWFF ) )
+
+
+def _subWFFs( aWFF ):
+   """Return the distinct sub-wffs of aWFF (including aWFF)."""
+   result  = [ ]
+   seen    = set( )
+   pending = [ aWFF ]
+   while pending:
+      wff = pending.pop( )
+      if wff not in seen:
+         seen.add( wff )
+         result.append( wff )
+         pending.extend( wff.subordinates( ) )
+   return result
+
+
+class AutoProver( object ):
+   """Implementation of an automated prover for the sequents of a Logic.
+
+   The state of a search is kept on the instance, so an AutoProver proves
+   one sequent at a time:  it must not be shared between threads or called
+   re-entrantly.  Use one instance per thread.
+   """
+   DEFAULT_MAX_NODES   = 20000
+   DEFAULT_MAX_SECONDS = 10.0
+   DEFAULT_MAX_DEPTH   = 6
+   BRANCH_LIMIT        = 12
+
+   def __init__( self, logic, maxNodes=DEFAULT_MAX_NODES, maxSeconds=DEFAULT_MAX_SECONDS, maxDepth=DEFAULT_MAX_DEPTH, semanticCheck=True ):
+      """Initialize a new instance of the class.
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Initializes an instance.
+      Preconditions: [AssertionError] 'logic' must be a Logic.
+                     [AssertionError] 'maxNodes' must be a positive int.  The
+                        number of facts and goals the search may generate.
+                     [AssertionError] 'maxSeconds' must be a positive number.
+                     [AssertionError] 'maxDepth' must be a positive int.  The
+                        maximum nesting of backward chaining.
+                     [AssertionError] 'semanticCheck' must be a bool.  If
+                        True, sequents are tested for validity before the
+                        search.
+      """
+      assert isinstance( maxNodes,   int            ) and ( maxNodes   > 0 )
+      assert isinstance( maxSeconds, ( int, float ) ) and ( maxSeconds > 0 )
+      assert isinstance( maxDepth,   int            ) and ( maxDepth   > 0 )
+      assert isinstance( semanticCheck, bool )
+
+      self._logic      = logic
+      self._maxNodes   = maxNodes
+      self._maxSeconds = maxSeconds
+      self._maxDepth   = maxDepth
+
+      language = logic.language( )
+      calculus = logic.calculus( )
+
+      self._calculus  = calculus
+
+      self._semantics = Semantics( language ) if semanticCheck else None
+
+      negation = language.lexemeNamed( 'Negation' )
+      self._negation = negation.symbol[ 0 ] if negation is not None else None
+
+      self._premiseRule    = calculus.premiseAssertionRule( )
+      self._hypothesisRule = calculus.subproofPremiseRule( )
+
+      # Classify the rules.
+      self._regularRules  = [ ]   # ( rule, premiseForms, conclusionForms, hasConclusionOnlySymbols, premiseMatchers, conclusionMatchers, premiseInstantiators, conclusionInstantiators )
+      self._subproofRules = [ ]   # ( rule, hypothesisForm, subConclusionForm, conclusionForms )
+      self._forwardIndex  = DiscriminationTree( )
+
+      for rule in calculus.ruleList( ):
+         premiseForms    = list( rule.sequent.premiseFormSet( ) )
+         conclusionForms = list( rule.sequent.conclusionFormSet( ) )
+
+         if len( premiseForms ) == 0:
+            # Including the equivalence theorems, which rewrite through
+            # Calculus.equivalenceRewrites( ).
+            continue
+
+         elif any( isinstance( form, Sequent ) for form in premiseForms ):
+            if ( len( premiseForms ) != 1 ) or ( self._hypothesisRule is None ):
+               continue
+
+            subSequent = premiseForms[ 0 ]
+            if ( len( subSequent.premiseFormSet( ) ) != 1 ) or ( len( subSequent.conclusionFormSet( ) ) != 1 ):
+               continue
+
+            self._subproofRules.append( ( rule, subSequent.premiseFormSet( )[ 0 ], subSequent.conclusionFormSet( )[ 0 ], conclusionForms ) )
+
+         else:
+            hasConclusionOnlySymbols = len( rule.conclusionOnlySymbols( ) ) > 0
+            ruleIndex = len( self._regularRules )
+            self._regularRules.append( ( rule, premiseForms, conclusionForms, hasConclusionOnlySymbols,
+                                         [ compileMatcher( form ) for form in premiseForms ],
+                                         [ compileMatcher( form ) for form in conclusionForms ],
+                                         [ compileInstantiator( form ) for form in premiseForms ],
+                                         [ compileInstantiator( form ) for form in conclusionForms ] ) )
+            if not hasConclusionOnlySymbols:
+               for premiseIndex, premiseForm in enumerate( premiseForms ):
+                  self._forwardIndex.insert( premiseForm, ( ruleIndex, premiseIndex ) )
+
+      # Per search state
+      self._universe  = None
+      self._sizes     = { }
+      self._sizeLimit = 0
+      self._nodes     = 0
+      self._deadline  = 0.0
+      self._seq       = itertools.count( )
+      self._failed    = { }
+      self._active    = set( )
+
+   def prove( self, aSequent ):
+      """Search for a proof of aSequent.
+      Category:      Mutator.
+      Returns:       (Proof) A proof whose first steps assert the premises of
+                     aSequent and which derives each of its conclusions.
+      Side Effects:  Resets the instance's search state (universe, budgets,
+                     failed and active goals) and searches in it, so calls
+                     must not overlap (see AutoProver).
+      Preconditions: [AssertionError] 'aSequent' must be a Sequent of wffs.
+                     [ProofSearchFailure] The sequent is not valid, or no
+                        proof was found within the node, time and depth
+                        budgets.
+      """
+      assert isinstance( aSequent, Sequent )
+
+      premises    = list( aSequent.premiseFormSet( ) )
+      conclusions = list( aSequent.conclusionFormSet( ) )
+
+      for form in premises + conclusions:
+         if not isinstance( form, WFF ):
+            raise ProofSearchFailure( 'Only sequents of wffs can be proved.' )
+
+      if self._semantics is not None:
+         try:
+            if not self._semantics.isValid( aSequent ):
+               raise ProofSearchFailure( 'The sequent is not valid.' )
+         except NotTruthFunctionalError:
+            pass
+
+      self._universe  = set( )
+      self._sizes     = { }
+      for form in premises + conclusions:
+         self._extendUniverse( form )
+      self._sizeLimit = max( [ self._size( form ) for form in premises + conclusions ] ) + 2
+      self._nodes     = 0
+      self._deadline  = time.monotonic( ) + self._maxSeconds
+      self._active    = set( )
+
+      root = _Context( )
+      for premise in premises:
+         self._record( root, premise, ( 'premise', ) )
+
+      for depth in range( 1, self._maxDepth + 1 ):
+         self._failed = { }
+         if all( self._solve( conclusion, root, depth ) for conclusion in conclusions ):
+            return self._buildProof( root, premises, conclusions )
+
+      raise ProofSearchFailure( 'No proof found within a depth of {0}.'.format( self._maxDepth ) )
+
+   # Budgets
+   def _tick( self ):
+      self._nodes += 1
+      if self._nodes > self._maxNodes:
+         raise ProofSearchFailure( 'Node budget of {0} exhausted.'.format( self._maxNodes ) )
+      if ( ( self._nodes & 0x3F ) == 0 ) and ( time.monotonic( ) > self._deadline ):
+         raise ProofSearchFailure( 'Time budget of {0} seconds exhausted.'.format( self._maxSeconds ) )
+
+   # Universe
+   def _size( self, aWFF ):
+      size = self._sizes.get( aWFF )
+      if size is None:
+         size = 1 + sum( self._size( sub ) for sub in aWFF.subordinates( ) )
+         self._sizes[ aWFF ] = size
+      return size
+
+   def _negate( self, aWFF ):
+      return StructuredWFF( self._negation, aWFF )
+
+   def _extendUniverse( self, aWFF ):
+      for sub in _subWFFs( aWFF ):
+         self._universe.add( sub )
+         if self._negation is not None:
+            self._universe.add( self._negate( sub ) )
+
+   # Facts
+   def _record( self, ctx, aWFF, justification ):
+      """Add a fact to ctx and schedule it for saturation in ctx and every
+      nested scope.  Returns False if the fact was already known."""
+      if ctx.isKnown( aWFF ):
+         return False
+
+      self._tick( )
+      ctx.facts[ aWFF ] = justification
+      ctx.byKey.setdefault( _topKey( aWFF ), [ ] ).append( aWFF )
+
+      entry = ( self._size( aWFF ), next( self._seq ), aWFF )
+      for scope in ctx.descendants( ):
+         heapq.heappush( scope.agenda, entry )
+
+      return True
+
+   def _subcontext( self, ctx, hypothesis ):
+      sub = ctx.children.get( hypothesis )
+      if sub is None:
+         sub = _Context( ctx, hypothesis )
+         ctx.children[ hypothesis ] = sub
+         self._extendUniverse( hypothesis )
+
+         # The hypothesis is recorded even if it is known outside.
+         self._tick( )
+         sub.facts[ hypothesis ] = ( 'hypothesis', )
+         sub.byKey.setdefault( _topKey( hypothesis ), [ ] ).append( hypothesis )
+         heapq.heappush( sub.agenda, ( self._size( hypothesis ), next( self._seq ), hypothesis ) )
+      return sub
+
+   # Forward Saturation
+   def _saturate( self, ctx ):
+      while ctx.agenda:
+         size, seq, fact = heapq.heappop( ctx.agenda )
+         self._fireRules( ctx, fact )
+         self._fireEquivalences( ctx, fact )
+
+   def _fireRules( self, ctx, fact ):
+      for ruleIndex, premiseIndex in self._forwardIndex.retrieve( fact ):
+         rule, premiseForms, conclusionForms, hasConclusionOnlySymbols, premiseMatchers, conclusionMatchers, premiseInstantiators, conclusionInstantiators = self._regularRules[ ruleIndex ]
+
+         mapping = premiseMatchers[ premiseIndex ]( fact, Substitution.EMPTY )
+         if mapping is None:
+            continue
+
+         assigned = [ None ] * len( premiseForms )
+         assigned[ premiseIndex ] = fact
+         for fullMapping, premiseWFFs in self._matchPremises( ctx, premiseForms, premiseMatchers, assigned, mapping ):
+            for conclusionIndex, instantiate in enumerate( conclusionInstantiators ):
+               conclusion = instantiate( fullMapping )
+               if ( conclusion in self._universe ) and not ctx.isKnown( conclusion ):
+                  self._record( ctx, conclusion, ( 'rule', rule, premiseWFFs, fullMapping, conclusionIndex ) )
+
+   def _matchPremises( self, ctx, premiseForms, premiseMatchers, assigned, mapping ):
+      """Generate ( mapping, premiseWFFs ) for each way of assigning visible
+      facts to the unassigned premise forms."""
+      try:
+         formIndex = assigned.index( None )
+      except ValueError:
+         yield mapping, list( assigned )
+         return
+
+      form  = premiseForms[ formIndex ]
+      match = premiseMatchers[ formIndex ]
+      key   = None if form.isAtomic( ) else _topKey( form )
+      for fact in list( ctx.visible( key ) ):
+         subMapping = match( fact, mapping )
+         if subMapping is not None:
+            assigned[ formIndex ] = fact
+            yield from self._matchPremises( ctx, premiseForms, premiseMatchers, assigned, subMapping )
+            assigned[ formIndex ] = None
+
+   def _fireEquivalences( self, ctx, fact ):
+      limit = min( self._size( fact ) + 1, self._sizeLimit )
+      for rule, mapping, sub, replacement, rewritten in self._rewrites( fact ):
+         if ( self._size( rewritten ) <= limit ) and not ctx.isKnown( rewritten ):
+            self._record( ctx, rewritten, ( 'equiv', rule, fact, mapping ) )
+
+   def _rewrites( self, aWFF ):
+      """Generate ( rule, mapping, subWFF, replacement, rewrittenWFF ) for
+      each way of replacing a sub-wff of aWFF by applying an equivalence in
+      either direction, at a single position."""
+      for rewrite in self._calculus.equivalenceRewrites( aWFF ):
+         yield rewrite.rule, rewrite.mapping, rewrite.subWFF, rewrite.replacement, rewrite.result
+
+   # Backward Chaining
+   def _solve( self, goal, ctx, depth, fresh=False ):
+      """Try to establish goal in ctx.  If 'fresh' the goal must be derived
+      by a step within ctx itself (the last line of a subproof), unless it is
+      the hypothesis."""
+      if self._isSolved( goal, ctx, fresh ):
+         return True
+
+      self._saturate( ctx )
+      if self._isSolved( goal, ctx, fresh ):
+         return True
+
+      if depth <= 0:
+         return False
+
+      key = ( id( ctx ), goal, fresh )
+      if ( key in self._active ) or ( self._failed.get( key, 0 ) >= depth ):
+         return False
+
+      self._tick( )
+      self._active.add( key )
+      try:
+         solved = self._solveByRule( goal, ctx, depth, fresh )     or \
+                  self._solveBySubproof( goal, ctx, depth, fresh ) or \
+                  self._solveByEquivalence( goal, ctx, depth, fresh )
+      finally:
+         self._active.discard( key )
+
+      if not solved:
+         self._failed[ key ] = depth
+
+      return solved
+
+   def _isSolved( self, goal, ctx, fresh ):
+      if fresh:
+         return ( goal is ctx.hypothesis ) or ( goal in ctx.facts ) or ( goal in ctx.fresh )
+      else:
+         return ctx.isKnown( goal )
+
+   def _conclude( self, goal, ctx, justification ):
+      if not ctx.isKnown( goal ):
+         self._record( ctx, goal, justification )
+      elif ( goal not in ctx.facts ) and ( goal not in ctx.fresh ):
+         ctx.fresh[ goal ] = justification
+
+   def _solveByRule( self, goal, ctx, depth, fresh ):
+      # Collect the reductions of goal, then try those whose unknown
+      # subgoals are smallest first.
+      reductions = [ ]
+      for rule, premiseForms, conclusionForms, hasConclusionOnlySymbols, premiseMatchers, conclusionMatchers, premiseInstantiators, conclusionInstantiators in self._regularRules:
+         for conclusionIndex, match in enumerate( conclusionMatchers ):
+            mapping = match( goal, Substitution.EMPTY )
+            if mapping is None:
+               continue
+
+            for fullMapping in itertools.islice( self._bindPremises( ctx, premiseForms, premiseMatchers, mapping ), AutoProver.BRANCH_LIMIT ):
+               premiseWFFs = [ instantiate( fullMapping ) for instantiate in premiseInstantiators ]
+               if goal in premiseWFFs:
+                  continue
+
+               # Each unknown subgoal must be within the size limit; the
+               # smallest total is tried first.
+               sizes = [ self._size( premise ) for premise in premiseWFFs if not ctx.isKnown( premise ) ]
+               if sizes and ( max( sizes ) > self._sizeLimit ):
+                  continue
+               cost = sum( sizes )
+
+               reductions.append( ( cost, len( reductions ), rule, premiseWFFs, fullMapping, conclusionIndex ) )
+
+      reductions.sort( )
+      for cost, order, rule, premiseWFFs, fullMapping, conclusionIndex in reductions:
+         if all( self._solve( premise, ctx, depth - 1 ) for premise in premiseWFFs ):
+            self._conclude( goal, ctx, ( 'rule', rule, premiseWFFs, fullMapping, conclusionIndex ) )
+            return True
+
+      return False
+
+   def _bindPremises( self, ctx, premiseForms, premiseMatchers, mapping ):
+      """Generate extensions of mapping which bind every symbol of the
+      premise forms, by matching the partially bound forms to visible facts.
+      A form which matches no fact (or whose match is not wanted) is left to
+      the other forms to bind, and becomes a subgoal; e.g. the P > R of
+      P v Q, P > R, Q > R |- R is bound by matching P v Q alone."""
+      symbols = set( sym for form in premiseForms for sym in form.atomList( ) )
+      pending = [ ( form, match ) for form, match in zip( premiseForms, premiseMatchers ) if not all( sym in mapping for sym in form.atomList( ) ) ]
+      pending.sort( key=lambda entry: ( entry[ 0 ].isAtomic( ), sum( 1 for sym in entry[ 0 ].atomList( ) if sym not in mapping ) ) )
+      for fullMapping in self._bindForms( ctx, pending, mapping ):
+         if all( sym in fullMapping for sym in symbols ):
+            yield fullMapping
+
+   def _bindForms( self, ctx, forms, mapping ):
+      # forms is a list of ( premise form, compiled matcher ).
+      if not forms:
+         yield mapping
+         return
+
+      ( form, match ), rest = forms[ 0 ], forms[ 1: ]
+      if all( sym in mapping for sym in form.atomList( ) ):
+         yield from self._bindForms( ctx, rest, mapping )
+         return
+
+      key = None if form.isAtomic( ) else _topKey( form )
+      for fact in list( ctx.visible( key ) ):
+         subMapping = match( fact, mapping )
+         if subMapping is not None:
+            yield from self._bindForms( ctx, rest, subMapping )
+
+      # Leave the form unmatched:  a subgoal once the others bind its symbols.
+      yield from self._bindForms( ctx, rest, mapping )
+
+   def _solveBySubproof( self, goal, ctx, depth, fresh ):
+      for rule, hypothesisForm, subConclusionForm, conclusionForms in self._subproofRules:
+         for conclusionIndex, conclusionForm in enumerate( conclusionForms ):
+            mapping = conclusionForm.mapTo( goal )
+            if len( mapping ) == 0:
+               continue
+
+            try:
+               hypothesis = hypothesisForm.makeInstance( mapping )
+            except ( KeyError, ValueError ):
+               continue
+
+            sub = self._subcontext( ctx, hypothesis )
+            self._saturate( sub )
+
+            for fullMapping in self._bindSubConclusion( sub, subConclusionForm, mapping ):
+               subConclusion = subConclusionForm.makeInstance( fullMapping )
+               if self._solve( subConclusion, sub, depth - 1, fresh=True ):
+                  self._conclude( goal, ctx, ( 'subproof', rule, sub, subConclusion, fullMapping, conclusionIndex ) )
+                  return True
+
+      return False
+
+   def _bindSubConclusion( self, sub, subConclusionForm, mapping ):
+      """Return the most promising mappings binding every symbol of the
+      subproof's conclusion form (e.g. the Q of RAA's Q & ~Q).  Free symbols
+      are bound by matching sub-forms to facts visible in the subproof."""
+      symbols = subConclusionForm.atomList( )
+      if all( sym in mapping for sym in symbols ):
+         return [ mapping ]
+
+      candidates = { }
+      for fact in list( sub.visible( ) ):
+         for subForm in _subWFFs( subConclusionForm ):
+            subMapping = subForm.mapTo( fact, mapping )
+            if ( len( subMapping ) != 0 ) and all( sym in subMapping for sym in symbols ):
+               instance = subConclusionForm.makeInstance( subMapping )
+               if instance not in candidates:
+                  candidates[ instance ] = subMapping
+
+      def score( instance ):
+         known = sum( 1 for operand in instance.subordinates( ) if sub.isKnown( operand ) )
+         return ( -known, self._size( instance ) )
+
+      ranked = sorted( candidates, key=score )[ : AutoProver.BRANCH_LIMIT ]
+      return [ candidates[ instance ] for instance in ranked ]
+
+   def _solveByEquivalence( self, goal, ctx, depth, fresh ):
+      rewrites = [ ]
+      for rule, mapping, sub, replacement, rewritten in self._rewrites( goal ):
+         if self._size( rewritten ) > self._sizeLimit:
+            continue
+
+         # The proof step rewrites 'rewritten' back into goal, at the same position.
+         rewrites.append( ( rule, mapping, rewritten ) )
+
+      for rule, mapping, rewritten in rewrites:
+         if ctx.isKnown( rewritten ):
+            self._conclude( goal, ctx, ( 'equiv', rule, rewritten, mapping ) )
+            return True
+
+      for rule, mapping, rewritten in rewrites[ : AutoProver.BRANCH_LIMIT ]:
+         if self._solve( rewritten, ctx, depth - 1 ):
+            self._conclude( goal, ctx, ( 'equiv', rule, rewritten, mapping ) )
+            return True
+
+      return False
+
+   # Proof Construction
+   def _buildProof( self, root, premises, conclusions ):
+      proof   = Proof( )
+      scopes  = [ { } ]
+
+      premiseVar = self._premiseRule.sequent.conclusionAdditions( )[ 0 ]
+      for premise in premises:
+         if premise not in scopes[ 0 ]:
+            proof.addStep( premise, [ ], self._premiseRule, { premiseVar : premise }, 0 )
+            scopes[ 0 ][ premise ] = len( proof )
+
+      for conclusion in conclusions:
+         self._emit( proof, scopes, conclusion, root )
+
+      return proof
+
+   def _emit( self, proof, scopes, aWFF, ctx ):
+      """Write the derivation of aWFF into proof, unless it is already
+      available.  Returns its step number."""
+      for scope in reversed( scopes ):
+         stepNum = scope.get( aWFF )
+         if stepNum is not None:
+            return stepNum
+
+      justification, owner = ctx.lookup( aWFF )
+      return self._emitStep( proof, scopes, aWFF, justification, owner )
+
+   def _emitStep( self, proof, scopes, aWFF, justification, owner ):
+      kind = justification[ 0 ]
+
+      if kind == 'rule':
+         rule, premiseWFFs, mapping, conclusionIndex = justification[ 1: ]
+         citations = [ self._emit( proof, scopes, premise, owner ) for premise in premiseWFFs ]
+         proof.addStep( aWFF, citations, rule, mapping, conclusionIndex )
+
+      elif kind == 'equiv':
+         rule, source, mapping = justification[ 1: ]
+         citations = [ self._emit( proof, scopes, source, owner ) ]
+         proof.addStep( aWFF, citations, rule, mapping, 0 )
+
+      elif kind == 'subproof':
+         rule, sub, subConclusion, mapping, conclusionIndex = justification[ 1: ]
+
+         hypothesisVar = self._hypothesisRule.sequent.conclusionAdditions( )[ 0 ]
+         proof.beginHypo( )
+         proof.addStep( sub.hypothesis, [ ], self._hypothesisRule, { hypothesisVar : sub.hypothesis }, 0 )
+         first = len( proof )
+         scopes.append( { sub.hypothesis : first } )
+
+         if subConclusion is not sub.hypothesis:
+            subJustification = sub.fresh.get( subConclusion ) or sub.facts.get( subConclusion )
+            self._emitStep( proof, scopes, subConclusion, subJustification, sub )
+
+         last = len( proof )
+         scopes.pop( )
+         proof.endHypo( )
+         proof.addStep( aWFF, [ ( first, last ) ], rule, mapping, conclusionIndex )
+
+      else:
+         raise ProofSearchFailure( 'Inconsistent derivation of {0}.'.format( aWFF ) )
+
+      scopes[ -1 ][ aWFF ] = len( proof )
+      return len( proof )
+
+
+if __name__ == "__main__":
+   # Prove a few sequents of each logic and check the proofs.  Fitch's
+   # Disjunction Elimination is reached backward with only P v Q known:  its
+   # conditionals become subgoals.
+   import Logic
+   from ProofChecker import ProofChecker, proofRecord
+
+   sequents = { 'Gentzen' : [ 'A v B, ~A |- B', 'A & (B v C) |- (A & B) v (A & C)', '(A & B) > C |- A > (B > C)' ],
+                'Gensler' : [ 'P v Q, ~P |- Q', '~(P & Q), P |- ~Q' ],
+                'Fitch'   : [ 'P v Q, -P |- Q', 'P ^ (Q v R) |- (P ^ Q) v (P ^ R)', 'P v Q |- Q v P', 'P -> Q, Q -> R |- P -> R' ] }
+
+   for logicName, texts in sequents.items( ):
+      logic   = Logic.Logics[ logicName ]
+      prover  = AutoProver( logic )
+      checker = ProofChecker( logic )
+      for text in texts:
+         sequent = logic.language( ).parseSeq( text )
+         verdict = checker.check( proofRecord( logic, prover.prove( sequent ), sequent ) )
+         assert verdict.isValid( ) and verdict.complete, ( logicName, text, verdict )
+
+   print( 'Done!' )
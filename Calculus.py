@@ -1,5 +1,54 @@
 import Form
-import copy
+from Substitution import Substitution
+from PatternCompiler import compileMatcher, compileSetMatcher, compileInstantiator
+import Validation
+from DiscriminationTree import DiscriminationTree
+
+class OperationCancelled( Exception ):
+   """A computation was cancelled through its CancelToken."""
+
+
+class CancelToken( object ):
+   """Lets one thread cancel a computation running in another.  The
+   computation calls check( ) at convenient points, which raises
+   OperationCancelled once cancel( ) has been called."""
+   def __init__( self ):
+      self._cancelled = False
+
+   def cancel( self ):
+      self._cancelled = True
+
+   def isCancelled( self ):
+      return self._cancelled
+
+   def check( self ):
+      if self._cancelled:
+         raise OperationCancelled
+
+
+class EquivalenceRewrite( object ):
+   """One way of rewriting a wff with an equivalence theorem.  The sub-wff
+   at 'path', the operand indices leading to it from the top of the wff, is
+   an instance of one side of the theorem under 'mapping'; 'result' is the
+   wff with that one occurrence replaced by the instance of the other side.
+   """
+   __slots__ = ( 'rule', 'path', 'direction', 'mapping', 'subWFF', 'replacement', 'result' )
+
+   FORWARD  = 0      # The left side was matched and is replaced by the right.
+   BACKWARD = 1      # The right side was matched and is replaced by the left.
+
+   def __init__( self, rule, path, direction, mapping, subWFF, replacement, result ):
+      self.rule        = rule
+      self.path        = path
+      self.direction   = direction
+      self.mapping     = mapping
+      self.subWFF      = subWFF
+      self.replacement = replacement
+      self.result      = result
+
+   def __repr__( self ):
+      return 'EquivalenceRewrite( {0!r}, {1!r}, {2}, {3} )'.format( self.rule.name, self.path, self.direction, self.result )
+
 
 class InferenceRule( object ):
    """Implementation of an inference rule."""
@@ -13,9 +62,9 @@ class InferenceRule( object ):
                      [AssertionError] 'sequent' must be a Form.Sequent.
                      [AssertionError] 'proof' must be a str or Proof.
       """
-      assert isinstance( name,          str )
-      assert isinstance( abbreviation,  str )
-      assert isinstance( sequent,       Form.Sequent )
+      Validation.requireType( name,          str,          'name' )
+      Validation.requireType( abbreviation,  str,          'abbreviation' )
+      Validation.requireType( sequent,       Form.Sequent, 'sequent' )
       #assert isinstance( proof,         (Proof.Proof,str) )
 
       self.name    = name
@@ -23,17 +72,15 @@ class InferenceRule( object ):
       self.sequent = sequent
       self.proof   = proof
 
+      # The premise and conclusion forms compiled for applyTo( ).
+      self._premiseMatcher         = compileSetMatcher( sequent.premiseFormSet( ) )
+      self._conclusionInstantiator = compileInstantiator( sequent.conclusionFormSet( ) )
+
    def conclusionOnlySymbols( self ):
       return self.sequent.conclusionAdditions( )
 
    def mapPremiseFormsTo( self, premises ):
-      assert isinstance( premises,                           FormSet )
-      assert isinstance( includeUnmappableConclusionSymbols, bool    )
-
-      assert isinstance( self.name,      str )
-      assert isinstance( self.abbrev,    str )
-      assert isinstance( self.sequent,   Form.Sequent )
-      assert isinstance( self.proof,     ( Proof.Proof,str ) )
+      Validation.requireType( premises, Form.FormSet, 'premises' )
 
       premiseMap = self.sequent.mapPremisesTo( premises )
 
@@ -48,24 +95,60 @@ class InferenceRule( object ):
                        Empty list if set is not an instance of self._premises.
       Side Effects:    None.
       Preconditions:   [AssertionError] set must be a FormSet.
-                       [AssertionError] additionalMappings must be a dict or None.
+                       [AssertionError] additionalMappings must be a dict, Substitution or None.
                        [Exception]      set must be an instance of self._premises.
       """
-      assert isinstance( premises,                Form.FormSet )
-      assert isinstance( additionalMappedSymbols, dict    ) or ( additionalMappedSymbols is None )
+      Validation.requireType( premises, Form.FormSet, 'premises' )
+      Validation.requireMapping( additionalMappedSymbols, 'additionalMappedSymbols' )
 
-      assert isinstance( self.name,               str     )
-      assert isinstance( self.abbrev,             str     )
-      assert isinstance( self.sequent,            Form.Sequent )
+      return self._applyTo( premises, additionalMappedSymbols )
 
+   def _applyTo( self, premises, additionalMappedSymbols ):
+      """Implementation of applyTo( ), without validation."""
       if len(premises) != len(self.sequent.premiseFormSet()):
          raise Exception( '{0} premise(s) required for the selected inference rule.'.format(len(self.sequent.premiseFormSet())) )
 
-      mapping = self.sequent.premiseFormSet().mapTo( premises, additionalMappedSymbols )
-      if mapping == {}:
-         raise SequentApplicationError
+      mapping = self._matchPremises( premises, additionalMappedSymbols )
+      if ( mapping is None ) or ( len( mapping ) == 0 ):
+         raise Form.SequentApplicationError
 
-      return self.sequent.conclusionFormSet().makeInstance( mapping )
+      return self._instantiateConclusions( mapping )
+
+   def isApplicableTo( self, premises, cancelToken=None ):
+      """Returns True if the premise forms of this rule can be mapped onto
+      'premises', so that applyTo( ) will succeed once any conclusion-only
+      symbols are assigned.  Nothing is instantiated.
+      Category:      Pure Function.
+      Returns:       (bool)
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'premises' must be a FormSet.
+                     [AssertionError] 'cancelToken' must be a CancelToken or None.
+                     [OperationCancelled] if 'cancelToken' is cancelled.
+      """
+      Validation.requireType( premises,    Form.FormSet,                'premises' )
+      Validation.requireType( cancelToken, ( CancelToken, type( None ) ), 'cancelToken' )
+
+      return self._applicableMapping( premises, cancelToken ) is not None
+
+   def _applicableMapping( self, premises, cancelToken ):
+      """Returns the mapping of the premise forms onto 'premises', or None if
+      this rule does not apply to them."""
+      if cancelToken is not None:
+         cancelToken.check( )
+
+      if len( premises ) != len( self.sequent.premiseFormSet( ) ):
+         return None
+
+      return self._matchPremises( premises, None )
+
+   def _matchPremises( self, premises, additionalMappedSymbols ):
+      """Returns the first mapping of the premise forms onto 'premises' which
+      extends 'additionalMappedSymbols', or None."""
+      return next( self._premiseMatcher( list( premises ), Substitution.fromMapping( additionalMappedSymbols ) ), None )
+
+   def _instantiateConclusions( self, mapping ):
+      """Returns the conclusion forms instantiated under 'mapping'."""
+      return self._conclusionInstantiator( mapping )
 
    def isDerivedRule( self ):
       return isinstance( self.proof, Proof )
@@ -84,6 +167,12 @@ class Resolver( object ):
       '''Return a sub-WFF of wff.  Any exception will cancel the operation.'''
       raise NotImplementedError( )
 
+   def _selectSubWFFPath( self, wff ):
+      '''Return the path (see WFF.subWFFAt( )) of a sub-WFF of wff.  Any
+      exception will cancel the operation.  By default, the first occurrence
+      of the sub-WFF chosen by _selectSubWFF( ).'''
+      return wff.pathsOf( self._selectSubWFF( wff ) )[ 0 ]
+
    def _assignUnmappedSymbols( self, unmappedSymbols, sequent ):
       '''Return a new dict mapping unmapped symbols to WFFs (don't modify unmappedSymbols).
       Each symbol must be mapped to a valid WFF. Any exception will cancel the operation.'''
@@ -100,12 +189,12 @@ class Calculus( object ):
    DEFAULT_AXIOM_INTRODUCTION_RULE_NAME   = 'Axiom Intro'
 
    def __init__( self, inferenceRules, proofPremiseRuleName, theoremRuleName, axiomRuleName, allowBiconditionalSubstitution=False, subproofPremiseRule=None ):
-      assert isinstance( inferenceRules,                 list )
-      assert isinstance( proofPremiseRuleName,           str  )
-      assert isinstance( theoremRuleName,                str  )
-      assert isinstance( axiomRuleName,                  str  )
-      assert isinstance( allowBiconditionalSubstitution, bool )
-      assert isinstance( subproofPremiseRule,            str  ) or ( subproofPremiseRule is None )
+      Validation.requireType( inferenceRules,                 list,                     'inferenceRules' )
+      Validation.requireType( proofPremiseRuleName,           str,                      'proofPremiseRuleName' )
+      Validation.requireType( theoremRuleName,                str,                      'theoremRuleName' )
+      Validation.requireType( axiomRuleName,                  str,                      'axiomRuleName' )
+      Validation.requireType( allowBiconditionalSubstitution, bool,                     'allowBiconditionalSubstitution' )
+      Validation.requireType( subproofPremiseRule,            ( str, type( None ) ),    'subproofPremiseRule' )
 
       # Basic Properties
       self._logic                = None
@@ -128,6 +217,17 @@ class Calculus( object ):
          self._ruleDict[ rule.name   ] = ruleIndex
          self._ruleDict[ rule.abbrev ] = ruleIndex
 
+      # Index the premise forms of the rules.  Values are
+      # ( ruleIndex, premiseIndex ).
+      self._premiseIndex     = DiscriminationTree( )
+      for ruleIndex, rule in enumerate( self._ruleList ):
+         for premiseIndex, premiseForm in enumerate( rule.sequent.premiseFormSet( ) ):
+            self._premiseIndex.insert( premiseForm, ( ruleIndex, premiseIndex ) )
+
+      # Index of the sides of equivalence theorems; see _equivalences( ).
+      self._equivalenceIndex = None
+      self._equivalenceSides = None
+
       # Setup the assertion rule
       if proofPremiseRuleName not in self._ruleDict:
          raise Exception( 'Invalid premise assertion rule: rule name not defined.' )
@@ -145,6 +245,14 @@ class Calculus( object ):
       if not isinstance(assertionSeq.conclusionFormSet()[0], Form.AtomicWFF):
          raise Exception( 'Invalid premise assertion rule: conclusion form must be atomic.' )
 
+      # Setup the subproof premise (hypothesis) rule
+      if subproofPremiseRule is None:
+         self._subproofPremiseRule = None
+      elif subproofPremiseRule not in self._ruleDict:
+         raise Exception( 'Invalid subproof premise rule: rule name not defined.' )
+      else:
+         self._subproofPremiseRule = self._ruleList[ self._ruleDict[ subproofPremiseRule ] ]
+
    def hasRule( self, aRuleName ):
       """Is 'aRuleName' the name of an inference rule in the logic?
       Category:      Predicate.
@@ -152,7 +260,7 @@ class Calculus( object ):
       Side Effects:  None.
       Preconditions: [AssertionError] 'aRuleName' must be a str.
       """
-      assert isinstance( aRuleName,      str      )
+      Validation.requireType( aRuleName, str, 'aRuleName' )
 
       return aRuleName in self._ruleDict
 
@@ -163,7 +271,7 @@ class Calculus( object ):
       Side Effects:  None.
       Preconditions: [AssertionError] 'aRuleName' must be a str.
       """
-      assert isinstance( aRuleName,      str      )
+      Validation.requireType( aRuleName, str, 'aRuleName' )
 
       return self._ruleList[ self._ruleDict[ aRuleName ] ]
 
@@ -179,6 +287,286 @@ class Calculus( object ):
    def premiseAssertionRule( self ):
       return self._proofPremiseRule
 
+   def subproofPremiseRule( self ):
+      """Returns the rule used to introduce the premise of a subproof.
+      Category:      Pure Function.
+      Returns:       (InferenceRule) or None if the calculus has no subproofs.
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      return self._subproofPremiseRule
+
+   def candidateRules( self, premiseSet, equivalence=False ):
+      """Returns the inference rules which may apply to premiseSet.
+      A rule is a candidate when its premise forms can be paired one-to-one
+      with the members of premiseSet such that each premise is structurally
+      an instance of its form.  If 'equivalence' is True, premiseSet must
+      hold a single premise and the candidates are the equivalence theorems
+      either side of which is structurally matched by some sub-wff of it.
+      Candidates are found through a discrimination tree rather than by
+      attempting every rule; they still have to be confirmed by applying
+      the rule, since repeated symbols (P & P) are not checked.
+      Category:      Pure Function.
+      Returns:       (list) of InferenceRule in ruleList( ) order.
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'premiseSet' must be a FormSet.
+      """
+      Validation.requireType( premiseSet,  Form.FormSet, 'premiseSet' )
+      Validation.requireType( equivalence, bool,         'equivalence' )
+
+      if equivalence:
+         return self._candidateEquivalenceRules( premiseSet )
+
+      premiseCount = len( premiseSet )
+      if premiseCount == 0:
+         return [ rule for rule in self._ruleList if len( rule.sequent.premiseFormSet( ) ) == 0 ]
+
+      # For each rule of the right arity, the premises matching each form.
+      matches = { }
+      for instIndex, premise in enumerate( premiseSet ):
+         for ruleIndex, premiseIndex in self._premiseIndex.retrieve( premise ):
+            premiseForms = self._ruleList[ ruleIndex ].sequent.premiseFormSet( )
+            if len( premiseForms ) != premiseCount:
+               continue
+
+            if isinstance( premise, Form.Sequent ) and not premiseForms[ premiseIndex ]._shapeMatches( premise ):
+               continue
+
+            ruleMatches = matches.get( ruleIndex )
+            if ruleMatches is None:
+               ruleMatches = [ [ ] for _ in range( premiseCount ) ]
+               matches[ ruleIndex ] = ruleMatches
+            ruleMatches[ premiseIndex ].append( instIndex )
+
+      return [ self._ruleList[ ruleIndex ] for ruleIndex in sorted( matches )
+               if Calculus._hasPerfectMatching( matches[ ruleIndex ] ) ]
+
+   def _candidateEquivalenceRules( self, premiseSet ):
+      """Implementation of candidateRules( premiseSet, equivalence=True )."""
+      if len( premiseSet ) != 1:
+         return [ ]
+
+      thePremise = premiseSet[ 0 ]
+      if not isinstance( thePremise, Form.WFF ):
+         return [ ]
+
+      equivalenceIndex = self._equivalences( )[ 0 ]
+
+      ruleIndices = set( )
+      seen        = set( )
+      pending     = [ thePremise ]
+      while pending:
+         subWFF = pending.pop( )
+         if subWFF in seen:
+            continue
+         seen.add( subWFF )
+         ruleIndices.update( ruleIndex for ruleIndex, side in equivalenceIndex.retrieve( subWFF ) )
+         pending.extend( subWFF.subordinates( ) )
+
+      return [ self._ruleList[ ruleIndex ] for ruleIndex in sorted( ruleIndices ) ]
+
+   def _equivalences( self ):
+      """Returns the index of the sides of the equivalence theorems, whose
+      values are ( ruleIndex, side ), and a dict ruleIndex : the ( matcher,
+      instantiator of the other side ) of each side.  Built on first use
+      since the equivalence operators are defined by the logic's language."""
+      if self._equivalenceIndex is None:
+         equivalenceIndex = DiscriminationTree( )
+         equivalenceSides = { }
+         language = self._logic.language( ) if self._logic is not None else None
+         for ruleIndex, rule in enumerate( self._ruleList ):
+            if language is not None:
+               if not language.isEquivalenceTheorem( rule.sequent ):
+                  continue
+            elif ( len( rule.sequent.premiseFormSet( ) ) != 0 ) or ( len( rule.sequent.conclusionFormSet( ) ) != 1 ) or ( rule.sequent.conclusionFormSet( )[ 0 ].arity( ) != 2 ):
+               continue
+
+            sides = rule.sequent.conclusionFormSet( )[ 0 ].subordinates( )
+            for side in ( EquivalenceRewrite.FORWARD, EquivalenceRewrite.BACKWARD ):
+               equivalenceIndex.insert( sides[ side ], ( ruleIndex, side ) )
+            equivalenceSides[ ruleIndex ] = ( ( compileMatcher( sides[ 0 ] ), compileInstantiator( sides[ 1 ] ) ),
+                                              ( compileMatcher( sides[ 1 ] ), compileInstantiator( sides[ 0 ] ) ) )
+
+         # Published whole, as other threads may be asking for it too.
+         self._equivalenceSides = equivalenceSides
+         self._equivalenceIndex = equivalenceIndex
+
+      return self._equivalenceIndex, self._equivalenceSides
+
+   def equivalenceRewrites( self, premise, rule=None, cancelToken=None ):
+      """Returns every way of rewriting premise with an equivalence theorem,
+      in either direction and at any position.  The premise is traversed
+      once:  the sides of all the theorems are matched against each sub-wff
+      together, through a discrimination tree, and a sub-wff occurring at
+      several positions is matched only once.  Rewrites which cannot be
+      instantiated without further symbols, or which change nothing, are
+      left out.
+      Category:      Pure Function.
+      Returns:       (list) of EquivalenceRewrite, by position (preorder),
+                     then in ruleList( ) order.
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'premise' must be a WFF.
+                     [AssertionError] 'rule' the InferenceRule (or its name)
+                        of an equivalence theorem, or None for all of them.
+                     [AssertionError] 'cancelToken' must be a CancelToken or None.
+                     [OperationCancelled] if 'cancelToken' is cancelled.
+      """
+      Validation.requireType( premise,     Form.WFF,                            'premise' )
+      Validation.requireType( rule,        ( InferenceRule, str, type( None ) ), 'rule' )
+      Validation.requireType( cancelToken, ( CancelToken, type( None ) ),       'cancelToken' )
+
+      equivalenceIndex, equivalenceSides = self._equivalences( )
+
+      onlyRule = None
+      if rule is not None:
+         onlyRule = self._ruleDict[ rule.name if isinstance( rule, InferenceRule ) else rule ]
+         Validation.require( onlyRule in equivalenceSides, "'rule' must be an equivalence theorem." )
+
+      rewrites = [ ]
+      matches  = { }     # sub-wff : [ ( ruleIndex, side, mapping, replacement ) ]
+      pending  = [ ( ( ), premise ) ]
+      while pending:
+         path, subWFF = pending.pop( )
+         if cancelToken is not None:
+            cancelToken.check( )
+
+         subMatches = matches.get( subWFF )
+         if subMatches is None:
+            subMatches = matches[ subWFF ] = [ ]
+            for ruleIndex, side in sorted( equivalenceIndex.retrieve( subWFF ) ):
+               if ( onlyRule is not None ) and ( ruleIndex != onlyRule ):
+                  continue
+
+               matcher, instantiator = equivalenceSides[ ruleIndex ][ side ]
+               mapping = matcher( subWFF, Substitution.EMPTY )
+               if mapping is None:
+                  continue
+
+               try:
+                  replacement = instantiator( mapping )
+               except ( KeyError, ValueError ):
+                  continue
+
+               if replacement is not subWFF:
+                  subMatches.append( ( ruleIndex, side, mapping, replacement ) )
+
+         for ruleIndex, side, mapping, replacement in subMatches:
+            rewrites.append( EquivalenceRewrite( self._ruleList[ ruleIndex ], path, side, mapping, subWFF, replacement,
+                                                 premise._replaceAt( path, replacement ) ) )
+
+         operands = subWFF.subordinates( )
+         for operandIndex in range( len( operands ) - 1, -1, -1 ):
+            pending.append( ( path + ( operandIndex, ), operands[ operandIndex ] ) )
+
+      return rewrites
+
+   def isEquivalenceRewrite( self, source, result, rule, mapping ):
+      """Is result source with an instance of one side of the equivalence
+      theorem rule, under mapping, replaced by the instance of the other:
+      either at a single position, or at every occurrence?
+      Category:      Predicate.
+      Returns:       (bool)
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'source' and 'result' must be WFFs.
+                     [AssertionError] 'rule' must be an InferenceRule whose
+                        conclusion is an equivalence.
+                     [AssertionError] 'mapping' must be a dict or Substitution.
+      """
+      Validation.requireType( source, Form.WFF,      'source' )
+      Validation.requireType( result, Form.WFF,      'result' )
+      Validation.requireType( rule,   InferenceRule, 'rule' )
+      Validation.requireMapping( mapping, 'mapping', optional=False )
+
+      sideA, sideB = rule.sequent.conclusionFormSet( )[ 0 ].subordinates( )
+      try:
+         instA = sideA.makeInstance( mapping )
+         instB = sideB.makeInstance( mapping )
+      except ( KeyError, ValueError ):
+         return False
+
+      if ( source.copyWithSubstitutedSubWFF( instA, instB ) is result ) or ( source.copyWithSubstitutedSubWFF( instB, instA ) is result ):
+         return True
+
+      pending = [ ( ( ), source ) ]
+      while pending:
+         path, subWFF = pending.pop( )
+         if ( subWFF is instA ) and ( source._replaceAt( path, instB ) is result ):
+            return True
+         if ( subWFF is instB ) and ( source._replaceAt( path, instA ) is result ):
+            return True
+
+         operands = subWFF.subordinates( )
+         for operandIndex in range( len( operands ) ):
+            pending.append( ( path + ( operandIndex, ), operands[ operandIndex ] ) )
+
+      return False
+
+   @staticmethod
+   def _hasPerfectMatching( candidates ):
+      """candidates[ i ] lists the premises which may be assigned to premise
+      form i.  Is there an assignment of a distinct premise to every form?"""
+      assignedTo = { }
+
+      def augment( formIndex, visited ):
+         for instIndex in candidates[ formIndex ]:
+            if instIndex in visited:
+               continue
+            visited.add( instIndex )
+            if ( instIndex not in assignedTo ) or augment( assignedTo[ instIndex ], visited ):
+               assignedTo[ instIndex ] = formIndex
+               return True
+         return False
+
+      for formIndex in range( len( candidates ) ):
+         if not augment( formIndex, set( ) ):
+            return False
+
+      return True
+
+   def applicableRules( self, premiseSet, cancelToken=None ):
+      """Returns the inference rules which apply to premiseSet, each with the
+      conclusions it yields.  Conclusion-only symbols, which the user has
+      yet to assign, stand for themselves in those conclusions (Add yields
+      'A v Q' from 'A').  A single wff premise is also matched against the
+      equivalence theorems, which yield its rewrites (equivalenceRewrites( )).
+      Meant to run on a background thread:  'cancelToken' is checked before
+      each rule is tried.
+      Category:      Pure Function.
+      Returns:       (list) of ( InferenceRule, list of conclusions ) in
+                     ruleList( ) order.
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'premiseSet' must be a FormSet.
+                     [AssertionError] 'cancelToken' must be a CancelToken or None.
+                     [OperationCancelled] if 'cancelToken' is cancelled.
+      """
+      Validation.requireType( premiseSet,  Form.FormSet,                'premiseSet' )
+      Validation.requireType( cancelToken, ( CancelToken, type( None ) ), 'cancelToken' )
+
+      applicable = [ ]
+      for rule in self.candidateRules( premiseSet ):
+         mapping = rule._applicableMapping( premiseSet, cancelToken )
+         if mapping is None:
+            continue
+
+         for symbol in rule.conclusionOnlySymbols( ):
+            if symbol not in mapping:
+               mapping = mapping.extend( symbol, Form.AtomicWFF( symbol ) )
+
+         applicable.append( ( rule, list( rule._instantiateConclusions( mapping ) ) ) )
+
+      # A single wff may also be rewritten by the equivalence theorems.
+      if ( len( premiseSet ) == 1 ) and isinstance( premiseSet[ 0 ], Form.WFF ):
+         results = { }
+         for rewrite in self.equivalenceRewrites( premiseSet[ 0 ], cancelToken=cancelToken ):
+            ruleResults = results.setdefault( rewrite.rule, [ ] )
+            if rewrite.result not in ruleResults:
+               ruleResults.append( rewrite.result )
+
+         applicable.extend( results.items( ) )
+         applicable.sort( key=lambda item: self._ruleDict[ item[ 0 ].name ] )
+
+      return applicable
+
    def theoremIntroProofText( self ):
       """Returns the rule name for the Theorem Introduction.
       Category:      Pure Function.
@@ -198,19 +586,17 @@ class Calculus( object ):
       Side Effects:  None.
       Preconditions: [AssertionError] 'rule' must be the name of an inference rule.
                      [AssertionError] 'premiseSet' must be a FormSet.
-                     [AssertionError] 'additionalSymbolMappings' must be 
+                     [AssertionError] 'additionalSymbolMappings' must be a
+                        dict, Substitution or None.  It is not modified.
       '''
-      assert isinstance( ruleName,                 str          )
-      assert isinstance( premiseSet,               Form.FormSet )
-      assert isinstance( additionalSymbolMappings, dict         )
-      
-      if additionalSymbolMappings is None:
-         additionalSymbolMappings = { }
-      else:
-         additionalSymbolMappings = copy.deepcopy( additionalSymbolMappings )
+      Validation.requireType( ruleName,   str,          'ruleName' )
+      Validation.requireType( premiseSet, Form.FormSet, 'premiseSet' )
+      Validation.requireMapping( additionalSymbolMappings, 'additionalSymbolMappings' )
+
+      additionalSymbolMappings = Substitution.fromMapping( additionalSymbolMappings )
 
       rule = self.rule( ruleName )
-      return rule.applyTo( premiseSet, additionalSymbolMappings )
+      return rule._applyTo( premiseSet, additionalSymbolMappings )
 
 
 class Inference( object ):
@@ -221,18 +607,15 @@ class Inference( object ):
       Side Effects:  Initialize the new instance.
       Preconditions: premiseSet (FormSet) Set of forms to apply the rule to.
                      rule (InferenceRule)
-                     additionalMappings (dict)
+                     additionalMappings (dict or Substitution)
       """
       # Inputs
       self.ruleName            = rule.name
       self.premiseSet          = premiseSet
-      self.additionalSymbolMappings = copy.deepcopy(additionalSymbolMappings)
+      self.additionalSymbolMappings = Substitution.fromMapping( additionalSymbolMappings )
 
       self.rule                = rule
 
-      if additionalSymbolMappings is None:
-         self.additionalSymbolMappings = { }
-
    # Contract
    def resolve( self, resolver ):
       """Resolve any issues when attempting to apply an inference rule to premises.
@@ -262,7 +645,11 @@ class EquivalenceInference( Inference ):
       super().__init__( premiseSet, ruleName, additionalSymbolMappings )
 
       # Inputs needed to complete a direct inference
-      self.subWFFSelection     = None    # Used for applying equivalences
+      self.subWFFPath          = None    # Position of the sub-wff to rewrite
+      self.subWFFSelection     = None    # The sub-wff at that position
+
+      # Results
+      self.mapping             = None    # Mapping of the rule's symbols
 
    # Specialization of Inference
    def resolve( self, resolver ):
@@ -278,7 +665,8 @@ class EquivalenceInference( Inference ):
          #raise Exception( 'An equivalence theorem must be selected to use Infer Equivalence.' )
 
       # Select the subwff of the premise to which to apply the equivalence.
-      self.subWFFSelection = resolver._selectSubWFF( thePremise )
+      self.subWFFPath      = resolver._selectSubWFFPath( thePremise )
+      self.subWFFSelection = thePremise.subWFFAt( self.subWFFPath )
 
       # determine if the equivalence A <-> B should be applied to subWFF as A |- B or B |- A
       theASide, theBSide = self.rule.sequent.conclusionFormSet()[ 0 ].subordinates( )
@@ -296,5 +684,7 @@ class EquivalenceInference( Inference ):
          raise Exception( 'The selected sub-WFF must be an instance of one side of the equivalance.' )
 
       # Apply equivalence
-      return theConclusionForm.makeInstance( premiseToRuleMap )
+      self.mapping = premiseToRuleMap
+      newSubWFF    = theConclusionForm.makeInstance( premiseToRuleMap )
+      return [ thePremise.replaceAt( self.subWFFPath, newSubWFF ) ]
 
@@ -0,0 +1,131 @@
+"""This module implements DiscriminationTree, a prefix index over the
+operator structure of pattern forms.
+
+Each pattern is flattened into the preorder sequence of its symbols:  a
+StructuredWFF contributes ( operator, arity ), an AtomicWFF (a pattern
+variable) contributes VARIABLE and a nested Sequent contributes
+( SEQUENT, #premises, #conclusions ).  Patterns sharing a prefix share a
+path in the tree, so a query walks the tree once for all patterns instead of
+attempting every pattern in turn.
+"""
+
+from Form import WFF, StructuredWFF, Sequent
+
+
+VARIABLE = '*'
+SEQUENT  = '|-'
+
+
+class _Node( object ):
+   __slots__ = ( 'children', 'values' )
+
+   def __init__( self ):
+      self.children = { }
+      self.values   = [ ]
+
+
+def _key( aForm ):
+   """Return the index key of the top symbol of aForm."""
+   if isinstance( aForm, StructuredWFF ):
+      return ( aForm.primary( ), aForm.arity( ) )
+   elif isinstance( aForm, Sequent ):
+      return ( SEQUENT, len( aForm.premiseFormSet( ) ), len( aForm.conclusionFormSet( ) ) )
+   else:
+      return VARIABLE
+
+
+def _pathOf( aPattern ):
+   """Return the preorder key sequence of aPattern."""
+   path    = [ ]
+   pending = [ aPattern ]
+   while pending:
+      pattern = pending.pop( )
+      path.append( _key( pattern ) )
+      if isinstance( pattern, StructuredWFF ):
+         pending.extend( reversed( pattern.subordinates( ) ) )
+   return path
+
+
+class DiscriminationTree( object ):
+   """Implementation of a discrimination tree.
+
+   Values are stored against pattern forms and retrieved by instance forms.
+   retrieve( ) returns the values of every pattern whose operator structure
+   is compatible with the instance:  each pattern variable may stand for any
+   wff, but operators, arities and sequent shapes must agree.  Variable
+   consistency (P & P against A & B) is not checked; callers apply mapTo( )
+   to the candidates.
+   """
+   def __init__( self ):
+      """Initialize a new, empty instance of the class.
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Initializes an instance.
+      Preconditions: None.
+      """
+      self._root  = _Node( )
+      self._count = 0
+
+   def __len__( self ):
+      """Returns the number of values stored in the tree."""
+      return self._count
+
+   def insert( self, aPattern, value ):
+      """Index value under the pattern form aPattern.
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Adds value to the tree.
+      Preconditions: [AssertionError] aPattern must be a WFF or Sequent.
+      """
+      assert isinstance( aPattern, ( WFF, Sequent ) )
+
+      node = self._root
+      for key in _pathOf( aPattern ):
+         child = node.children.get( key )
+         if child is None:
+            child = _Node( )
+            node.children[ key ] = child
+         node = child
+
+      node.values.append( value )
+      self._count += 1
+
+   def retrieve( self, anInstance ):
+      """Return the values of all patterns which may map to anInstance.
+      Category:      Pure Function.
+      Returns:       (list) of values in no particular order.
+      Side Effects:  None.
+      Preconditions: [AssertionError] anInstance must be a WFF or Sequent.
+      """
+      assert isinstance( anInstance, ( WFF, Sequent ) )
+
+      result = [ ]
+
+      # Each entry is a tree node and the stack of instance subforms which
+      # remain to be matched beneath it (top of stack is the last element).
+      agenda = [ ( self._root, ( anInstance, ) ) ]
+      while agenda:
+         node, pending = agenda.pop( )
+         if not pending:
+            result.extend( node.values )
+            continue
+
+         form = pending[ -1 ]
+         rest = pending[ : -1 ]
+
+         if isinstance( form, WFF ):
+            # A pattern variable consumes the entire sub-wff.
+            child = node.children.get( VARIABLE )
+            if child is not None:
+               agenda.append( ( child, rest ) )
+
+         if isinstance( form, StructuredWFF ):
+            child = node.children.get( _key( form ) )
+            if child is not None:
+               agenda.append( ( child, rest + tuple( reversed( form.subordinates( ) ) ) ) )
+         elif isinstance( form, Sequent ):
+            child = node.children.get( _key( form ) )
+            if child is not None:
+               agenda.append( ( child, rest ) )
+
+      return result
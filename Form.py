@@ -4,11 +4,18 @@ representation of a wff.
 
 
 import copy
+import itertools
+import threading
+import weakref
 from StructuredString import *
+from Substitution import Substitution
+import Validation
 
 
 class Form( object ):
    """Abstract base class for Form classes."""
+   __slots__ = ( )
+
    # Standard Methods
    def __eq__( self, other ):
       """Is this expression equal to other?
@@ -17,8 +24,6 @@ class Form( object ):
       Side Effects:  None.
       Preconditions: None.
       """
-      assert isinstance( other, Form )
-
       raise NotImplementedError
 
    def __ne__( self, other ):
@@ -28,8 +33,6 @@ class Form( object ):
       Side Effects:  None.
       Preconditions: None.
       """
-      assert isinstance( other, Form )
-
       return not(self == other)
 
    def __str__( self ):
@@ -58,36 +61,38 @@ class Form( object ):
       Side Effects:  None.
       Preconditions: None.
       """
-      assert isinstance( lst, list ) or (lst is None)
+      Validation.requireType( lst, ( list, type( None ) ), 'lst' )
 
       if lst is None:
          lst = [ ]
 
-      return self._buildAtomList( lst )
+      return self._buildAtomList( lst, set(lst) )
 
    def mapTo( self, other, aMapping=None ):
       """Presuming that 'other' is a substitution instance of this Form (self).
-      Populate the dictionary (aMapping) whose keys are the Atoms of this Form
+      Extend the mapping (aMapping) whose keys are the Atoms of this Form
       instance and whose values are the WFFs of other which correspond to each
       of these Atoms.
       Category:      Pure Function.
-      Returns:       (dictionary) The dictionary will contain all the mappings
-                     from this instance to other.  If other is not an instance
-                     of this, then the dictionary will be empty.
-      Side Effects:  None.
+      Returns:       (Substitution) The substitution will contain all the
+                     mappings from this instance to other.  If other is not an
+                     instance of this, then the substitution will be empty.
+      Side Effects:  None.  aMapping is never modified.
       Preconditions: [AssertionError] other must be an WFF.
-                     [AssertionError] map must be a dictionary.
-      Implementer Note: Any derived implementation should assert the types of
-         the arguments.  Any other kinds of exceptions should be avoided or
-         cought to insure that the function remains pure.
+                     [AssertionError] map must be a dict, Substitution or None.
+      Implementer Note: The arguments are validated here (see Validation);
+         derived implementations of _mapTo( ) should not check them again.
+         Any other kinds of exceptions should be avoided or cought to insure
+         that the function remains pure.
       """
-      assert isinstance( other, Form )
-      assert isinstance( aMapping,   dict ) or ( aMapping is None )
+      Validation.requireType( other, Form, 'other' )
+      Validation.requireMapping( aMapping, 'aMapping' )
 
-      if aMapping is None:
-         aMapping={ }
+      result = self._mapTo( other, Substitution.fromMapping( aMapping ) )
+      if result is None:
+         return Substitution.EMPTY
 
-      return self._mapTo( other, aMapping )
+      return result
 
    def structuredString( self ):
       """Return a StructuredString representation of the Form.
@@ -148,6 +153,11 @@ class Form( object ):
       for sub in self.subordinates( ):
          sub._operatorStructure( operatorList )
 
+   def _shapeKey( self ):
+      """Return operatorStructure( ) as a hashable tuple.  Forms with equal
+      shape keys have identical operator trees (they differ only in atoms)."""
+      return tuple( self.operatorStructure( ) )
+
    # Contract
    def primary( self ):
       """Return the primary symbol for the wff.
@@ -163,30 +173,215 @@ class Form( object ):
       Category:      Pure Function.
       Returns:       (WFF) A new instance of this wff.
       Side Effects:  None.
-      Preconditions: [AssertionError] mapping must be a dictionary.
+      Preconditions: [AssertionError] mapping must be a dict or Substitution.
                      [ValueError]     Each atom in this wff must be keys in
                         mapping to some other wff.
       """
+      Validation.requireMapping( aMapping, 'aMapping', optional=False )
+
+      return self._makeInstance( aMapping )
+
+   def _buildAtomList( self, lst, seen ):
+      """Implementation of public method atomList( ).  'seen' is the set of
+      symbols already in lst."""
       raise NotImplementedError
 
-   def _buildAtomList( self, lst ):
-      """Implementation of public method atomList( )."""
+   def _makeInstance( self, aMapping ):
+      """Implementation of public method makeInstance( )."""
       raise NotImplementedError
 
    def _mapTo( self, other, aMapping ):
-      """Implementation of public method mapTo( )."""
-      assert isinstance( other, Form )
-      assert isinstance( aMapping,   dict )
+      """Implementation of public method mapTo( ).  Returns aMapping extended
+      by the bindings from this Form to other, or None if other is not an
+      instance of this Form."""
+      raise NotImplementedError
 
+   def _shapeMatches( self, other ):
+      """Could 'other' be a substitution instance of this Form, judging only
+      by operators and structure (ignoring how atoms would have to be bound)?
+      Used to prefilter candidates before calling mapTo( )."""
       raise NotImplementedError
 
-   def _buildStructuredString( self, aMappedStrBuilder ):
-      """Implementation for mappedString( )."""
+   def _buildStructuredString( self, aMappedStrBuilder, path=( ) ):
+      """Implementation for mappedString( ).  'path' locates this form in the
+      form the string is built for:  the operand indices of a wff, the index
+      of a member of a FormSet and 0 or 1 for the premises or conclusions of
+      a Sequent."""
       raise NotImplementedError
 
 
 class WFF( Form ):
-   """Abstract base class for well-formed formulas."""
+   """Abstract base class for well-formed formulas.
+
+   WFFs are hash-consed.  Each structurally distinct formula is created only
+   once and then shared by every tree that contains it, so two WFFs are equal
+   exactly when they are the same object.  Instances are immutable and carry
+   a precomputed structural hash and a unique id, so they can be used freely
+   as dict keys and set members.
+   """
+   __slots__ = ( )
+
+   # Intern table shared by all WFF classes.  Keys are ( symbol, ) for atomic
+   # wffs and ( operator, operand, ... ) for structured wffs.
+   _internTable = weakref.WeakValueDictionary( )
+   _internLock  = threading.Lock( )
+   _idCounter   = itertools.count( )
+
+   # Standard Methods
+   def __eq__( self, other ):
+      """Is this wff equal to other?  Since wffs are interned, this is an
+      identity test.
+      Category:      Predicate.
+      Returns:       boolean.
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      return self is other
+
+   def __ne__( self, other ):
+      """Is this wff not equal to other?
+      Category:      Predicate.
+      Returns:       boolean.
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      return self is not other
+
+   def __hash__( self ):
+      """Return the precomputed structural hash of the wff."""
+      return self._hash
+
+   def __setattr__( self, name, value ):
+      raise AttributeError( '{0} instances are immutable.'.format( type(self).__name__ ) )
+
+   def __delattr__( self, name ):
+      raise AttributeError( '{0} instances are immutable.'.format( type(self).__name__ ) )
+
+   def __copy__( self ):
+      """WFFs are immutable and interned; a copy is the wff itself."""
+      return self
+
+   def __deepcopy__( self, memoDict ):
+      """WFFs are immutable and interned; a deep copy is the wff itself."""
+      return self
+
+   # Extension
+   def id( self ):
+      """Return the unique id assigned to this wff when it was interned.
+      Category:      Pure Function.
+      Returns:       (int)
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      return self._id
+
+   @staticmethod
+   def internedCount( ):
+      """Return the number of distinct wffs currently interned.
+      Category:      Pure Function.
+      Returns:       (int)
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      return len( WFF._internTable )
+
+   def subWFFAt( self, path ):
+      """Return the sub-wff at path:  a tuple of operand indices leading down
+      from this wff, so ( ) is the wff itself and ( 1, 0 ) the first operand
+      of its second operand.
+      Category:      Pure Function.
+      Returns:       (WFF)
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'path' must be a tuple of int.
+                     [IndexError]     Each index must be that of an operand.
+      """
+      Validation.requireType( path, tuple, 'path' )
+      Validation.requireMembers( path, int, 'path' )
+
+      wff = self
+      for index in path:
+         wff = wff.subordinates( )[ index ]
+
+      return wff
+
+   def replaceAt( self, path, newSubWFF ):
+      """Return a copy of this wff with the sub-wff at path (see subWFFAt( ))
+      replaced by newSubWFF.  Only the wffs along the path are rebuilt; every
+      other branch, and every other occurrence of the replaced sub-wff, is
+      shared with this wff.
+      Category:      Pure Function.
+      Returns:       (WFF)
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'path' must be a tuple of int.
+                     [AssertionError] 'newSubWFF' must be a WFF.
+                     [IndexError]     Each index must be that of an operand.
+      """
+      Validation.requireType( path,      tuple, 'path' )
+      Validation.requireType( newSubWFF, WFF,   'newSubWFF' )
+      Validation.requireMembers( path, int, 'path' )
+
+      return self._replaceAt( path, newSubWFF )
+
+   def pathsOf( self, subWFF ):
+      """Return the path (see subWFFAt( )) of every occurrence of subWFF in
+      this wff, in preorder.
+      Category:      Pure Function.
+      Returns:       (list) of tuple.
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'subWFF' must be a WFF.
+      """
+      Validation.requireType( subWFF, WFF, 'subWFF' )
+
+      paths   = [ ]
+      pending = [ ( ( ), self ) ]
+      while pending:
+         path, wff = pending.pop( )
+         if wff is subWFF:
+            paths.append( path )
+            continue
+
+         operands = wff.subordinates( )
+         for index in range( len( operands ) - 1, -1, -1 ):
+            pending.append( ( path + ( index, ), operands[ index ] ) )
+
+      return paths
+
+   def _replaceAt( self, path, newSubWFF ):
+      """Implementation of replaceAt( ), without validation."""
+      ancestors = [ ]
+      wff       = self
+      for index in path:
+         ancestors.append( wff )
+         wff = wff.subordinates( )[ index ]
+
+      result = newSubWFF
+      for depth in range( len( path ) - 1, -1, -1 ):
+         parent   = ancestors[ depth ]
+         operands = list( parent.subordinates( ) )
+         operands[ path[ depth ] ] = result
+         result   = StructuredWFF( parent.primary( ), *operands )
+
+      return result
+
+   # Specialization of Form
+   def _buildAtomList( self, lst, seen ):
+      """Implementation of public method atomList( )."""
+      for sym in self._atomTuple( ):
+         if sym not in seen:
+            seen.add( sym )
+            lst.append( sym )
+
+      return lst
+
+   def _shapeKey( self ):
+      """Return operatorStructure( ) as a hashable tuple (cached)."""
+      shape = self._shape
+      if shape is None:
+         shape = tuple( self.operatorStructure( ) )
+         object.__setattr__( self, '_shape', shape )
+
+      return shape
+
    # Contract
    def copyWithSubstitutedSubWFF( self, subWFFOfThis, newSubWFF ):
       '''Similar to replacing some substring with another, this function
@@ -199,31 +394,55 @@ class WFF( Form ):
       '''
       raise NotImplementedError
 
+   def _atomTuple( self ):
+      """Return the distinct atom symbols of the wff, in order of first
+      occurrence (cached)."""
+      raise NotImplementedError
+
+   @staticmethod
+   def _intern( cls, key, initializer ):
+      """Return the interned instance of 'cls' for 'key', creating it with
+      initializer( inst ) if it does not yet exist."""
+      inst = WFF._internTable.get( key )
+      if inst is None:
+         with WFF._internLock:
+            inst = WFF._internTable.get( key )
+            if inst is None:
+               inst = object.__new__( cls )
+               initializer( inst )
+               object.__setattr__( inst, '_id', next( WFF._idCounter ) )
+               object.__setattr__( inst, '_atoms', None )
+               object.__setattr__( inst, '_shape', None )
+               WFF._internTable[ key ] = inst
+
+      return inst
+
 
 class AtomicWFF( WFF ):
    """Implementation of atomic well-formed formulas."""
+   __slots__ = ( '_sym', '_hash', '_id', '_atoms', '_shape', '__weakref__' )
+
    # Standard Methods
-   def __init__( self, aPropSym ):
-      """Initialize a new instance of this class.
-      Category:      Mutator.
-      Returns:       Nothing.
-      Side Effects:  Initialize an instance.
-      Preconditions: None.
+   def __new__( cls, aPropSym ):
+      """Return the unique instance of this class for 'aPropSym'.
+      Category:      Pure Function.
+      Returns:       (AtomicWFF)
+      Side Effects:  Interns a new instance if this is the first request for
+                     'aPropSym'.
+      Preconditions: [AssertionError] aPropSym must be a str.
       """
-      assert isinstance( aPropSym, str )
+      def initialize( inst ):
+         # Only a new wff is validated; the others were when they were made.
+         Validation.requireType( aPropSym, str, 'aPropSym' )
 
-      self._sym    = aPropSym
+         object.__setattr__( inst, '_sym',  aPropSym )
+         object.__setattr__( inst, '_hash', hash( ( '', aPropSym ) ) )
 
-   def __eq__( self, other ):
-      """Implement the equality operation.
-      Category:       Predicate
-      Returns:        (bool) True if 'other' is equal to self.
-      Side Effects:   None.
-      Preconditions:  None.
-      """
-      assert isinstance( self._sym, str )
+      return WFF._intern( cls, ( aPropSym, ), initialize )
 
-      return isinstance(other, AtomicWFF) and (self._sym == other._sym)
+   def __reduce__( self ):
+      """Pickle support; unpickling re-interns the wff."""
+      return ( AtomicWFF, ( self._sym, ) )
 
    def __str__( self ):
       """Implement the str() operation.
@@ -232,61 +451,38 @@ class AtomicWFF( WFF ):
       Side Effects:   None.
       Preconditions:  None.
       """
-      assert isinstance( self._sym, str )
-
       return self._sym
 
    # Specialization of Form
    def primary( self ):
       return ''
 
-   def _buildAtomList( self, lst ):
-      """Implementation of public method atomList( )."""
-      assert isinstance( lst,       list )
-
-      assert isinstance( self._sym, str  )
-
-      if self._sym not in lst:
-         lst.append( self._sym )
-
-      return lst
+   def _atomTuple( self ):
+      """Implementation of _atomTuple( )."""
+      return ( self._sym, )
 
    def _mapTo( self, other, aMapping ):
       """Implementation of public method mapTo( )."""
-      assert isinstance( other,     WFF  )
-      assert isinstance( aMapping,  dict )
-
-      assert isinstance( self._sym, str  )
-
-      if self._sym not in aMapping:
-         mapCopy = copy.copy( aMapping )
-         mapCopy[ self._sym ] = other
-         return mapCopy
-      elif aMapping[ self._sym ] == other:
+      boundWFF = aMapping.get( self._sym )
+      if boundWFF is None:
+         return aMapping.extend( self._sym, other )
+      elif boundWFF is other:
          return aMapping
       else:
-         return {}
+         return None
 
-   def makeInstance( self, aMapping ):
-      """Given a mapping, return an instance of this wff.
-      Category:      Pure Function.
-      Returns:       (WFF) A new instance of this wff.
-      Side Effects:  None.
-      Preconditions: [AssertionError] mapping must be a dictionary.
-                     [ValueError]     Each atom in this wff must be keys in
-                        mapping to some other wff.
-      """
-      assert isinstance( aMapping,       dict )
+   def _shapeMatches( self, other ):
+      """Implementation of _shapeMatches( )."""
+      return isinstance( other, WFF )
 
-      assert isinstance( self._sym, str  )
-
-      return copy.deepcopy( aMapping[ self._sym ] )
+   def _makeInstance( self, aMapping ):
+      """Implementation of public method makeInstance( ).  The bound wff is
+      shared, not copied."""
+      return aMapping[ self._sym ]
 
    # Specialization of WFF
    def __len__( self ):
       """Implementation of public method len( )."""
-      assert isinstance( self._sym, str )
-
       return 0
 
    def isAtomic( self ):
@@ -295,8 +491,6 @@ class AtomicWFF( WFF ):
       Returns:      (bool) True if the WFF is atomic.
       Side Effects: None.
       """
-      assert isinstance( self._sym, str )
-
       return True
 
    def primary( self ):
@@ -311,58 +505,57 @@ class AtomicWFF( WFF ):
    def copyWithSubstitutedSubWFF( self, subWFFOfThis, newSubWFF ):
       '''Similar to replacing some substring with another, this function
       creates a copy of this WFF replacing the subWFFOfThis (an instance of
-      WFF) with newSubWFF (an instance of WFF) in the copy.
+      WFF) with newSubWFF (an instance of WFF) in the copy.  Because wffs are
+      interned, every occurrence of subWFFOfThis is replaced.
       Category:      Function.
       Returns:       (WFF).
       Side Effects:  None.
       Preconditions: None.
       '''
-      assert isinstance( subWFFOfThis, WFF )
-      assert isinstance( newSubWFF,    WFF )
-
       if subWFFOfThis is self:
          return newSubWFF
       else:
-         return AtomicWFF( self._sym )
+         return self
 
-   def _buildStructuredString( self, aMappedStrBuilder ):
+   def _buildStructuredString( self, aMappedStrBuilder, path=( ) ):
       """Implementation for mappedString( )."""
-      assert isinstance( aMappedStrBuilder, StructuredStringBuilder )
-      assert isinstance( self._sym,         str                     )
-
       regionName = aMappedStrBuilder.beginRegion( )
       aMappedStrBuilder.setClientData( regionName, self )
+      aMappedStrBuilder.setPath( regionName, path )
       aMappedStrBuilder.appendDominant( regionName, self._sym )
       aMappedStrBuilder.endRegion( regionName )
 
 class StructuredWFF( WFF ):
    """Implementation of structured well-formed formulas."""
+   __slots__ = ( '_operator', '_operands', '_hash', '_id', '_atoms', '_shape', '__weakref__' )
+
    # Standard Methods
-   def __init__( self, operator, *operands ):
-      """Initialize a new instance of the class.
-      Category:      Mutator.
-      Returns:       Nothing.
-      Side Effects:  Initializes an instance.
+   def __new__( cls, operator, *operands ):
+      """Return the unique instance of this class for 'operator' applied to
+      'operands'.
+      Category:      Pure Function.
+      Returns:       (StructuredWFF)
+      Side Effects:  Interns a new instance if this is the first request for
+                     this operator and operands.
       Preconditions: [AssertionError] operator, must be a logical operator.
+                     [AssertionError] operands must be one or two WFFs.
       """
-      assert isinstance( operator, str )
+      def initialize( inst ):
+         # Only a new wff is validated; the others were when they were made.
+         Validation.requireType( operator, str, 'operator' )
+         Validation.require( len( operands ) in ( 1, 2 ), 'A StructuredWFF needs one or two operands, not {0}.'.format( len( operands ) ) )
+         for operand in operands:
+            Validation.requireType( operand, WFF, 'operands' )
 
-      assert len(operands) > 0
+         object.__setattr__( inst, '_operator', operator )
+         object.__setattr__( inst, '_operands', operands )
+         object.__setattr__( inst, '_hash',     hash( ( operator, ) + tuple( op._hash for op in operands ) ) )
 
-      self._operator     = operator
-      self._operands     = list(operands)
+      return WFF._intern( cls, ( operator, ) + operands, initialize )
 
-   def __eq__( self, other ):
-      """Implement the equality operation.
-      Category:       Predicate
-      Returns:        (bool) True if 'other' is equal to self.
-      Side Effects:   None.
-      Preconditions:  None.
-      """
-      assert isinstance( self._operator, str  )
-      assert isinstance( self._operands, list ) and (len(self._operands) in (1,2))
-
-      return isinstance( other, StructuredWFF ) and (self._operator == other._operator) and (self._operands == other._operands)
+   def __reduce__( self ):
+      """Pickle support; unpickling re-interns the wff."""
+      return ( StructuredWFF, ( self._operator, ) + self._operands )
 
    def __str__( self ):
       """Implement the str() operation.
@@ -371,37 +564,30 @@ class StructuredWFF( WFF ):
       Side Effects:   None.
       Preconditions:  None.
       """
-      assert isinstance( self._operator, str  )
-      assert isinstance( self._operands, list ) and (len(self._operands) in (1,2))
-
       if len(self._operands) == 1:
          return '%s%s' % ( self._operator, self._operands[0] )
       else:
          return '(%s %s %s)' % ( self._operands[0], self._operator, self._operands[1] )
 
    # Specialization of Form
-   def _buildAtomList( self, lst ):
-      """Implementation of public method atomList( )."""
-      assert isinstance( lst,            list )
-
-      assert isinstance( self._operator, str  )
-      assert isinstance( self._operands, list ) and (len(self._operands) in (1,2))
+   def _atomTuple( self ):
+      """Implementation of _atomTuple( )."""
+      atoms = self._atoms
+      if atoms is None:
+         atoms = self._operands[0]._atomTuple( )
+         for subWFF in self._operands[1:]:
+            newAtoms = [ sym for sym in subWFF._atomTuple( ) if sym not in atoms ]
+            if newAtoms:
+               atoms = atoms + tuple( newAtoms )
 
-      for subWFF in self._operands:
-         subWFF._buildAtomList( lst )
+         object.__setattr__( self, '_atoms', atoms )
 
-      return lst
+      return atoms
 
    def _mapTo( self, other, aMapping ):
       """Implementation of public method mapTo( )."""
-      assert isinstance( other,          WFF  )
-      assert isinstance( aMapping,            dict )
-
-      assert isinstance( self._operator, str  )
-      assert isinstance( self._operands, list ) and (len(self._operands) in (1,2))
-
       if (not isinstance(other, StructuredWFF)) or (self._operator != other._operator) or (len(self._operands) != len(other._operands)):
-         return { }
+         return None
 
       if len(self._operands) == 1:
          # Unary Operation
@@ -410,38 +596,34 @@ class StructuredWFF( WFF ):
       else:
          # Binary Operation
          subMap = self._operands[0]._mapTo( other._operands[0], aMapping )
-         if subMap != { }:
+         if subMap is not None:
             return self._operands[1]._mapTo( other._operands[1], subMap )
          else:
-            return { }
+            return None
 
-   def makeInstance( self, aMapping ):
-      """Given a mapping, return an instance of this wff.
-      Category:      Pure Function.
-      Returns:       (WFF) A new instance of this wff.
-      Side Effects:  None.
-      Preconditions: [AssertionError] mapping must be a dictionary.
-                     [ValueError]     Each atom in this wff must be keys in
-                        mapping to some other wff.
-      """
-      assert isinstance( aMapping,            dict )
+   def _shapeMatches( self, other ):
+      """Implementation of _shapeMatches( )."""
+      if (not isinstance(other, StructuredWFF)) or (self._operator != other._operator) or (len(self._operands) != len(other._operands)):
+         return False
 
-      assert isinstance( self._operator, str  )
-      assert isinstance( self._operands, list ) and (len(self._operands) in (1,2))
+      for patternOperand, otherOperand in zip( self._operands, other._operands ):
+         if not patternOperand._shapeMatches( otherOperand ):
+            return False
 
+      return True
+
+   def _makeInstance( self, aMapping ):
+      """Implementation of public method makeInstance( )."""
       if len(self._operands) == 1:
-         return StructuredWFF( self._operator, self._operands[0].makeInstance( aMapping ) )
+         return StructuredWFF( self._operator, self._operands[0]._makeInstance( aMapping ) )
 
       else:
-         return StructuredWFF( self._operator, self._operands[0].makeInstance( aMapping ),
-                                               self._operands[1].makeInstance( aMapping ) )
+         return StructuredWFF( self._operator, self._operands[0]._makeInstance( aMapping ),
+                                               self._operands[1]._makeInstance( aMapping ) )
 
    # Specialization of WFF
    def __len__( self ):
       """Implementation of public method len( )."""
-      assert isinstance( self._operator, str  )
-      assert isinstance( self._operands, list ) and (len(self._operands) in (1,2))
-
       return len( self._operands )
 
    def primary( self ):
@@ -454,9 +636,9 @@ class StructuredWFF( WFF ):
       return self._operator
 
    def subordinates( self ):
-      """Return a list of the subordinate wffs.
+      """Return the subordinate wffs.
       Cateogry:      Pure Function.
-      Returns:       (list)
+      Returns:       (tuple)
       Side Effects:  None.
       Preconditions: None.
       """
@@ -465,44 +647,39 @@ class StructuredWFF( WFF ):
    def copyWithSubstitutedSubWFF( self, subWFFOfThis, newSubWFF ):
       '''Similar to replacing some substring with another, this function
       creates a copy of this WFF replacing the subWFFOfThis (an instance of
-      WFF) with newSubWFF (an instance of WFF) in the copy.
+      WFF) with newSubWFF (an instance of WFF) in the copy.  Because wffs are
+      interned, every occurrence of subWFFOfThis is replaced.  Branches which
+      do not contain subWFFOfThis are shared with this wff.  To replace a
+      single occurrence, see replaceAt( ).
       Category:      Function.
       Returns:       (WFF).
       Side Effects:  None.
       Preconditions: None.
       '''
-      assert isinstance( subWFFOfThis, WFF )
-      assert isinstance( newSubWFF,    WFF )
-
       if subWFFOfThis is self:
          return newSubWFF
       else:
-         theOperator = self._operator
-         theOperands = [ ]
-         for op in self._operands:
-            theOperands.append( op.copyWithSubstitutedSubWFF(subWFFOfThis, newSubWFF) )
-
-         return StructuredWFF( theOperator, *theOperands )
+         theOperands = tuple( op.copyWithSubstitutedSubWFF(subWFFOfThis, newSubWFF) for op in self._operands )
+         if all( new is old for new, old in zip( theOperands, self._operands ) ):
+            return self
+         return StructuredWFF( self._operator, *theOperands )
 
-   def _buildStructuredString( self, aMappedStrBuilder ):
+   def _buildStructuredString( self, aMappedStrBuilder, path=( ) ):
       """Implementation for mappedString( )."""
-      assert isinstance( aMappedStrBuilder, StructuredStringBuilder )
-      assert isinstance( self._operator,    str  )
-      assert isinstance( self._operands,    list ) and (len(self._operands) in (1,2))
-
       regionName = aMappedStrBuilder.beginRegion( )
       aMappedStrBuilder.setClientData( regionName, self )
+      aMappedStrBuilder.setPath( regionName, path )
 
       if len(self._operands) == 1:
          aMappedStrBuilder.appendDominant( regionName, self._operator )
-         self._operands[0]._buildStructuredString( aMappedStrBuilder )
+         self._operands[0]._buildStructuredString( aMappedStrBuilder, path + ( 0, ) )
       else:
          aMappedStrBuilder.append( '(' )
-         self._operands[0]._buildStructuredString( aMappedStrBuilder )
+         self._operands[0]._buildStructuredString( aMappedStrBuilder, path + ( 0, ) )
          aMappedStrBuilder.append( ' ' )
          aMappedStrBuilder.appendDominant( regionName, self._operator )
          aMappedStrBuilder.append( ' ' )
-         self._operands[1]._buildStructuredString( aMappedStrBuilder )
+         self._operands[1]._buildStructuredString( aMappedStrBuilder, path + ( 1, ) )
          aMappedStrBuilder.append( ')' )
 
       aMappedStrBuilder.endRegion( regionName )
@@ -517,13 +694,20 @@ class FormSet( Form ):
       Side Effects:  Initializes an instance.
       Preconditions: [AssertionError] set must be a list or None.
       """
-      assert isinstance( forms, list ) or ( forms is None )
+      Validation.requireType( forms, ( list, type( None ) ), 'forms' )
+      if forms is not None:
+         Validation.requireMembers( forms, Form, 'forms' )
 
       if forms is None:
          self._set = [ ]
       else:
          self._set = forms
 
+      # Multiplicity of each hashable (WFF) member, for O(1) membership tests.
+      self._members = { }
+      for form in self._set:
+         self._indexMember( form )
+
       self._optimizeForMapTo( )
 
    def _optimizeForMapTo( self ):
@@ -536,35 +720,34 @@ class FormSet( Form ):
       # that those in the set with least-used operator structures are placed first.
       # 
       opStructBin  = { }
-      atomOnlyWFFs = [ ]
       for form in self._set:
-         # Convert the operatorStructure list into a string
-         opStructString = ' '.join( form.operatorStructure( ) )
+         # The operatorStructure as a tuple
+         opStructKey = form._shapeKey( )
 
          # Bin the forms
-         if opStructString in opStructBin:
-            opStructBin[ opStructString ].append( form )
+         if opStructKey in opStructBin:
+            opStructBin[ opStructKey ].append( form )
          else:
-            opStructBin[ opStructString ] = [ form ]
+            opStructBin[ opStructKey ] = [ form ]
 
       # Create a second set of bins keyed by the number of forms in each opStructBin
       opStructBinSizes = { }
       largestOpStructBin = 0
-      for opStructString, forms in opStructBin.items( ):
+      for opStructKey, forms in opStructBin.items( ):
          binSize = len(forms)
          largestOpStructBin = max( binSize, largestOpStructBin )
 
          if binSize in opStructBinSizes:
-            opStructBinSizes[ binSize ].append( opStructString )
+            opStructBinSizes[ binSize ].append( opStructKey )
          else:
-            opStructBinSizes[ binSize ] = [ opStructString ]
+            opStructBinSizes[ binSize ] = [ opStructKey ]
 
       # Construct a new set sorted by binSize (smallest to largest)
       sortedForms = [ ]
       for binSize in range( 1, largestOpStructBin + 1 ):
          if binSize in opStructBinSizes:
-            for formStructString in opStructBinSizes[ binSize ]:
-               formsOfThisKind = opStructBin[ formStructString ]
+            for formStructKey in opStructBinSizes[ binSize ]:
+               formsOfThisKind = opStructBin[ formStructKey ]
                sortedForms.extend( formsOfThisKind )
 
       self._set = sortedForms
@@ -576,9 +759,7 @@ class FormSet( Form ):
       Side Effects:   None.
       Preconditions:  None.
       """
-      assert isinstance( self._set, list )
-
-      if not isinstance( other, WFFSet ):
+      if not isinstance( other, FormSet ):
          return False
 
       for form in self._set:
@@ -586,9 +767,11 @@ class FormSet( Form ):
             return False
 
       for form in other:
-         if form not in self._set:
+         if form not in self:
             return False
 
+      return True
+
    def __str__( self ):
       """Implement the str() operation.
       Category:       Pure Function.
@@ -596,8 +779,6 @@ class FormSet( Form ):
       Side Effects:   None.
       Preconditions:  None.
       """
-      assert isinstance( self._set, list )
-
       result = ''
 
       isFirst = True
@@ -627,104 +808,65 @@ class FormSet( Form ):
    def primary( self ):
       return '{[()]}'
 
-   def atomList( self, lst=None ):
-      """Return a list of all the atomic formulas in the WFF.
-      Cateogry:      Pure Function.
-      Returns:       (list) A list of atomic formulas.
-      Side Effects:  None.
-      Preconditions: None.
-      """
-      assert isinstance( lst,       list ) or ( lst is None )
-
-      assert isinstance( self._set, list )
-
-      if lst is None:
-         atomList = [ ]
-      else:
-         atomList = lst
-
+   def _buildAtomList( self, lst, seen ):
+      """Implementation of public method atomList( )."""
       for form in self:
-         form.atomList( atomList )
+         form._buildAtomList( lst, seen )
 
-      return atomList
+      return lst
 
    def _mapTo( self, anInstSet, aMap ):
       """Implementation of public method mapTo( )."""
-      assert isinstance( anInstSet, FormSet )
-      assert isinstance( aMap,      dict    )
-
-      assert isinstance( self._set, list    )
-
       if len( self ) == len( anInstSet ):
          return FormSet._mapSets( self._set, anInstSet._set, aMap )
       else:
-         return { }
-
-   def makeInstance( self, aMap ):
-      """Given a mapping, return an instance of this wff.
-      Category:      Pure Function.
-      Returns:       (WFF) A new instance of this wff.
-      Side Effects:  None.
-      Preconditions: [AssertionError] mapping must be a dictionary.
-                     [ValueError]     Each atom in this wff must be keys in
-                        mapping to some other wff.
-      """
-      assert isinstance( aMap,      dict )
+         return None
 
-      assert isinstance( self._set, list )
+   def _shapeMatches( self, other ):
+      """Implementation of _shapeMatches( )."""
+      return isinstance( other, FormSet ) and ( len( self ) == len( other ) )
 
+   def _makeInstance( self, aMap ):
+      """Implementation of public method makeInstance( )."""
       instSet = FormSet( )
 
       for prop in self:
-         instSet.append( prop.makeInstance( aMap ) )
+         instSet.append( prop._makeInstance( aMap ) )
 
       return instSet
 
    # Extension
    def __len__( self ):
       """Implementation of public method len( )."""
-      assert isinstance( self._set, list )
-
       return len( self._set )
 
    def __getitem__( self, key ):
       """Implementation of rvalue subscript operator."""
-      assert isinstance( key,       int  )
-
-      assert isinstance( self._set, list )
-
       return self._set[ key ]
 
    def __setitem__( self, key, value ):
       """Implementation of lvalue subscript operator."""
-      assert isinstance( key,       int  )
-      assert isinstance( value,     Form )
-
-      assert isinstance( self._set, list )
+      Validation.requireType( value, Form, 'value' )
 
+      self._unindexMember( self._set[ key ] )
       self._set[ key ] = value
+      self._indexMember( value )
 
    def __delitem__( self, key ):
       """Implementation of del."""
-      assert isinstance( key,       int  )
-
-      assert isinstance( self._set, list )
-
+      self._unindexMember( self._set[ key ] )
       del self._set[ key ]
 
    def __iter__( self ):
       """Implementation of iter( )."""
-      assert isinstance( self._set, list )
-
       return iter( self._set )
 
    def __contains__( self, member ):
       """Implementation of in."""
-      assert isinstance( member,    Form )
-
-      assert isinstance( self._set, list )
-
-      return member in self._set
+      if isinstance( member, WFF ):
+         return member in self._members
+      else:
+         return member in self._set
 
    def append( self, member ):
       """Append a new object to the end of the set.
@@ -733,70 +875,181 @@ class FormSet( Form ):
       Side Effects:  Add 'member' to the end of the set.
       Preconditions: [AssertionError] 'member' must be an instance of Form.
       """
-      assert isinstance( member,    Form )
-
-      assert isinstance( self._set, list )
+      Validation.requireType( member, Form, 'member' )
 
       self._set.append( member )
+      self._indexMember( member )
+
+   def _indexMember( self, member ):
+      """Record 'member' in the membership index."""
+      if isinstance( member, WFF ):
+         self._members[ member ] = self._members.get( member, 0 ) + 1
+
+   def _unindexMember( self, member ):
+      """Remove one occurrence of 'member' from the membership index."""
+      if isinstance( member, WFF ):
+         count = self._members[ member ] - 1
+         if count == 0:
+            del self._members[ member ]
+         else:
+            self._members[ member ] = count
+
+   def iterMappings( self, anInstSet, aMapping=None ):
+      """Generate every mapping of the forms of this set one-to-one onto the
+      forms of anInstSet (see mapTo( )).
+      Category:      Generator.
+      Returns:       (iterator) Each consistent mapping (Substitution),
+                     extending aMapping.  Nothing is generated if anInstSet is
+                     not a substitution instance of this set.
+      Side Effects:  None.
+      Preconditions: [AssertionError] anInstSet must be a FormSet.
+                     [AssertionError] aMapping must be a dict, Substitution or None.
+      """
+      Validation.requireType( anInstSet, FormSet, 'anInstSet' )
+      Validation.requireMapping( aMapping, 'aMapping' )
+
+      aMapping = Substitution.fromMapping( aMapping )
+
+      if len( self ) == len( anInstSet ):
+         return FormSet._iterMapSets( self._set, anInstSet._set, aMapping )
+      else:
+         return iter( ( ) )
 
    @staticmethod
    def _mapSets( l1, l2, aMapping ):
-      """Implementation of public method _mapTo( )."""
-      assert isinstance( l1,  list )
-      assert isinstance( l2,  list )
-      assert isinstance( aMapping, dict )
-
+      """Implementation of public method _mapTo( ).  Returns the first
+      consistent mapping of l1 onto l2, or None if there is none."""
       if len(l1) == 0:
          return aMapping
-      else:
-         for idx1 in range(len(l1)):
-            f1 = l1[idx1]
-
-            for idx2 in range(len(l2)):
-               f2 = l2[idx2]
-
-               m_copy = copy.deepcopy( aMapping )
-               m_copy = f1.mapTo(f2, m_copy)
-
-               if len( m_copy ) > 0:
-                  l1_copy = copy.copy( l1 )
-                  l1_copy.pop( idx1 )
 
-                  l2_copy = copy.copy( l2 )
-                  l2_copy.pop( idx2 )
+      for mapping in FormSet._iterMapSets( l1, l2, aMapping ):
+         return mapping
 
-                  m_copy = FormSet._mapSets( l1_copy, l2_copy, m_copy )
+      return None
 
-                  if len( m_copy ) > 0:
-                     return m_copy
-
-         return { }
+   @staticmethod
+   def _iterMapSets( patterns, instances, aMapping, matchers=None ):
+      """Generate every consistent mapping which sends each form in 'patterns'
+      to a distinct form in 'instances'.
+
+      The instances are bucketed by operatorStructure( ) so each pattern is
+      only ever tried against instances of a compatible shape.  The search
+      then assigns the most constrained pattern first (fewest remaining
+      candidates under the atom bindings made so far) and abandons a branch
+      as soon as any unassigned pattern has no candidate left.  Patterns
+      whose atoms are all bound are resolved by a direct lookup of their
+      instantiation.
+
+      'matchers', if supplied, is a list parallel to 'patterns' of callables
+      f( instance, mapping ) -> mapping or None used in place of pattern._mapTo.
+      """
+      if len( patterns ) == 0:
+         yield aMapping
+         return
+
+      if len( patterns ) > len( instances ):
+         return
+
+      if matchers is None:
+         matchers = [ pattern._mapTo for pattern in patterns ]
+
+      # Bucket the instances by operator structure.
+      buckets         = { }      # shape key : [ instance index, ... ]
+      instanceIndices = { }      # instance WFF : [ instance index, ... ]
+      for instIdx, instance in enumerate( instances ):
+         buckets.setdefault( instance._shapeKey( ), [ ] ).append( instIdx )
+         if isinstance( instance, WFF ):
+            instanceIndices.setdefault( instance, [ ] ).append( instIdx )
+
+      # The candidate instances of each pattern are the members of every
+      # bucket whose shape the pattern accepts.
+      shapeCache  = { }
+      candidates  = [ ]
+      patternAtoms = [ ]
+      for pattern in patterns:
+         patternKey = pattern._shapeKey( )
+         patternCandidates = [ ]
+         for bucketKey, bucketMembers in buckets.items( ):
+            cacheKey = ( patternKey, bucketKey )
+            compatible = shapeCache.get( cacheKey )
+            if compatible is None:
+               compatible = pattern._shapeMatches( instances[ bucketMembers[0] ] )
+               shapeCache[ cacheKey ] = compatible
+
+            if compatible:
+               patternCandidates.extend( bucketMembers )
+
+         if len( patternCandidates ) == 0:
+            return
+
+         candidates.append( patternCandidates )
+         patternAtoms.append( pattern.atomList( ) if isinstance( pattern, WFF ) else None )
+
+      used = [ False ] * len( instances )
+
+      def options( patIdx, mapping ):
+         # Every ( instance index, extended mapping ) still open to patIdx.
+         atoms = patternAtoms[ patIdx ]
+         if (atoms is not None) and all( sym in mapping for sym in atoms ):
+            # Fully bound:  the only possible instance is the instantiation.
+            target = patterns[ patIdx ]._makeInstance( mapping )
+            return [ ( instIdx, mapping ) for instIdx in instanceIndices.get( target, ( ) )
+                                          if not used[ instIdx ] ]
+
+         matcher = matchers[ patIdx ]
+         result  = [ ]
+         for instIdx in candidates[ patIdx ]:
+            if not used[ instIdx ]:
+               subMap = matcher( instances[ instIdx ], mapping )
+               if subMap is not None:
+                  result.append( ( instIdx, subMap ) )
+         return result
 
-   def _buildStructuredString( self, aMappedStrBuilder ):
+      def search( mapping, unassigned ):
+         if len( unassigned ) == 0:
+            yield mapping
+            return
+
+         # Choose the most constrained pattern; fail early on a dead end.
+         bestPattern = None
+         bestOptions = None
+         for patIdx in unassigned:
+            patOptions = options( patIdx, mapping )
+            if len( patOptions ) == 0:
+               return
+
+            if (bestOptions is None) or (len( patOptions ) < len( bestOptions )):
+               bestPattern = patIdx
+               bestOptions = patOptions
+               if len( bestOptions ) == 1:
+                  break
+
+         remaining = [ patIdx for patIdx in unassigned if patIdx != bestPattern ]
+         for instIdx, subMap in bestOptions:
+            used[ instIdx ] = True
+            yield from search( subMap, remaining )
+            used[ instIdx ] = False
+
+      yield from search( aMapping, list( range( len( patterns ) ) ) )
+
+   def _buildStructuredString( self, aMappedStrBuilder, path=( ) ):
       """Implementation for mappedString( )."""
-      assert isinstance( aMappedStrBuilder, StructuredStringBuilder )
-
-      assert isinstance( self._set, list )
-
+      # The members are the region's subordinates; it has no dominant.
       regionName = aMappedStrBuilder.beginRegion( )
       aMappedStrBuilder.setClientData( regionName, self )
-      aMappedStrBuilder.beginDominantMember( regionName )
+      aMappedStrBuilder.setPath( regionName, path )
 
-      isFirst = True
-      for entry in self._set:
-         if isFirst:
-            isFirst = False
-         else:
+      for index, entry in enumerate( self._set ):
+         if index > 0:
             aMappedStrBuilder.append( ', ' )
 
          if isinstance( entry, Sequent ):
             aMappedStrBuilder.append( '(' )
-            entry._buildMappedString( aMappedStrBuilder )
+            entry._buildStructuredString( aMappedStrBuilder, path + ( index, ) )
             aMappedStrBuilder.append( ')' )
          else:
-            entry._buildMappedString( aMappedStrBuilder )
+            entry._buildStructuredString( aMappedStrBuilder, path + ( index, ) )
 
-      aMappedStrBuilder.endDominantMember( regionName )
       aMappedStrBuilder.endRegion( regionName )
 
 
@@ -820,11 +1073,11 @@ class Sequent( Form ):
                      [AssertionError] conclusions must be a FormSet.
                      [AssertionError] isNested must be bool.
       """
-      assert isinstance( premiseFormSet,    FormSet ) or ( premiseFormSet is None )
-      assert isinstance( conclusionFormSet, FormSet ) or ( conclusionFormSet is None )
+      Validation.requireType( premiseFormSet,    ( FormSet, type( None ) ), 'premiseFormSet' )
+      Validation.requireType( conclusionFormSet, ( FormSet, type( None ) ), 'conclusionFormSet' )
 
       if (premiseFormSet is not None) or (conclusionFormSet is not None):
-         assert (premiseFormSet is not None) and (conclusionFormSet is not None)
+         Validation.require( (premiseFormSet is not None) and (conclusionFormSet is not None), 'A Sequent needs both form sets or neither.' )
 
       if premiseFormSet is None:
          self._premiseFormSet = FormSet( )
@@ -843,13 +1096,11 @@ class Sequent( Form ):
       Side Effects:   None.
       Preconditions:  None.
       """
-      assert isinstance( aSeq,                    Sequent )
-
-      assert isinstance( self._premiseFormSet,    FormSet )
-      assert isinstance( self._conclusionFormSet, FormSet )
+      if not isinstance( aSeq, Sequent ):
+         return False
 
-      return     self._premiseFormSet == aSet._premiseFormSet       \
-             and self._conclusionFormSet == aSet._conclusionFormSet
+      return     self._premiseFormSet == aSeq._premiseFormSet       \
+             and self._conclusionFormSet == aSeq._conclusionFormSet
 
    def __str__( self ):
       """Implement the str() operation.
@@ -858,9 +1109,6 @@ class Sequent( Form ):
       Side Effects:   None.
       Preconditions:  None.
       """
-      assert isinstance( self._premiseFormSet,    FormSet )
-      assert isinstance( self._conclusionFormSet, FormSet )
-
       result = ''
 
       if (len(self._premiseFormSet) == 0) and (len(self._conclusionFormSet) == 0):
@@ -877,25 +1125,10 @@ class Sequent( Form ):
    def primary( self ):
       return '|-'
 
-   def atomList( self, lst=None ):
-      """Return a list of all the atomic formulas in the WFF.
-      Cateogry:      Pure Function.
-      Returns:       (list) A list of atomic formulas.
-      Side Effects:  None.
-      Preconditions: None.
-      """
-      assert isinstance( lst,                     list    ) or ( lst is None )
-
-      assert isinstance( self._premiseFormSet,    FormSet )
-      assert isinstance( self._conclusionFormSet, FormSet )
-
-      if lst is None:
-         atomList = [ ]
-      else:
-         atomList = lst
-
-      premiseAtoms = self._premiseFormSet.atomList( atomList )
-      return self._conclusionFormSet.atomList( premiseAtoms )
+   def _buildAtomList( self, lst, seen ):
+      """Implementation of public method atomList( )."""
+      self._premiseFormSet._buildAtomList( lst, seen )
+      return self._conclusionFormSet._buildAtomList( lst, seen )
 
    def _mapTo( self, anInst, aMapping ):
       """Implementation of public method mapTo( ).
@@ -905,37 +1138,23 @@ class Sequent( Form ):
       For this reason conclusion form set of the sequent is included in the
       mapTo recursive sequence.
       """
-      assert isinstance( self._premiseFormSet,    FormSet )
-      assert isinstance( self._conclusionFormSet, FormSet )
-
-      assert isinstance( anInst,                  Sequent )
-      assert isinstance( aMapping,                dict    )
-
-      subMap = self.mapPremisesTo( anInst._premiseFormSet, aMapping )
+      subMap = self._premiseFormSet._mapTo( anInst._premiseFormSet, aMapping )
+      if subMap is None:
+         return None
 
       # Map to the conclusion
-      subMap = self._conclusionFormSet.mapTo( anInst._conclusionFormSet, subMap )
-      if subMap == { }:
-         return { }
-
-      return subMap
-
-   def makeInstance( self, aMapping ):
-      """Given a mapping, return an instance of this wff.
-      Category:      Pure Function.
-      Returns:       (WFF) A new instance of this wff.
-      Side Effects:  None.
-      Preconditions: [AssertionError] mapping must be a dictionary.
-                     [ValueError]     Each atom in this wff must be keys in
-                        mapping to some other wff.
-      """
-      assert isinstance( aMapping,                dict    )
-
-      assert isinstance( self._premiseFormSet,    FormSet )
-      assert isinstance( self._conclusionFormSet, FormSet )
-
-      premiseSetInst = self._premiseFormSet.makeInstance( aMapping )
-      conclusionSetInst = self._conclusionFormSet.makeInstance( aMapping )
+      return self._conclusionFormSet._mapTo( anInst._conclusionFormSet, subMap )
+
+   def _shapeMatches( self, other ):
+      """Implementation of _shapeMatches( )."""
+      return     isinstance( other, Sequent )                                    \
+             and self._premiseFormSet._shapeMatches( other._premiseFormSet )      \
+             and self._conclusionFormSet._shapeMatches( other._conclusionFormSet )
+
+   def _makeInstance( self, aMapping ):
+      """Implementation of public method makeInstance( )."""
+      premiseSetInst = self._premiseFormSet._makeInstance( aMapping )
+      conclusionSetInst = self._conclusionFormSet._makeInstance( aMapping )
       return Sequent( premiseSetInst, conclusionSetInst )
 
    def __len__( self ):
@@ -944,26 +1163,20 @@ class Sequent( Form ):
 
    # Extension
    def premiseSymbols( self ):
-      return self.premiseFormSet.atomList( )
+      return self._premiseFormSet.atomList( )
 
    def conclusionSymbols( self ):
-      return self.conclusionFormSet.atomeList( )
+      return self._conclusionFormSet.atomList( )
 
    def mapPremisesTo( self, aWFFSet, aMapping=None ):
       """Map the premises of this sequent to aWFFSet.
       Category:       Function.
-      Returns:        (dict) A mapping of Atomic WFFs from the premises in this sequent to WFFs in aWFFSet.
-      Side Effects:   Modifies map.
+      Returns:        (Substitution) A mapping of Atomic WFFs from the premises in this sequent to WFFs in aWFFSet.
+      Side Effects:   None.
       Preconditions:  [AssertionError] aWFFSet must be a FormSet.
-                      [AssertionError] map must be a dict.
+                      [AssertionError] map must be a dict, Substitution or None.
       """
-      assert isinstance( aMapping,              dict    ) or ( aMapping is None )
-
-      assert isinstance( self._premiseFormSet,    FormSet )
-      assert isinstance( self._conclusionFormSet, FormSet )
-
-      if aMapping is None:
-         aMapping = { }
+      Validation.requireType( aWFFSet, FormSet, 'aWFFSet' )
 
       return self._premiseFormSet.mapTo( aWFFSet, aMapping )
 
@@ -975,17 +1188,10 @@ class Sequent( Form ):
       Side Effects:   None
       Preconditions:  None.
       """
-      assert isinstance( self._premiseFormSet,    FormSet )
-      assert isinstance( self._conclusionFormSet, FormSet )
-
-      premiseAtoms    = self._premiseFormSet.atomList( )
-      conclusionAtoms = copy.copy( self._conclusionFormSet.atomList( ) )
+      premiseAtoms    = set( self._premiseFormSet.atomList( ) )
+      conclusionAtoms = self._conclusionFormSet.atomList( )
 
-      for premiseAtom in premiseAtoms:
-         if premiseAtom in conclusionAtoms:
-            conclusionAtoms.remove( premiseAtom )
-
-      return conclusionAtoms
+      return [ atom for atom in conclusionAtoms if atom not in premiseAtoms ]
 
    def applyTo( self, premises, additionalMappings=None ):
       """Attempt to infer a list of conclusions by first mapping the premises
@@ -999,38 +1205,30 @@ class Sequent( Form ):
                        [AssertionError] additionalMappings must be a dict or None.
                        [Exception]      set must be an instance of self._premises.
       """
-      assert isinstance( premises,                FormSet )
-      assert isinstance( additionalMappings, dict    ) or ( additionalMappings is None )
-
-      assert isinstance( self._premiseFormSet,      FormSet )
-      assert isinstance( self._conclusionFormSet,   FormSet )
+      Validation.requireType( premises, FormSet, 'premises' )
 
       mapping = self._premiseFormSet.mapTo( premises, additionalMappings )
-      if mapping == {}:
+      if len( mapping ) == 0:
          raise SequentApplicationError
 
-      return self._conclusionFormSet.makeInstance( mapping )
+      return self._conclusionFormSet._makeInstance( mapping )
 
-   def _buildStructuredString( self, aMappedStrBuilder ):
+   def _buildStructuredString( self, aMappedStrBuilder, path=( ) ):
       """Implementation for mappedString( )."""
-      assert isinstance( aMappedStrBuilder, StructuredStringBuilder )
-
-      assert isinstance( self._premiseFormSet,      FormSet )
-      assert isinstance( self._conclusionFormSet,   FormSet )
-
       regionName = aMappedStrBuilder.beginRegion( )
       aMappedStrBuilder.setClientData( regionName, self )
+      aMappedStrBuilder.setPath( regionName, path )
 
       if len(self._premiseFormSet) > 0:
-         self._premiseFormSet._buildMappedString( aMappedStrBuilder )
+         self._premiseFormSet._buildStructuredString( aMappedStrBuilder, path + ( 0, ) )
          aMappedStrBuilder.append( ' ' )
          aMappedStrBuilder.appendDominant( regionName, '|-' )
          aMappedStrBuilder.append( ' ' )
-         self._conclusionFormSet._buildMappedString( aMappedStrBuilder )
+         self._conclusionFormSet._buildStructuredString( aMappedStrBuilder, path + ( 1, ) )
       else:
          aMappedStrBuilder.appendDominant( regionName, '|-' )
          aMappedStrBuilder.append( ' ' )
-         self._conclusionFormSet._buildMappedString( aMappedStrBuilder )
+         self._conclusionFormSet._buildStructuredString( aMappedStrBuilder, path + ( 1, ) )
 
       aMappedStrBuilder.endRegion( regionName )
 
@@ -1042,9 +1240,6 @@ class Sequent( Form ):
       Side Effects:  None.
       Preconditions: None.
       """
-      assert isinstance( self._premiseFormSet,    FormSet )
-      assert isinstance( self._conclusionFormSet, FormSet )
-
       return self._premiseFormSet
 
    def conclusionFormSet( self ):
@@ -1055,9 +1250,6 @@ class Sequent( Form ):
       Side Effects:  None.
       Preconditions: None.
       """
-      assert isinstance( self._premiseFormSet,    FormSet )
-      assert isinstance( self._conclusionFormSet, FormSet )
-
       return self._conclusionFormSet
 
    def makeConclusionSetInstance( self, aMapping ):
@@ -1065,15 +1257,12 @@ class Sequent( Form ):
       Category:      Pure Function.
       Returns:       (WFF) A new substitution instance of the conclusion FormSet.
       Side Effects:  None.
-      Preconditions: [AssertionError] mapping must be a dictionary.
+      Preconditions: [AssertionError] mapping must be a dict or Substitution.
                      [ValueError]     Each atom in this wff must be keys in
                         mapping to some other wff.
       """
-      assert isinstance( aMapping,                dict    )
-
-      assert isinstance( self._premiseFormSet,    FormSet )
-      assert isinstance( self._conclusionFormSet, FormSet )
+      Validation.requireMapping( aMapping, 'aMapping', optional=False )
 
-      return self._conclusionFormSet.makeInstance( aMapping )
+      return self._conclusionFormSet._makeInstance( aMapping )
 
 
@@ -1,6 +1,7 @@
 """This module implements all that's needed for parsing logic forms (wffs, sequents, etc.)"""
 
 # Parsing Tools
+import re
 from Scanner import *
 
 # Product Classes
@@ -92,7 +93,11 @@ class Token( object ):
 
 
 class WFFScanner( Scanner ):
-   """Scanner for the traditional logic notation wffs."""
+   """Scanner for the traditional logic notation wffs.
+
+   The token rules are compiled, along with the symbols of the lexicon,
+   into a single regular expression which tokenizes a string in one pass.
+   """
    # Constants
    WHITE_SPACE     = """ \t\n"""
    PUNCT           = """,;."""
@@ -114,114 +119,131 @@ class WFFScanner( Scanner ):
       Category:      Mutator.
       Returns:       Nothing.
       Side Effects:  Initializes an instance.
-      Preconditions: [AssertionError] aDict must be a dictionary.
+      Preconditions: [AssertionError] aLexList must be a list of Lexemes.
       """
       assert isinstance( aLexList, list )
 
-      Scanner.__init__( self )
       self._lexList  = aLexList
 
+      # Every spelling of a lexeme scans as its token, with the lexeme's
+      # first symbol as its canonical lexeme.
       self._lexDict = { }
-      for lexIdx,lexDef in enumerate(self._lexList):
+      for lexDef in self._lexList:
+         for sym in lexDef.symbol:
+            self._lexDict[ sym ] = ( lexDef.token, lexDef.symbol[0] )
 
-         self._lexDict[ lexDef.symbol[0] ] = lexIdx
+      self._pattern, self._rules = self._compile( )
 
-   # Specialization of Scanner
-   def _scanNextToken( self ):
-      """Consume the next token (i.e. scan past it).
-      Category:      Mutator.
-      Returns:       Token.
-      Side Effects:  Scans the next token from the source string.
-      Preconditions: The scanner must hold a Scanner buffer which wraps
-                        a string.
+      Scanner.__init__( self )
+
+   def _compile( self ):
+      """Compile the token rules into a regular expression.
+      Category:      Pure Function.
+      Returns:       (regex, list) The expression, which skips white space and
+                     matches one token in a numbered group, and for each group
+                     the pair ( token, lookup ) where lookup says whether the
+                     lexeme is looked up in the lexicon.
+      Side Effects:  None.
+      Preconditions: None.
       """
-      assert isinstance( self._lexList,     list          )
-      assert isinstance( self._lexDict,     dict          )
-      assert isinstance( self._tok,         int           ) or ( self._tok is None )
-      assert isinstance( self._buffer,      ScannerBuffer )
-      assert isinstance( self._tokPos,      int           )
-      assert isinstance( self._tokLineNum,  int           )
-      assert isinstance( self._tokColNum,   int           )
-      assert isinstance( self._tokLineText, str           )
-
-      self._buffer.consumePast( self.WHITE_SPACE )         # skip whitespace
-      theNextChar = self._buffer.peek()
-      if theNextChar == None:
-         self._buffer.setMark( )
-         return Token.EOF
-      elif theNextChar in ',':                            #    comma
-         self._buffer.setMark( )
-         self._buffer.consume( )
-         return Token.COMMA
-      elif theNextChar in self.PUNCT:                     #    punctuation
-         self._buffer.setMark( )
-         self._buffer.consume( )
-         return Token.PUNCT
-      elif theNextChar in '([{':                          #    open
-         self._buffer.setMark( )
-         self._buffer.consume( )
-         return Token.OPEN
-      elif theNextChar in ')]}':                          #    close
-         self._buffer.setMark( )
-         self._buffer.consume( )
-         return self._lookupSymbolLex( Token.CLOSE, self.peekLex() )
-      elif theNextChar in (self.ALPHA_CAP + self.DIGIT):  #    Name Symbol
-         self._buffer.setMark( )
-         self._buffer.consumePast(self.ALPHA_CAP + self.DIGIT)
-         self._buffer.consumeIf( ':' )
-         return self._lookupSymbolLex( Token.SYMBOL, self.peekLex() )
-      elif theNextChar in '-~':                           #    Negation or Op Symbol
-         self._buffer.setMark( )
-         self._buffer.consume( )
-         if self._buffer.peek( ) in '-~':
-            return self._lookupSymbolLex( Token.SYMBOL, self.peekLex() )
-         else:
-            self._buffer.consumePast( self.SYMBOL + self.SIGN )
-            return self._lookupSymbolLex( Token.SYMBOL, self.peekLex() )
-      elif theNextChar in self.SYMBOL:                    #    Op Symbol
-         self._buffer.setMark( )
-         self._buffer.consumePast( self.SYMBOL + self.SIGN )
-         return self._lookupSymbolLex( Token.SYMBOL, self.peekLex() )
-      elif theNextChar in self.OBJECT:                    #    Object Symbol
-         self._buffer.setMark( )
-         self._buffer.consume( )
-         return self._lookupSymbolLex( Token.OBJECT, self.peekLex() )
-      elif theNextChar in self.VARIABLE:                  #    Variable Symbol
-         self._buffer.setMark( )
-         self._buffer.consume( )
-         return self._lookupSymbolLex( Token.VARIABLE, self.peekLex() )
-      else:                                               #    Unknown
-         self._buffer.consume( )
-         return Token.UNKNOWN
+      def charSet( chars ):
+         return '[' + ''.join( re.escape( ch ) for ch in chars ) + ']'
+
+      rules = [
+         ( ',',                                              Token.COMMA,    False ),   # comma
+         ( charSet( ';.' ),                                  Token.PUNCT,    False ),   # punctuation
+         ( charSet( '([{' ),                                 Token.OPEN,     False ),   # open
+         ( charSet( ')]}' ),                                 Token.CLOSE,    True  ),   # close
+         ( charSet( self.ALPHA_CAP + self.DIGIT ) + '+:?',   Token.SYMBOL,   True  ),   # Name Symbol
+         ( '[-~](?=[-~])',                                   Token.SYMBOL,   True  ),   # Negation
+         ( charSet( self.SYMBOL + self.SIGN ) + '+',         Token.SYMBOL,   True  ),   # Op Symbol
+         ( charSet( self.OBJECT ),                           Token.OBJECT,   True  ),   # Object Symbol
+         ( charSet( self.VARIABLE ),                         Token.VARIABLE, True  ),   # Variable Symbol
+         ]
+
+      # Lexicon symbols the rules above can't scan (e.g. unicode operators).
+      others = [ sym for sym in self._lexDict if re.fullmatch( '|'.join( rule[0] for rule in rules ), sym ) is None ]
+      if others:
+         others.sort( key=len, reverse=True )
+         rules.append( ( '|'.join( re.escape( sym ) for sym in others ), Token.SYMBOL, True ) )
+
+      rules.append( ( '.', Token.UNKNOWN, False ) )                                   # Unknown
+
+      # Trailing white space matches the final, ungrouped alternative, so the
+      # unknown rule never sees it.
+      pattern = charSet( self.WHITE_SPACE ) + '*(?:' + '|'.join( '(' + rule[0] + ')' for rule in rules ) + r'|\Z)'
+      return re.compile( pattern, re.DOTALL ), [ None ] + [ rule[1:] for rule in rules ]
 
-   # Extension
-   def _lookupSymbolLex( self, aTok, aLex ):
-      """Makes a Token.  If aLex is supplied and aTok is not None,
-      aToken is looked up in the dictionary.
+   # Specialization of Scanner
+   def _tokenize( self, aString ):
+      """Tokenize aString.
+      Category:      Pure Function.
+      Returns:       (list) of ( token, lexeme, offset ) tuples in source
+                     order, ending with the end-of-input token at offset
+                     len( aString ).
+      Side Effects:  None.
+      Preconditions: [AssertionError] aString must be a string.
+      """
+      assert isinstance( aString, str )
+
+      rules   = self._rules
+      lexDict = self._lexDict
+
+      tokens = [ ]
+      for match in self._pattern.finditer( aString ):
+         group = match.lastindex
+         if group is None:                                 # trailing white space, or end of input
+            break
+         tok, lookup = rules[ group ]
+         lex = match.group( group )
+         if lookup and ( lex in lexDict ):
+            tok, lex = lexDict[ lex ]
+         tokens.append( ( tok, lex, match.start( group ) ) )
+
+      tokens.append( ( Token.EOF, '', len( aString ) ) )
+      return tokens
+
+   def rescan( self, aPos = 0, aString=None ):
+      """Move the scan pos to aPos.
       Category:      Mutator.
       Returns:       Nothing.
-      Side Effects:  Saves the next token.
-      Preconditions: [AssertionError] aTok must be an int.
-                     [AssertionError] If supplied, aLex must be a string.
+      Side Effects:  Sets the scan pos to aPos.  If aString is supplied, it
+                     becomes the source string and is tokenized.
+      Preconditions: [AssertionError] aPos must be an integer.
       """
-      assert isinstance( aTok,              int           )
-      assert isinstance( aLex,              str           ) or ( aLex is None )
+      Scanner.rescan( self, aPos, aString )
 
-      assert isinstance( self._lexDict,     dict          )
-      assert isinstance( self._tok,         int           ) or ( self._tok is None )
-      assert isinstance( self._buffer,      ScannerBuffer )
-      assert isinstance( self._tokPos,      int           )
-      assert isinstance( self._tokLineNum,  int           )
-      assert isinstance( self._tokColNum,   int           )
-      assert isinstance( self._tokLineText, str           )
+      if aString is not None:
+         self._sequentGroups = self._findSequentGroups( )
 
-      theTok = aTok
-      theLex = aLex
-      if theLex is not None:
-         if (theTok != Token.EOF) and (theLex in self._lexDict):
-            theTok = self._lexList[ self._lexDict[ theLex ] ].token
+   # Extension
+   def opensSequent( self ):
+      """Does the next token open a parenthesized sequent?
+      Category:      Predicate.
+      Returns:       (bool) True if the next token is an open whose group
+                     holds an entailment symbol at its own level, e.g. the
+                     '(' of '( ~P |- Q & ~Q )'.
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      return self._index in self._sequentGroups
 
-      return theTok
+   def _findSequentGroups( self ):
+      """Returns the set of indexes in the token table of the opens which
+      start a parenthesized sequent.  Computed in one pass over the table by
+      matching opens with closes.
+      """
+      groups = set( )
+      opens  = [ ]
+      for index, entry in enumerate( self._tokens ):
+         tok = entry[ 0 ]
+         if tok == Token.OPEN:
+            opens.append( index )
+         elif ( tok == Token.CLOSE ) and opens:
+            opens.pop( )
+         elif ( tok == Token.ENTAILS ) and opens:
+            groups.add( opens[ -1 ] )
+      return groups
 
    def expect( self, aTok, aMsg ):
       """If the next token in the input stream is 'aTok', consume it.  Otherwise,
@@ -235,14 +257,6 @@ class WFFScanner( Scanner ):
       assert isinstance( aTok,             int           )
       assert isinstance( aMsg,             str           )
 
-      assert isinstance( self._lexDict,    dict          )
-      assert isinstance( self._tok,         int           ) or ( self._tok is None )
-      assert isinstance( self._buffer,      ScannerBuffer )
-      assert isinstance( self._tokPos,      int           )
-      assert isinstance( self._tokLineNum,  int           )
-      assert isinstance( self._tokColNum,   int           )
-      assert isinstance( self._tokLineText, str           )
-
       nextTok = self.peek( )
       if nextTok != aTok:
          raise ParseError( self.genErr( aMsg ) )
@@ -250,17 +264,34 @@ class WFFScanner( Scanner ):
 
 
 class WFFParser( object ):
-   """This class implements a parser for WFFs."""
+   """This class implements a parser for WFFs.
+
+   Infix expressions are parsed by precedence climbing over the operator
+   precedences declared in the lexicon (see Lexeme).  Whether a premise is
+   a wff or a parenthesized sequent is decided from the scanner's
+   bracket table, so no input is parsed twice.
+   """
    # Shared
-   def __init__( self ):
+   def __init__( self, aLexList=None ):
       """Initialize a new instance of Parser.
       Category:      Mutator.
       Returns:       Nothing.
       Side Effects:  Initialize an instance.
-      Preconditions: None.
+      Preconditions: [AssertionError] If supplied, aLexList must be a list of
+                        Lexemes.  Without it no operator has a precedence.
       """
+      assert isinstance( aLexList, list ) or ( aLexList is None )
+
       self._scanner = None
 
+      # Infix operator symbol -> ( level, associativity ).  Operators with no
+      # declared precedence bind loosest and do not associate.
+      self._precedence = { }
+      for lexDef in ( aLexList or [ ] ):
+         if getattr( lexDef, 'prec', None ) is not None:
+            for sym in lexDef.symbol:
+               self._precedence[ sym ] = lexDef.prec
+
    def parseProposition( self, scanner, parseFull = True ):
       """Parse a proposition from the string wrapped by scanner.
       Category:      Mutator.
@@ -307,26 +338,40 @@ class WFFParser( object ):
 
       return expr
 
-   def _parseExpr( self ):
+   def _parseExpr( self, minLevel = 0 ):
       """Parse an expression.
       Category:      Mutator.
       Returns:       (WFF) The parsed expression.
       Side Effects:  Advances the scanner pointer.
       Preconditions: [ParseError] The scanner must wrap a valid string
                         representation of an expression.
+      Implementation Notes:
+         Precedence climbing:  operands are combined by infix operators of
+         level minLevel or higher.  The right operand of an operator is
+         parsed at the next level up, or at the same level if the operator
+         is right associative.
       """
+      assert isinstance( minLevel,      int     )
+
       assert isinstance( self._scanner, Scanner )
 
-      term1 = self._parseTerm( )
+      result    = self._parseTerm( )
+      lastLevel = None
 
-      tok = self._scanner.peek()
-      if tok == Token.INFIX_OP:
+      while self._scanner.peek( ) == Token.INFIX_OP:
          binOp = self._scanner.peekLex( )
+         level, assoc = self._precedence.get( binOp, ( 0, 'NONE' ) )
+         if level < minLevel:
+            break
+         if ( level == lastLevel ) and ( assoc == 'NONE' ):
+            raise ParseError( self._scanner.genErr( "Parentheses required around '%s'." % binOp ) )
+
          self._scanner.consume( )
-         term2 = self._parseTerm( )
-         return StructuredWFF( binOp, term1, term2 )
-      else:
-         return term1
+         term2     = self._parseExpr( level if assoc == 'RIGHT' else level + 1 )
+         result    = StructuredWFF( binOp, result, term2 )
+         lastLevel = level
+
+      return result
 
    def _parseTerm( self ):
       """Parse a term.
@@ -410,18 +455,29 @@ class WFFParser( object ):
                         wff or sequent.
       Implementation Notes:
          Determining if a premise is a wff or sequent is ambiguous for LL(1)
-         parsing.  For this reason, we start parsing a proposition by saving
-         the current scanner position.  Then attempt to parse a proposition.
-         If the premise is in fact not a proposition an exception will be
-         raised.  If so, we restore the saved scanner position and try to
-         parse a sequent.
+         parsing.  Rather than parsing twice, we ask the scanner whether the
+         next token opens a group holding an entailment symbol; it finds the
+         group's extent from its bracket table.
       """
       assert isinstance( self._scanner, Scanner )
 
-      pos = self._scanner.scanPos( )
-
-      try:
-         return self.parseProposition( self._scanner, False )
-      except:
-         self._scanner.rescan( pos )
+      if ( self._scanner.peek( ) == Token.OPEN ) and self._scanner.opensSequent( ):
          return self._parseSequent( True )
+      else:
+         return self.parseProposition( self._scanner, False )
+
+
+if __name__ == "__main__":
+   # Trailing white space ends the input; it is not an unknown token.
+   import Logic
+
+   for logic in ( Logic.Gentzen, Logic.Gensler, Logic.Fitch ):
+      language = logic.language( )
+      for text in ( 'P', 'P  ', 'P\n', ' \t P \n\t' ):
+         assert str( language.parseProp( text ) ) == 'P', ( logic.name( ), text )
+
+   language = Logic.Gentzen.language( )
+   assert str( language.parseProp( 'P & Q  ' ) ) == '(P & Q)'
+   assert str( language.parseProp( 'P & Q\n' ) ) == '(P & Q)'
+   assert str( language.parseSeq( 'P > Q, P |- Q  ' ) ) == str( language.parseSeq( 'P > Q, P |- Q' ) )
+   print( 'Done!' )
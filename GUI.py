@@ -64,7 +64,8 @@
 
 
 from Proof import Proof
-from Calculus import Resolver, Inference, RegularInference, EquivalenceInference
+from Calculus import Resolver, Inference, RegularInference, EquivalenceInference, CancelToken, OperationCancelled
+from Validation import ValidationError
 from Form import *
 from Logic import Logic, Gentzen, Gensler, Fitch
 
@@ -72,6 +73,9 @@ from Logic import Logic, Gentzen, Gensler, Fitch
 from tkinter import tix, messagebox
 from GUITools import *
 
+import queue
+import threading
+
 
 TCL_ALL_EVENTS          = 0
 
@@ -79,11 +83,126 @@ TCL_ALL_EVENTS          = 0
 class CancelOperation( Exception ):
    """Exception to cancel out of the current operation."""
 
+
+class ApplicableRuleWorker( object ):
+   """Finds, on a background thread, the inference rules which apply to a
+   set of premises, and hands them to a callback on the Tk event loop.
+
+   Only the latest request matters:  submitting another cancels the one in
+   progress, and the results of cancelled requests are dropped.  Results
+   are collected by polling from the event loop, since Tk may only be used
+   from its own thread.  An unexpected error in the search is raised there
+   too, rather than passed off as no applicable rules.
+   """
+   POLL_MS = 50
+
+   def __init__( self, widget, calculus, callback ):
+      """Initialize a new instance of the class and start its thread.
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Starts a daemon thread.
+      Preconditions: [AssertionError] 'widget' a Tk widget, to schedule the polling.
+                     [AssertionError] 'calculus' a Calculus.
+                     [AssertionError] 'callback' called with the result of
+                        Calculus.applicableRules( ).
+      """
+      self._widget   = widget
+      self._calculus = calculus
+      self._callback = callback
+
+      self._requests = queue.Queue( )    # ( CancelToken, FormSet ), or None to stop
+      self._results  = queue.Queue( )    # ( CancelToken, applicable rules, exception or None )
+      self._token    = None              # The token of the latest request
+      self._pending  = False             # The latest request awaits its result
+      self._polling  = False
+
+      self._thread   = threading.Thread( target=self._run, name='ApplicableRuleWorker', daemon=True )
+      self._thread.start( )
+
+   def submit( self, premiseSet ):
+      """Find the rules applicable to premiseSet, cancelling the last request."""
+      self.cancel( )
+      self._token   = CancelToken( )
+      self._pending = True
+      self._requests.put( ( self._token, premiseSet ) )
+
+      if not self._polling:
+         self._polling = True
+         self._widget.after( ApplicableRuleWorker.POLL_MS, self._poll )
+
+   def cancel( self ):
+      """Cancel the last request; its result will not be delivered."""
+      if self._token is not None:
+         self._token.cancel( )
+      self._pending = False
+
+   def stop( self ):
+      """Cancel the last request and end the thread."""
+      self.cancel( )
+      self._requests.put( None )
+
+   def _run( self ):
+      while True:
+         request = self._requests.get( )
+         if request is None:
+            return
+
+         token, premiseSet = request
+         if token.isCancelled( ):
+            continue
+
+         error = None
+         try:
+            applicable = self._calculus.applicableRules( premiseSet, token )
+         except OperationCancelled:
+            continue
+         except ( SequentApplicationError, ValidationError ):
+            # Premises no rule can be applied to.
+            applicable = [ ]
+         except Exception as exc:
+            # Anything else is a bug; it's raised on the Tk thread by _poll( ).
+            applicable, error = [ ], exc
+
+         self._results.put( ( token, applicable, error ) )
+
+   def _poll( self ):
+      while True:
+         try:
+            token, applicable, error = self._results.get_nowait( )
+         except queue.Empty:
+            break
+
+         if ( token is self._token ) and self._pending:
+            self._pending = False
+            if error is not None:
+               self._polling = False
+               raise error
+            self._callback( applicable )
+
+      if self._pending:
+         self._widget.after( ApplicableRuleWorker.POLL_MS, self._poll )
+      else:
+         self._polling = False
+
 # #######
 # Widgets
 
 class ProofWidget( tix.ScrolledHList ):
+   """Displays a proof, one row per step and a 'ghost' row for the next step.
+
+   Redrawing is incremental:  the text of each row is kept, rows whose step
+   is unchanged are not rebuilt, and only the rows which differ from the
+   last drawing are reconfigured, added or deleted.  Only a window of rows
+   is materialized:  the visible rows and MARGIN_ROWS on either side.  The
+   window slides as the view nears its edge, releasing the rows it leaves,
+   and the vertical scrollbar is driven by the widget so that it spans the
+   whole proof.  Each selectable citation (a step or a subproof) is indexed
+   by the rows it covers, so a click toggles only the citations of the
+   clicked row.
+   """
    INDENTATION_UNIT = '|       '
+   MARGIN_ROWS      = 50        # Rows materialized above and below the view.
+   VISIBLE_ROWS     = 40        # Rows assumed visible until the view reports.
 
    def __init__( self, master, **ops ):
       """Initialize a new instance of the class.
@@ -122,77 +241,193 @@ class ProofWidget( tix.ScrolledHList ):
 
       self.proofBox.column_width(3,0)
 
-      self._selectionList = [ ]
-      self._proof         = Proof( )
+      # Styles of the rows, shared by every row.
+      self._numberStyle   = tix.DisplayStyle(tix.TEXT, refwindow=self.proofBox, padx=10, anchor=tix.E)
+      self._propStyle     = tix.DisplayStyle(tix.TEXT, refwindow=self.proofBox)
+
+      # Follow the scrolling, to materialize rows as they come into view, and
+      # drive the scrollbar in rows of the whole proof.
+      self._yScrollCommand = self.proofBox.cget( 'yscrollcommand' )
+      self.proofBox.config( yscrollcommand=self._onYScroll )
+      self.subwidget( 'vsb' ).config( command=self._onScrollbar )
+
+      self._rowSteps      = [ ]     # The step of each row (None for the ghost row).
+      self._rows          = [ ]     # ( number, prop, reason ) text of each row.
+      self._first         = 0       # The first row in the HList.
+      self._shown         = [ ]     # The rows in the HList:  _rows[ _first : _first + len( _shown ) ].
+      self._top           = 0       # The first visible row.
+      self._visible       = ProofWidget.VISIBLE_ROWS   # The number of visible rows.
+      self._slidePending  = False
+
+      self._citations     = [ ]     # Selectable citations, in order.
+      self._selected      = { }     # citation : bool
+      self._rowCitations  = { }     # row : [ citation, ... ] covering the row
+
+      self.proof          = Proof( )
+
+      # Called with no arguments whenever the selection changes.
+      self.selectionCommand = None
 
    def onEntryClicked( self, event ):
       idx = int(self.proofBox.nearest(event.y))
 
-      for entry in self._selectionList:
-         if isinstance( entry[0], int ) and ( entry[0] == idx+1 ):
-            entry[1] = not entry[ 1 ]
-         elif isinstance( entry[0], tuple ) and ( entry[0][0] <= (idx+1) <= entry[0][1] ):
-            entry[1] = not entry[ 1 ]
+      for citation in self._rowCitations.get( idx, ( ) ):
+         self._selected[ citation ] = not self._selected[ citation ]
 
-      self.after( 5, self.drawProof )
+      # After the HList has applied its own selection.
+      self.after( 5, self._drawSelection )
+      self._selectionChanged( )
 
    def wrapProof( self, proof ):
       self.proof = proof
 
-      self._selectionList = [ ]
-      selectable = self.proof.availablePremises( )
-      for entry in selectable:
-         self._selectionList.append( [ entry, False ] )
+      self._citations    = list( self.proof.availablePremises( ) )
+      self._selected     = { citation : False for citation in self._citations }
+      self._rowCitations = { }
+      for citation in self._citations:
+         for row in ProofWidget.citedRows( citation ):
+            self._rowCitations.setdefault( row, [ ] ).append( citation )
 
       self.drawProof( )
+      self._selectionChanged( )
 
    def drawProof( self ):
-      self.proofBox.delete_all( )
-
-      numberStyle        = tix.DisplayStyle(tix.TEXT, refwindow=self.proofBox, padx=10, anchor=tix.E)
-      propStyle          = tix.DisplayStyle(tix.TEXT, refwindow=self.proofBox)
-
-      # Draw the Proof Steps
-      num = None
+      # The text of the rows, reusing that of every unchanged step.
+      rowSteps = [ ]
+      rows     = [ ]
       for num,step in enumerate(self.proof):
-         s = ProofWidget.indentString(step.level, step.prop)
-         self.proofBox.add( str(num), itemtype=tix.TEXT, text=str(num+1) + '.', style=numberStyle)
-         self.proofBox.item_create( str(num), 1, itemtype=tix.TEXT, text=s,
-                             style=propStyle )
-         self.proofBox.item_create( str(num), 2, itemtype=tix.TEXT, text=step.justificationString(),
-                             style=propStyle )
-
-      # Draw the 'Ghost' next step
-      ghostStyle         = tix.DisplayStyle(tix.TEXT, refwindow=self.proofBox)
-
-      if num is None:
-         num = 0
+         rowSteps.append( step )
+         if ( num < len( self._rowSteps ) ) and ( self._rowSteps[ num ] is step ):
+            rows.append( self._rows[ num ] )
+         else:
+            rows.append( ( str(num+1) + '.', ProofWidget.indentString(step.level, step.prop), step.justificationString() ) )
+
+      # The 'Ghost' next step
+      num = len( rows )
+      rowSteps.append( None )
+      rows.append( ( str(num+1) + '.', ProofWidget.indentString(self.proof.currentLevel(), '__'), '' ) )
+
+      # A new step scrolls into view, with the ghost row.
+      if ( len( rows ) > len( self._rows ) ) and ( len( rows ) > self._top + self._visible ):
+         self._top = len( rows ) - self._visible
+      self._top = max( 0, min( self._top, len( rows ) - self._visible ) )
+
+      self._rowSteps = rowSteps
+      self._rows     = rows
+      self._drawRows( True )
+
+   def _drawRows( self, pin=False ):
+      """Bring the HList up to date with the window of _rows around _top,
+      touching only the rows which changed, then redraw the selection.  If
+      pin, or the window moved, scroll the HList to show _top first."""
+      self._slidePending = False
+
+      first   = max( 0, self._top - ProofWidget.MARGIN_ROWS )
+      end     = min( len( self._rows ), self._top + self._visible + ProofWidget.MARGIN_ROWS )
+      oldEnd  = self._first + len( self._shown )
+      moved   = ( first != self._first ) or ( end != oldEnd )
+
+      # Release the rows which left the window.
+      for row in range( self._first, oldEnd ):
+         if ( row < first ) or ( row >= end ):
+            self.proofBox.delete_entry( str( row ) )
+
+      if ( first >= oldEnd ) or ( end <= self._first ):
+         keptFirst, keptEnd = first, first         # Nothing kept:  append every row.
+      else:
+         keptFirst, keptEnd = max( first, self._first ), min( end, oldEnd )
+
+      for row in range( first, end ):
+         texts = self._rows[ row ]
+         entry = str( row )
+         if keptFirst <= row < keptEnd:
+            shown = self._shown[ row - self._first ]
+            if shown != texts:
+               for column, text in enumerate( texts ):
+                  if shown[ column ] != text:
+                     self.proofBox.item_configure( entry, column, text=text )
+         else:
+            if row < keptFirst:
+               self.proofBox.add( entry, itemtype=tix.TEXT, text=texts[0], style=self._numberStyle, before=str( keptFirst ) )
+            else:
+               self.proofBox.add( entry, itemtype=tix.TEXT, text=texts[0], style=self._numberStyle )
+            self.proofBox.item_create( entry, 1, itemtype=tix.TEXT, text=texts[1], style=self._propStyle )
+            self.proofBox.item_create( entry, 2, itemtype=tix.TEXT, text=texts[2], style=self._propStyle )
+
+      self._first = first
+      self._shown = self._rows[ first : end ]
+
+      if ( pin or moved ) and ( first < end ):
+         self.proofBox.yview( str( self._top ) )
+      self._setScrollbar( )
+      self._drawSelection( )
+
+   def _drawSelection( self ):
+      self.proofBox.selection_clear( )
+      end = self._first + len( self._shown )
+      for citation in self._citations:
+         if self._selected[ citation ]:
+            for row in ProofWidget.citedRows( citation ):
+               if self._first <= row < end:
+                  self.proofBox.selection_set( str( row ) )
+
+   def _setScrollbar( self ):
+      # The scrollbar spans the whole proof, not just the materialized rows.
+      if self._yScrollCommand:
+         total = max( len( self._rows ), 1 )
+         first = min( self._top / total, 1.0 )
+         last  = min( ( self._top + self._visible ) / total, 1.0 )
+         self.tk.call( *( self.tk.splitlist( self._yScrollCommand ) + ( first, last ) ) )
+
+   def _onYScroll( self, first, last ):
+      # The view of the HList moved (or was resized):  'first' and 'last' are
+      # fractions of the materialized rows.
+      numShown = len( self._shown )
+      if numShown == 0:
+         if self._yScrollCommand:
+            self.tk.call( *( self.tk.splitlist( self._yScrollCommand ) + ( first, last ) ) )
+         return
+
+      first, last   = float( first ), float( last )
+      self._top     = self._first + int( round( first * numShown ) )
+      self._visible = max( 1, int( round( ( last - first ) * numShown ) ) )
+      self._setScrollbar( )
+
+      # Near an edge of the window which is not an edge of the proof:  slide it.
+      slack = ProofWidget.MARGIN_ROWS // 2
+      end   = self._first + numShown
+      if ( ( self._first > 0 ) and ( self._top - self._first < slack ) ) or \
+         ( ( end < len( self._rows ) ) and ( end - ( self._top + self._visible ) < slack ) ):
+         if not self._slidePending:
+            self._slidePending = True
+            self.after_idle( self._drawRows )
+
+   def _onScrollbar( self, *args ):
+      # The scrollbar was moved:  'moveto fraction' or 'scroll n units|pages',
+      # in rows of the whole proof.
+      if args[ 0 ] == 'moveto':
+         top = int( float( args[ 1 ] ) * len( self._rows ) )
+      elif args[ 2 ] == 'pages':
+         top = self._top + int( args[ 1 ] ) * self._visible
       else:
-         num += 1
-
-      s = ProofWidget.indentString(self.proof.currentLevel(), '__')
-      self.proofBox.add( str(num), itemtype=tix.TEXT, text=str(num+1) + '.', style=numberStyle )
-      self.proofBox.item_create( str(num), 1, itemtype=tix.TEXT, text=s,
-                          style=propStyle )
-      self.proofBox.item_create( str(num), 2, itemtype=tix.TEXT, text='',
-                          style=propStyle )
-
-      # Indicate the selections
-      for entry in self._selectionList:
-         if entry[1]:
-            if isinstance( entry[0], int ):
-               self.proofBox.selection_set( entry[0]-1 )
-            elif isinstance( entry[0], tuple ):
-               for idx in range( entry[0][0]-1, entry[0][1] ):
-                  self.proofBox.selection_set( idx )
+         top = self._top + int( args[ 1 ] )
+
+      self._top = max( 0, min( top, len( self._rows ) - self._visible ) )
+      self._drawRows( True )
 
    def getSelection( self ):
-      selectionList = [ ]
-      for entry in self._selectionList:
-         if entry[1]:
-            selectionList.append( entry[0] )
+      return [ citation for citation in self._citations if self._selected[ citation ] ]
+
+   def _selectionChanged( self ):
+      if self.selectionCommand is not None:
+         self.selectionCommand( )
 
-      return selectionList
+   @staticmethod
+   def citedRows( citation ):
+      """Returns the rows (from 0) covered by a step or subproof citation."""
+      if isinstance( citation, tuple ):
+         return range( citation[0]-1, citation[1] )
+      return range( citation-1, citation )
 
    @staticmethod
    def indentString( level, string ):
@@ -224,15 +459,56 @@ class InferenceRuleListWidget( tix.ScrolledHList ):
                             style=ruleNameHeaderStyle )
       self.ruleBox.header_create( 2, itemtype=tix.TEXT, text='Sequent',
                             style=ruleNameHeaderStyle )
+      self.ruleBox.header_create( 3, itemtype=tix.TEXT, text='Yields',
+                            style=ruleNameHeaderStyle )
+
+      # Styles of the rows:  plain, and of a rule which applies to the selection.
+      self._ruleStyle       = tix.DisplayStyle(tix.TEXT, refwindow=self.ruleBox, padx=10, anchor=tix.W)
+      self._cellStyle       = tix.DisplayStyle(tix.TEXT, refwindow=self.ruleBox)
+      self._applicableStyle = tix.DisplayStyle(tix.TEXT, refwindow=self.ruleBox, padx=10, anchor=tix.W, foreground='blue')
+      self._applicableCell  = tix.DisplayStyle(tix.TEXT, refwindow=self.ruleBox, foreground='blue')
 
-      self.ruleBox.column_width( 3, 0 )
+      self._ruleNames = [ ]     # The rule of each row
+      self._yields    = { }     # rule name : conclusions shown, for the highlighted rules
 
    def update( self, ruleList ):
-      ruleStyle        = tix.DisplayStyle(tix.TEXT, refwindow=self, padx=10, anchor=tix.W)
       for rule in ruleList:
-         self.ruleBox.add( rule.name, itemtype=tix.TEXT, text=rule.name, style=ruleStyle )
-         self.ruleBox.item_create( rule.name, 1, itemtype=tix.TEXT, text=rule.abbrev )
-         self.ruleBox.item_create( rule.name, 2, itemtype=tix.TEXT, text=rule.sequent )
+         self.ruleBox.add( rule.name, itemtype=tix.TEXT, text=rule.name, style=self._ruleStyle )
+         self.ruleBox.item_create( rule.name, 1, itemtype=tix.TEXT, text=rule.abbrev,  style=self._cellStyle )
+         self.ruleBox.item_create( rule.name, 2, itemtype=tix.TEXT, text=rule.sequent, style=self._cellStyle )
+         self.ruleBox.item_create( rule.name, 3, itemtype=tix.TEXT, text='',           style=self._cellStyle )
+         self._ruleNames.append( rule.name )
+
+   def highlight( self, applicable ):
+      """Highlight the rules which apply to the selected premises and show
+      the conclusions each yields; clear the rest.  Only the rows which
+      change are reconfigured.
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Reconfigures rows of the list.
+      Preconditions: [AssertionError] 'applicable' a list of ( InferenceRule,
+                        list of conclusions ), as Calculus.applicableRules( ).
+      """
+      yields = { rule.name : ', '.join( str( conclusion ) for conclusion in conclusions )
+                 for rule, conclusions in applicable }
+
+      for name in self._ruleNames:
+         text = yields.get( name )
+         if text == self._yields.get( name ):
+            continue
+
+         if text is None:
+            self.ruleBox.item_configure( name, 0, style=self._ruleStyle )
+            for column in ( 1, 2, 3 ):
+               self.ruleBox.item_configure( name, column, style=self._cellStyle )
+            self.ruleBox.item_configure( name, 3, text='' )
+         else:
+            self.ruleBox.item_configure( name, 0, style=self._applicableStyle )
+            for column in ( 1, 2, 3 ):
+               self.ruleBox.item_configure( name, column, style=self._applicableCell )
+            self.ruleBox.item_configure( name, 3, text=text )
+
+      self._yields = yields
 
 
 class SubwffSelectorWidget( tix.Frame ):
@@ -262,15 +538,16 @@ class SubwffSelectorWidget( tix.Frame ):
          self._textWidget.tag_config( self._sel[0],   background='White' )
          self._sel = None
 
-      for key,rgnInfo in self._formStruct.regions( ).items( ):
-         #rgnSlc, domSlc, clientData = val
-         domSlc = rgnInfo.dominantIndecies( )
-         if self._textWidget.compare( ('@%d,%d' % (event.x, event.y)), '==', '1.%d' % domSlc[0] ):
-            self._textWidget.tag_raise( key )
-            self._textWidget.tag_config( key, background='Gray' )
+      # A click on a dominant selects its region; elsewhere (e.g. on a
+      # parenthesis), the innermost region around the click.
+      offset = int( self._textWidget.index( '@%d,%d' % (event.x, event.y) ).split( '.' )[ 1 ] )
+      found  = self._formStruct.regionAt( offset ) or self._formStruct.innermostRegionAt( offset )
+      if found is not None:
+         key, rgnInfo = found
+         self._textWidget.tag_raise( key )
+         self._textWidget.tag_config( key, background='Gray' )
 
-            self._sel = ( key, rgnInfo )
-            break
+         self._sel = ( key, rgnInfo )
 
    def getSelectionInfo( self ):
       return self._sel
@@ -428,10 +705,15 @@ class ProofView( object ):
 
       self.proofBox = self.proofWidget.proofBox
       self.ruleBox = seqLst.hlist
+      self.ruleListWidget = seqLst
 
 
       seqLst.update( self.logic.calculus().ruleList() )
 
+      # Highlight the rules which apply whenever the selection changes.
+      self.ruleWorker = ApplicableRuleWorker( seqLst, self.logic.calculus(), seqLst.highlight )
+      self.proofWidget.selectionCommand = self.onSelectionChanged
+
    def buttonBox( self, parent ):
       box= tix.ButtonBox(parent, orientation=tix.HORIZONTAL )
 
@@ -558,8 +840,8 @@ class ProofView( object ):
 
          # Infer
          inference = EquivalenceInference( premiseSet, rule )
-         inference.resolve( self )
-         self.currentProof.addStep( inference.getConclusionForm(), premiseCitList, rule, inference.additionalSymbolMappings, inference.conclusionIndex )
+         conclusionFormList = inference.resolve( self )
+         self.currentProof.addStep( conclusionFormList[ 0 ], premiseCitList, rule, inference.mapping, 0 )
 
          # Update the view of the proof
          self.updateProof( )
@@ -604,6 +886,23 @@ class ProofView( object ):
       self.currentProof.deleteStep( )
       self.updateProof( )
 
+   def onSelectionChanged( self ):
+      premiseCitList = self.proofWidget.getSelection( )
+      if len( premiseCitList ) == 0:
+         self.ruleWorker.cancel( )
+         self.ruleListWidget.highlight( [ ] )
+         return
+
+      try:
+         premiseSet = self.currentProof.buildPremiseSet( premiseCitList )
+      except Exception:
+         # Steps which cannot be cited together:  no rule applies.
+         self.ruleWorker.cancel( )
+         self.ruleListWidget.highlight( [ ] )
+         return
+
+      self.ruleWorker.submit( premiseSet )
+
    def updateProof( self ):
       sv = tix.StringVar( )
       sv.set( str(self.currentSequent) )
@@ -612,16 +911,21 @@ class ProofView( object ):
       self.proofWidget.wrapProof( self.currentProof )
 
    def destroy (self):
+      self.ruleWorker.stop()
       self.root.destroy()
 
    def _selectSubWFF( self, wff ):
       '''Return a sub-WFF of wff.  Return False to cancel the operation.'''
+      return wff.subWFFAt( self._selectSubWFFPath( wff ) )
+
+   def _selectSubWFFPath( self, wff ):
+      '''Return the path of a sub-WFF of wff.  Return False to cancel the operation.'''
       assert isinstance( wff, Form )
 
       ss = wff.structuredString()
       d = SubWFFSelectorDialog( self.root, ss )
       selection = d.getSelection()
-      return selection[1]._clientData
+      return selection[1].getPath()
 
    def _assignUnmappedSymbols( self, unmappedSymbolList, rule ):
       '''Modify symbolMap.  Each symbol must be mapped to a valid WFF. Return False to cancel the operation.'''
@@ -1,5 +1,7 @@
 import Form
+from collections import OrderedDict
 from FormParser  import WFFScanner, WFFParser
+import Validation
 
 
 class Lexeme( object ):
@@ -24,17 +26,37 @@ class Lexeme( object ):
 
    PUNCT          =  600
 
-   def __init__( self, name, symbol, syntax, translation ):
+   # Associativity
+   LEFT           = 'LEFT'
+   RIGHT          = 'RIGHT'
+   NONASSOC       = 'NONE'
+
+   def __init__( self, name, symbol, syntax, translation, truthTable=None, precedence=None ):
       """Initialize an instance of this class.
       Category:      Mutator.
       Returns:       Nothing.
       Side Effects:  Initilize the instance.
-      Preconditions: None.
+      Preconditions: [AssertionError] 'truthTable' must be None (the lexeme
+                        is not truth-functional) or a tuple of 0/1 giving the
+                        operator's value for each combination of operand
+                        values.  The combinations are ordered as binary
+                        numbers with the first operand most significant:
+                        ( F, T ) for a unary operator and ( FF, FT, TF, TT )
+                        for a binary one.
+                     [AssertionError] 'precedence' must be None or, for an
+                        infix operator, a pair ( level, associativity ):  an
+                        int (higher binds tighter) and 'LEFT', 'RIGHT' or
+                        'NONE'.  An infix operator with no precedence must
+                        be parenthesized whenever it meets another infix
+                        operator.
       """
       assert isinstance( name,        str   )
       assert isinstance( symbol,      list  )
       assert isinstance( syntax,      str   )
       assert isinstance( translation, list  )
+      assert isinstance( truthTable,  tuple ) or ( truthTable is None )
+      assert ( precedence is None ) or ( isinstance( precedence, tuple ) and isinstance( precedence[0], int ) and
+                                         ( precedence[1] in ( Lexeme.LEFT, Lexeme.RIGHT, Lexeme.NONASSOC ) ) )
 
       if syntax == 'PREFIX OP':
          syntax = Lexeme.PREFIX_OP
@@ -52,23 +74,72 @@ class Lexeme( object ):
       self.syntax  = syntax
       self.token   = syntax
       self.trans   = translation
+      self.truth   = truthTable
+      self.prec    = precedence
 
 
 class Language( object ):
-   """Implementation of Language."""
-   def __init__( self, lexemes, equivalenceOperatorList ):
+   """Implementation of Language.
+
+   Parsed strings are kept in a bounded, least-recently-used cache.  WFFs
+   are immutable and shared by every caller; sequents (which can be
+   modified) are handed out as copies sharing the cached wffs.
+   """
+   PARSE_CACHE_SIZE = 1024
+
+   def __init__( self, lexemes, equivalenceOperatorList, parseCacheSize=None ):
       assert isinstance( lexemes,                 list )
       assert isinstance( equivalenceOperatorList, list )
+      assert isinstance( parseCacheSize,          int  ) or ( parseCacheSize is None )
 
       self._lexList   = [ ]
 
       for lex in lexemes:
          self._lexList.append( Lexeme( *lex ) )
 
+      self._equivOpLst = equivalenceOperatorList
+
+      # Setup Parse Cache
+      self._parseCache     = OrderedDict( )     # ( kind, string ) -> Form
+      self._parseCacheSize = Language.PARSE_CACHE_SIZE if parseCacheSize is None else parseCacheSize
+      self._parseHits      = 0
+      self._parseMisses    = 0
+
+      self._compileLexicon( )
+
+   def _compileLexicon( self ):
+      """Build the semantic tables, scanner and parser from the lexicon."""
+      # Setup Semantics
+      self._truthTables = { }
+      for lex in self._lexList:
+         if lex.truth is not None:
+            for sym in lex.symbol:
+               self._truthTables[ sym ] = lex.truth
+
       # Setup Parsing
       self._scanner    = WFFScanner( self._lexList )
-      self._parser     = WFFParser( )
-      self._equivOpLst = equivalenceOperatorList
+      self._parser     = WFFParser( self._lexList )
+
+   def defineLexeme( self, *lexDef ):
+      """Add a lexeme to the lexicon, or replace the lexeme of the same name.
+      Category:       Mutator.
+      Returns:        Nothing.
+      Side Effects:   Rebuilds the scanner and parser and invalidates the
+                      parse cache.
+      Preconditions:  [AssertionError] 'lexDef' must be the arguments of
+                         a Lexeme.
+      """
+      newLex = Lexeme( *lexDef )
+
+      for index, lex in enumerate( self._lexList ):
+         if lex.name == newLex.name:
+            self._lexList[ index ] = newLex
+            break
+      else:
+         self._lexList.append( newLex )
+
+      self._compileLexicon( )
+      self.invalidateParseCache( )
 
    def parseProp( self, aPropStr ):
       """Parse a wff string.
@@ -77,30 +148,108 @@ class Language( object ):
       Side Effects:   None.
       Preconditions:  [AssertionError] 'aPropStr' must be a string representation of a WFF.
       """
-      assert isinstance( aPropStr,         str        )
+      Validation.requireType( aPropStr, str, 'aPropStr' )
 
-      assert isinstance( self._scanner,    WFFScanner )
-      assert isinstance( self._parser,     WFFParser  )
-      assert isinstance( self._equivOpLst, list       )
+      key    = ( 'prop', aPropStr )
+      result = self._cachedParse( key )
+      if result is None:
+         self._scanner.rescan( aString=aPropStr )
+         result = self._cacheParse( key, self._parser.parseProposition( self._scanner ) )
 
-      self._scanner.rescan( aString=aPropStr )
-      return self._parser.parseProposition( self._scanner )
+      return result
 
    def parseSeq( self, aSeqStr ):
       """Parse a sequent string.
       Category:       Pure Function.
-      Returns:        Sequent.
+      Returns:        Sequent.  The caller owns the sequent and may modify it.
       Side Effects:   None.
       Preconditions:  [AssertionError] 'aSeqStr' must be a string representation of a sequent.
       """
-      assert isinstance( aSeqStr,          str        )
+      Validation.requireType( aSeqStr, str, 'aSeqStr' )
 
-      assert isinstance( self._scanner,    WFFScanner )
-      assert isinstance( self._parser,     WFFParser  )
-      assert isinstance( self._equivOpLst, list       )
+      key    = ( 'seq', aSeqStr )
+      result = self._cachedParse( key )
+      if result is None:
+         self._scanner.rescan( aString=aSeqStr )
+         result = self._cacheParse( key, self._parser.parseSequent( self._scanner ) )
 
-      self._scanner.rescan( aString=aSeqStr )
-      return self._parser.parseSequent( self._scanner )
+      return _copySequent( result )
+
+   # Parse Cache
+   def parseCacheInfo( self ):
+      """Returns the parse cache statistics.
+      Category:       Pure Function.
+      Returns:        (dict) with the keys 'hits', 'misses', 'size' and 'maxSize'.
+      Side Effects:   None.
+      Preconditions:  None.
+      """
+      return { 'hits'    : self._parseHits,
+               'misses'  : self._parseMisses,
+               'size'    : len( self._parseCache ),
+               'maxSize' : self._parseCacheSize }
+
+   def invalidateParseCache( self ):
+      """Discard every cached parse.  Must be called if the lexicon changes.
+      Category:       Mutator.
+      Returns:        Nothing.
+      Side Effects:   Empties the parse cache and resets its counters.
+      Preconditions:  None.
+      """
+      self._parseCache.clear( )
+      self._parseHits   = 0
+      self._parseMisses = 0
+
+   def _cachedParse( self, key ):
+      result = self._parseCache.get( key )
+      if result is None:
+         self._parseMisses += 1
+      else:
+         self._parseHits += 1
+         self._parseCache.move_to_end( key )
+      return result
+
+   def _cacheParse( self, key, aForm ):
+      if self._parseCacheSize > 0:
+         self._parseCache[ key ] = aForm
+         if len( self._parseCache ) > self._parseCacheSize:
+            self._parseCache.popitem( last=False )
+      return aForm
+
+   def lexemes( self ):
+      """Returns the lexemes of the language.
+      Category:       Pure Function.
+      Returns:        (list) of Lexeme, in definition order.  Do not modify.
+      Side Effects:   None.
+      Preconditions:  None.
+      """
+      return self._lexList
+
+   def lexemeNamed( self, aName ):
+      """Returns the lexeme with the given name.
+      Category:       Pure Function.
+      Returns:        (Lexeme) or None if no lexeme has that name.
+      Side Effects:   None.
+      Preconditions:  [AssertionError] 'aName' must be a str.
+      """
+      assert isinstance( aName,            str        )
+
+      for lex in self._lexList:
+         if lex.name == aName:
+            return lex
+
+      return None
+
+   def truthTable( self, anOperator ):
+      """Returns the truth table of an operator.
+      Category:       Pure Function.
+      Returns:        (tuple) See Lexeme, or None if the operator is not
+                      truth-functional.
+      Side Effects:   None.
+      Preconditions:  [AssertionError] 'anOperator' must be a str.
+      """
+      assert isinstance( anOperator,       str        )
+
+      return self._truthTables.get( anOperator )
 
    def equivalenceOperatorList( self ):
       """Returns the list of equivalence operators.
@@ -132,3 +281,14 @@ class Language( object ):
       return (theConclusionForm.primary() in self._equivOpLst) and (len(theConclusionForm.subordinates()) == 2)
 
 
+def _copySequent( aSequent ):
+   """Returns a copy of aSequent with fresh form sets (and nested sequents)
+   sharing its wffs."""
+   def copyFormSet( aFormSet ):
+      # Appended one by one, as FormSet( list ) may reorder the members.
+      result = Form.FormSet( )
+      for form in aFormSet:
+         result.append( _copySequent( form ) if isinstance( form, Form.Sequent ) else form )
+      return result
+
+   return Form.Sequent( copyFormSet( aSequent.premiseFormSet( ) ), copyFormSet( aSequent.conclusionFormSet( ) ) )
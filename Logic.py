@@ -1,8 +1,22 @@
-"""This module represents all the abstract elements of a Logic."""
+"""This module represents all the abstract elements of a Logic.
+
+The predefined logics compile their inference rules when their calculus
+is first asked for.  If the environment variable ARISTOTLE_RULE_CACHE names
+a directory, compiled rule sequents are saved there and loaded instead of
+parsing the rule texts again.
+
+GentzenRules, GentzenCalculus and their Gensler and Fitch counterparts are
+the compiled ( name, abbreviation, Sequent ) rules and the Calculus of each
+logic, as before; they are built when first read, like calculus( ).
+"""
+
+import hashlib
+import os
 
 from Language import Language
 from Calculus import Calculus
 from Form import Sequent
+import Serialization
 
 
 '''
@@ -37,19 +51,47 @@ Theory
 
 class Logic( object ):
    """Implementation of a logic."""
-   def __init__( self, language, calculus ):
+   def __init__( self, language, calculus, name=None ):
       """Initialize a new instance of this class.
       Category:      Mutator.
       Returns:       Nothing.
       Side Effects:  None.
       Preconditions: [AssertionError] 'language' must be a Language instance.
-                     [AssertionError] 'calculus' must be a Calculus instance.
+                     [AssertionError] 'calculus' must be a Calculus instance,
+                        or a function of no arguments returning one; it is
+                        called the first time the calculus is needed.
+                     [AssertionError] 'name' must be a str or None.
       """
       assert isinstance( language, Language )
+      assert isinstance( calculus, Calculus ) or callable( calculus )
+      assert isinstance( name,     str      ) or ( name is None )
+
+      self._language        = language
+      self._calculus        = None
+      self._calculusFactory = None
+      self._name            = name
+
+      if isinstance( calculus, Calculus ):
+         self._setCalculus( calculus )
+      else:
+         self._calculusFactory = calculus
+
+   def _setCalculus( self, calculus ):
       assert isinstance( calculus, Calculus )
 
-      self._language  = language
-      self._calculus  = calculus
+      self._calculus        = calculus
+      self._calculusFactory = None
+
+      self._calculus._logic = self
+
+   def name( self ):
+      """Returns the name of the logic.
+      Category:      Pure Function.
+      Returns:       (str) or None if the logic is unnamed.
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      return self._name
 
    def language( self ):
       """Returns the language.
@@ -59,7 +101,6 @@ class Logic( object ):
       Preconditions: None.
       """
       assert isinstance( self._language,     Language )
-      assert isinstance( self._calculus,     Calculus )
 
       return self._language
 
@@ -67,22 +108,93 @@ class Logic( object ):
       '''Returns the calculus.
       Category:      Pure Function.
       Returns:       (Calculus)
-      Side Effects:  None.
+      Side Effects:  Builds the calculus the first time it is asked for.
       Preconditions: None.
       '''
       assert isinstance( self._language,     Language )
-      assert isinstance( self._calculus,     Calculus )
+
+      if self._calculus is None:
+         self._setCalculus( self._calculusFactory( ) )
 
       return self._calculus
 
 
+def compileRules( language, ruleTable, cacheName=None ):
+   """Compile a table of inference rule texts.
+   Category:      Pure Function.
+   Returns:       (list) of ( name, abbreviation, Sequent ), as expected by
+                  Calculus.
+   Side Effects:  If cacheName is given and ARISTOTLE_RULE_CACHE names a
+                  directory, the compiled sequents are read from, or else
+                  written to, a file there.
+   Preconditions: [AssertionError] 'language' must be a Language.
+                  [AssertionError] 'ruleTable' must be a list of ( name,
+                     abbreviation, sequentText ).
+                  [AssertionError] 'cacheName' must be a str or None.
+   """
+   assert isinstance( language,  Language )
+   assert isinstance( ruleTable, list     )
+   assert isinstance( cacheName, str      ) or ( cacheName is None )
+
+   cachePath = None
+   cacheDir  = os.environ.get( 'ARISTOTLE_RULE_CACHE' )
+   if cacheName and cacheDir:
+      # The file name includes a digest of everything the sequents depend on.
+      key = repr( ( Serialization.VERSION,
+                    [ ( lex.name, lex.symbol, lex.syntax, lex.prec ) for lex in language.lexemes( ) ],
+                    [ ( name, abbrev, text ) for name, abbrev, text in ruleTable ] ) )
+      cachePath = os.path.join( cacheDir, '{0}-{1}.rules'.format( cacheName, hashlib.sha1( key.encode( 'utf-8' ) ).hexdigest( )[ :16 ] ) )
+
+   sequents = _loadRuleCache( cachePath, len( ruleTable ) ) if cachePath else None
+   if sequents is None:
+      sequents = [ language.parseSeq( text ) for name, abbrev, text in ruleTable ]
+      if cachePath:
+         _saveRuleCache( cachePath, sequents )
+
+   return [ ( name, abbrev, sequent ) for ( name, abbrev, text ), sequent in zip( ruleTable, sequents ) ]
+
+
+def _loadRuleCache( cachePath, numRules ):
+   """Returns the list of sequents in the cache file, or None if it can't be used."""
+   try:
+      with open( cachePath, 'rb' ) as cacheFile:
+         data = cacheFile.read( )
+   except OSError:
+      return None
+
+   sequents = [ ]
+   pos      = 0
+   try:
+      while pos < len( data ):
+         sequents.append( Serialization.loadForm( data, pos ) )
+         pos = Serialization.encodingEnd( data, pos )
+   except Exception:
+      return None                             # A damaged cache is just a miss; it's rebuilt.
+
+   if ( len( sequents ) != numRules ) or not all( isinstance( seq, Sequent ) for seq in sequents ):
+      return None
+
+   return sequents
+
+
+def _saveRuleCache( cachePath, sequents ):
+   data = b''.join( Serialization.dumpForm( seq ) for seq in sequents )
+   try:
+      tempPath = '{0}.{1}.tmp'.format( cachePath, os.getpid( ) )
+      with open( tempPath, 'wb' ) as cacheFile:
+         cacheFile.write( data )
+      os.replace( tempPath, cachePath )
+   except OSError:
+      pass                                    # The cache is an optimization only.
+
+
 
 GentzenLexicon = [
-          ( 'Negation',       [ '~',   u'\u00AC' ],  'PREFIX OP',  [ 'no', 'not', 'non-', 'it is not the case that' ]  ),
-          ( 'Conjunction',    [ '&',   u'\u2227' ],  'INFIX OP',   [ 'and', 'but', 'also' ] ),
-          ( 'Disjunction',    [ 'v',   u'\u2228' ],  'INFIX OP',   [ 'or', 'unless' ]       ),
-          ( 'Conditional',    [ '>',   u'\u2283' ],  'INFIX OP',   [ 'implies', 'if-then', 'only if', 'is a sufficient condition for' ] ),
-          ( 'Biconditional',  [ '<->', u'\u2261' ],  'INFIX OP',   [ 'if and only if', 'iff', 'just if'  ] ),
+          ( 'Negation',       [ '~',   u'\u00AC' ],  'PREFIX OP',  [ 'no', 'not', 'non-', 'it is not the case that' ],                    ( 1, 0 ) ),
+          ( 'Conjunction',    [ '&',   u'\u2227' ],  'INFIX OP',   [ 'and', 'but', 'also' ],                                              ( 0, 0, 0, 1 ),  ( 4, 'LEFT'  ) ),
+          ( 'Disjunction',    [ 'v',   u'\u2228' ],  'INFIX OP',   [ 'or', 'unless' ],                                                    ( 0, 1, 1, 1 ),  ( 3, 'LEFT'  ) ),
+          ( 'Conditional',    [ '>',   u'\u2283' ],  'INFIX OP',   [ 'implies', 'if-then', 'only if', 'is a sufficient condition for' ],  ( 1, 1, 0, 1 ),  ( 2, 'RIGHT' ) ),
+          ( 'Biconditional',  [ '<->', u'\u2261' ],  'INFIX OP',   [ 'if and only if', 'iff', 'just if'  ],                               ( 1, 0, 0, 1 ),  ( 1, 'NONE'  ) ),
           ( 'Necessitation',  [ 'N:',  u'\u25A1' ],  'PREFIX OP',  [ 'it is necessary that', 'it is necessarilly the case that' ] ),
           ( 'Possibility',    [ 'P:',  u'\u25C7' ],  'PREFIX OP',  [ 'it is possible that', 'it is possibly the case that' ] ),
           ( 'Entailment',     [ '|-',  u'\u22A6' ],  'ENTAILS',    [ 'entails' ] )
@@ -90,43 +202,44 @@ GentzenLexicon = [
 
 GentzenLanguage = Language( GentzenLexicon, [ '<->', u'\u2261' ] )
 
-GentzenRules = [
-#           Name                            Abbreviation  Form (Sequent)
+_gentzenRuleTexts = [
+#           Name                            Abbreviation  Form (Sequent text)
 #           ==============================  ============  =============================================
-          ( 'Given',                        'Given',      GentzenLanguage.parseSeq( '                       |-  P'                                     ) ),
-
-          ( 'Modus Ponens',                 'MP',         GentzenLanguage.parseSeq( 'P > Q, P               |-  Q'                                     ) ),
-          ( 'Modus Tollens',                'MT',         GentzenLanguage.parseSeq( 'P > Q, ~Q              |-  ~P'                                    ) ),
-          ( 'Hypothetical Syllogism',       'HS',         GentzenLanguage.parseSeq( 'P > Q, Q > R           |-  P > R'                                 ) ),
-          ( 'Disjunctive Syllogism 1',      'DS1',        GentzenLanguage.parseSeq( 'P v Q, ~P              |-  Q'                                     ) ),
-          ( 'Disjunctive Syllogism 2',      'DS2',        GentzenLanguage.parseSeq( 'P v Q, ~Q              |-  P'                                     ) ),
-          ( 'Constructive Dilemma',         'CD',         GentzenLanguage.parseSeq( 'P v Q, P > R, Q > S    |-  R v S, S v R'                          ) ),
-          ( 'Absorption',                   'Abs',        GentzenLanguage.parseSeq( 'P > Q                  |-  P > (P & Q)'                           ) ),
-          ( 'Simplification',               'Simp',       GentzenLanguage.parseSeq( 'P & Q                  |-  P, Q'                                  ) ),
-          ( 'Conjunction',                  'Conj',       GentzenLanguage.parseSeq( 'P, Q                   |-  P & Q, Q & P'                          ) ),
-          ( 'Addition',                     'Add',        GentzenLanguage.parseSeq( 'P                      |-  P v Q, Q v P'                          ) ),
-
-          ( 'DeMorgan\'s (Conj)',           'DM(&)',      GentzenLanguage.parseSeq( '                       |-  ~(P & Q) <-> (~P v ~Q)'                ) ),
-          ( 'DeMorgan\'s (Disj)',           'DM(v)',      GentzenLanguage.parseSeq( '                       |-  ~(P v Q) <-> (~P & ~Q)'                ) ),
-          ( 'Commutation (Conj)',           'Comm(&)',    GentzenLanguage.parseSeq( '                       |-  (P & Q) <-> (Q & P)'                   ) ),
-          ( 'Commutation (Disj)',           'Comm(v)',    GentzenLanguage.parseSeq( '                       |-  (P v Q) <-> (Q v P)'                   ) ),
-          ( 'Association (Conj)',           'Assoc(&)',   GentzenLanguage.parseSeq( '                       |-  (P & (Q & R)) <-> ((P & Q) & R)'       ) ),
-          ( 'Association (Disj)',           'Assoc(v)',   GentzenLanguage.parseSeq( '                       |-  (P v (Q v R)) <-> ((P v Q) v R)'       ) ),
-          ( 'Distribution (Conj)',          'Dist(&)',    GentzenLanguage.parseSeq( '                       |-  (P & (Q v R)) <-> ((P & Q) v (P & R))' ) ),
-          ( 'Distribution (Disj)',          'Dist(v)',    GentzenLanguage.parseSeq( '                       |-  (P v (Q & R)) <-> ((P v Q) & (P v R))' ) ),
-          ( 'Double Negation',              'DN',         GentzenLanguage.parseSeq( '                       |-  P <-> ~~P'                             ) ),
-          ( 'Transposition',                'Trans',      GentzenLanguage.parseSeq( '                       |-  (P > Q) <-> (~Q > ~P)'                 ) ),
-          ( 'Material Implication',         'Impl',       GentzenLanguage.parseSeq( '                       |-  (P > Q) <-> (~P v Q)'                  ) ),
-          ( 'Material Equivalence (Conj)',  'Equiv(&)',   GentzenLanguage.parseSeq( '                       |-  (P <-> Q) <-> ((P & Q) v (~P & ~Q))'   ) ),
-          ( 'Material Equivalence (Cond)',  'Equiv(>)',   GentzenLanguage.parseSeq( '                       |-  (P <-> Q) <-> ((P > Q) & (Q > P))'     ) ),
-          ( 'Exportation',                  'Exp',        GentzenLanguage.parseSeq( '                       |-  ((P & Q) > R) <-> (P > (Q > R))'       ) ),
-          ( 'Tautology (Conj)',             'Taut(&)',    GentzenLanguage.parseSeq( '                       |-  P <-> (P & P)'                         ) ),
-          ( 'Tautology (Disj)',             'Taut(v)',    GentzenLanguage.parseSeq( '                       |-  P <-> (P v P)'                         ) )
+          ( 'Given',                        'Given',      '                       |-  P'                                      ),
+
+          ( 'Modus Ponens',                 'MP',         'P > Q, P               |-  Q'                                      ),
+          ( 'Modus Tollens',                'MT',         'P > Q, ~Q              |-  ~P'                                     ),
+          ( 'Hypothetical Syllogism',       'HS',         'P > Q, Q > R           |-  P > R'                                  ),
+          ( 'Disjunctive Syllogism 1',      'DS1',        'P v Q, ~P              |-  Q'                                      ),
+          ( 'Disjunctive Syllogism 2',      'DS2',        'P v Q, ~Q              |-  P'                                      ),
+          ( 'Constructive Dilemma',         'CD',         'P v Q, P > R, Q > S    |-  R v S, S v R'                           ),
+          ( 'Absorption',                   'Abs',        'P > Q                  |-  P > (P & Q)'                            ),
+          ( 'Simplification',               'Simp',       'P & Q                  |-  P, Q'                                   ),
+          ( 'Conjunction',                  'Conj',       'P, Q                   |-  P & Q, Q & P'                           ),
+          ( 'Addition',                     'Add',        'P                      |-  P v Q, Q v P'                           ),
+
+          ( 'DeMorgan\'s (Conj)',           'DM(&)',      '                       |-  ~(P & Q) <-> (~P v ~Q)'                 ),
+          ( 'DeMorgan\'s (Disj)',           'DM(v)',      '                       |-  ~(P v Q) <-> (~P & ~Q)'                 ),
+          ( 'Commutation (Conj)',           'Comm(&)',    '                       |-  (P & Q) <-> (Q & P)'                    ),
+          ( 'Commutation (Disj)',           'Comm(v)',    '                       |-  (P v Q) <-> (Q v P)'                    ),
+          ( 'Association (Conj)',           'Assoc(&)',   '                       |-  (P & (Q & R)) <-> ((P & Q) & R)'        ),
+          ( 'Association (Disj)',           'Assoc(v)',   '                       |-  (P v (Q v R)) <-> ((P v Q) v R)'        ),
+          ( 'Distribution (Conj)',          'Dist(&)',    '                       |-  (P & (Q v R)) <-> ((P & Q) v (P & R))'  ),
+          ( 'Distribution (Disj)',          'Dist(v)',    '                       |-  (P v (Q & R)) <-> ((P v Q) & (P v R))'  ),
+          ( 'Double Negation',              'DN',         '                       |-  P <-> ~~P'                              ),
+          ( 'Transposition',                'Trans',      '                       |-  (P > Q) <-> (~Q > ~P)'                  ),
+          ( 'Material Implication',         'Impl',       '                       |-  (P > Q) <-> (~P v Q)'                   ),
+          ( 'Material Equivalence (Conj)',  'Equiv(&)',   '                       |-  (P <-> Q) <-> ((P & Q) v (~P & ~Q))'    ),
+          ( 'Material Equivalence (Cond)',  'Equiv(>)',   '                       |-  (P <-> Q) <-> ((P > Q) & (Q > P))'      ),
+          ( 'Exportation',                  'Exp',        '                       |-  ((P & Q) > R) <-> (P > (Q > R))'        ),
+          ( 'Tautology (Conj)',             'Taut(&)',    '                       |-  P <-> (P & P)'                          ),
+          ( 'Tautology (Disj)',             'Taut(v)',    '                       |-  P <-> (P v P)'                          )
           ]
 
-GentzenCalculus = Calculus( GentzenRules,   'Given', 'Theorem Intro', 'Axiom Intro', True )
+def _gentzenCalculus( ):
+   return Calculus( _compiledRules( 'Gentzen' ), 'Given', 'Theorem Intro', 'Axiom Intro', True )
 
-Gentzen = Logic( GentzenLanguage, GentzenCalculus )
+Gentzen = Logic( GentzenLanguage, _gentzenCalculus, 'Gentzen' )
 
 
 
@@ -136,11 +249,11 @@ Gentzen = Logic( GentzenLanguage, GentzenCalculus )
 
 
 GenslerLexicon = [
-          ( 'Negation',       [ '~',   u'\u00AC' ],  'PREFIX OP',  [ 'no', 'not', 'non-', 'it is not the case that' ]  ),
-          ( 'Conjunction',    [ '&',   u'\u2227' ],  'INFIX OP',   [ 'and', 'but', 'also' ] ),
-          ( 'Disjunction',    [ 'v',   u'\u2228' ],  'INFIX OP',   [ 'or', 'unless' ]       ),
-          ( 'Conditional',    [ '>',   u'\u2283' ],  'INFIX OP',   [ 'implies', 'if-then', 'only if', 'is a sufficient condition for' ] ),
-          ( 'Biconditional',  [ '<->', u'\u2261' ],  'INFIX OP',   [ 'if and only if', 'iff', 'just if'  ] ),
+          ( 'Negation',       [ '~',   u'\u00AC' ],  'PREFIX OP',  [ 'no', 'not', 'non-', 'it is not the case that' ],                    ( 1, 0 ) ),
+          ( 'Conjunction',    [ '&',   u'\u2227' ],  'INFIX OP',   [ 'and', 'but', 'also' ],                                              ( 0, 0, 0, 1 ),  ( 4, 'LEFT'  ) ),
+          ( 'Disjunction',    [ 'v',   u'\u2228' ],  'INFIX OP',   [ 'or', 'unless' ],                                                    ( 0, 1, 1, 1 ),  ( 3, 'LEFT'  ) ),
+          ( 'Conditional',    [ '>',   u'\u2283' ],  'INFIX OP',   [ 'implies', 'if-then', 'only if', 'is a sufficient condition for' ],  ( 1, 1, 0, 1 ),  ( 2, 'RIGHT' ) ),
+          ( 'Biconditional',  [ '<->', u'\u2261' ],  'INFIX OP',   [ 'if and only if', 'iff', 'just if'  ],                               ( 1, 0, 0, 1 ),  ( 1, 'NONE'  ) ),
           ( 'Necessitation',  [ 'N:',  u'\u25A1' ],  'PREFIX OP',  [ 'it is necessary that', 'it is necessarilly the case that' ] ),
           ( 'Possibility',    [ 'P:',  u'\u25C7' ],  'PREFIX OP',  [ 'it is possible that', 'it is possibly the case that' ] ),
           ( 'Entailment',     [ '|-',  u'\u22A6' ],  'ENTAILS',    [ 'entails' ] )
@@ -148,31 +261,32 @@ GenslerLexicon = [
 
 GenslerLanguage = Language( GenslerLexicon, [ '<->', u'\u2261' ] )
 
-GenslerRules = [
-#           Name                            Abbreviation  Form (Sequent)
+_genslerRuleTexts = [
+#           Name                            Abbreviation  Form (Sequent text)
 #           ==============================  ============  =============================================
-          ( 'Assumption',                   'asm.',       GenslerLanguage.parseSeq( '                       |-  P'               ) ),
-
-          ( 'Simplification (Conj)',        'S(&)',       GenslerLanguage.parseSeq( 'P & Q                  |-  P, Q'            ) ),
-          ( 'Simplification (Disj)',        'S(v)',       GenslerLanguage.parseSeq( '~(P v Q)               |-  ~P, ~Q'          ) ),
-          ( 'Simplification (Impl)',        'S(->)',      GenslerLanguage.parseSeq( '~(P > Q)               |-  P, ~Q'           ) ),
-          ( 'Simplification (Neg)',         'S(~)',       GenslerLanguage.parseSeq( '~~P                    |-  P'               ) ),
-          ( 'Simplification (Bi)',          'S(<->)',     GenslerLanguage.parseSeq( 'P <-> Q                |-  P > Q, Q > P'    ) ),
-          ( 'Simplification (~Bi)',         'S(~<->)',    GenslerLanguage.parseSeq( '~(P <-> Q)             |-  P v Q, ~(P & Q)' ) ),
-
-          ( 'Inference (Conj 1)',           'I(&1)',      GenslerLanguage.parseSeq( '~(P & Q), P            |-  ~Q'              ) ),
-          ( 'Inference (Conj 2)',           'I(&2)',      GenslerLanguage.parseSeq( '~(P & Q), Q            |-  ~P'              ) ),
-          ( 'Inference (Disj 1)',           'I(v1)',      GenslerLanguage.parseSeq( 'P v Q, ~P              |-  Q'               ) ),
-          ( 'Inference (Disj 2)',           'I(v2)',      GenslerLanguage.parseSeq( 'P v Q, ~Q              |-  P'               ) ),
-          ( 'Inference (Cond 1)',           'I(->1)',     GenslerLanguage.parseSeq( 'P > Q, P               |-  Q'               ) ),
-          ( 'Inference (Cond 2)',           'I(->2)',     GenslerLanguage.parseSeq( 'P > Q, ~Q              |-  ~P'              ) ),
-
-          ( 'Reductio Ad Absurdum',         'RAA',        GenslerLanguage.parseSeq( '( ~P  |-  Q & ~Q )     |-  P'               ) )
+          ( 'Assumption',                   'asm.',       '                       |-  P'                ),
+
+          ( 'Simplification (Conj)',        'S(&)',       'P & Q                  |-  P, Q'             ),
+          ( 'Simplification (Disj)',        'S(v)',       '~(P v Q)               |-  ~P, ~Q'           ),
+          ( 'Simplification (Impl)',        'S(->)',      '~(P > Q)               |-  P, ~Q'            ),
+          ( 'Simplification (Neg)',         'S(~)',       '~~P                    |-  P'                ),
+          ( 'Simplification (Bi)',          'S(<->)',     'P <-> Q                |-  P > Q, Q > P'     ),
+          ( 'Simplification (~Bi)',         'S(~<->)',    '~(P <-> Q)             |-  P v Q, ~(P & Q)'  ),
+
+          ( 'Inference (Conj 1)',           'I(&1)',      '~(P & Q), P            |-  ~Q'               ),
+          ( 'Inference (Conj 2)',           'I(&2)',      '~(P & Q), Q            |-  ~P'               ),
+          ( 'Inference (Disj 1)',           'I(v1)',      'P v Q, ~P              |-  Q'                ),
+          ( 'Inference (Disj 2)',           'I(v2)',      'P v Q, ~Q              |-  P'                ),
+          ( 'Inference (Cond 1)',           'I(->1)',     'P > Q, P               |-  Q'                ),
+          ( 'Inference (Cond 2)',           'I(->2)',     'P > Q, ~Q              |-  ~P'               ),
+
+          ( 'Reductio Ad Absurdum',         'RAA',        '( ~P  |-  Q & ~Q )     |-  P'                )
           ]
 
-GenslerCalculus = Calculus( GenslerRules, 'Assumption', 'Thm', 'Ax', True, 'Assumption' )
+def _genslerCalculus( ):
+   return Calculus( _compiledRules( 'Gensler' ), 'Assumption', 'Thm', 'Ax', True, 'Assumption' )
 
-Gensler = Logic( GenslerLanguage, GenslerCalculus )
+Gensler = Logic( GenslerLanguage, _genslerCalculus, 'Gensler' )
 
 
 
@@ -181,11 +295,11 @@ Gensler = Logic( GenslerLanguage, GenslerCalculus )
 
 
 FitchLexicon = [
-          ( 'Negation',       [ '-',   u'\u00AC' ],  'PREFIX OP',  [ 'no', 'not', 'non-', 'it is not the case that' ]  ),
-          ( 'Conjunction',    [ '^',   u'\u2227' ],  'INFIX OP',   [ 'and', 'but', 'also' ] ),
-          ( 'Disjunction',    [ 'v',   u'\u2228' ],  'INFIX OP',   [ 'or', 'unless' ]       ),
-          ( 'Conditional',    [ '->',  u'\u2192' ],  'INFIX OP',   [ 'implies', 'if-then', 'only if', 'is a sufficient condition for' ] ),
-          ( 'Biconditional',  [ '<->', u'\u2194' ],  'INFIX OP',   [ 'if and only if', 'iff', 'just if'  ] ),
+          ( 'Negation',       [ '-',   u'\u00AC' ],  'PREFIX OP',  [ 'no', 'not', 'non-', 'it is not the case that' ],                    ( 1, 0 ) ),
+          ( 'Conjunction',    [ '^',   u'\u2227' ],  'INFIX OP',   [ 'and', 'but', 'also' ],                                              ( 0, 0, 0, 1 ),  ( 4, 'LEFT'  ) ),
+          ( 'Disjunction',    [ 'v',   u'\u2228' ],  'INFIX OP',   [ 'or', 'unless' ],                                                    ( 0, 1, 1, 1 ),  ( 3, 'LEFT'  ) ),
+          ( 'Conditional',    [ '->',  u'\u2192' ],  'INFIX OP',   [ 'implies', 'if-then', 'only if', 'is a sufficient condition for' ],  ( 1, 1, 0, 1 ),  ( 2, 'RIGHT' ) ),
+          ( 'Biconditional',  [ '<->', u'\u2194' ],  'INFIX OP',   [ 'if and only if', 'iff', 'just if'  ],                               ( 1, 0, 0, 1 ),  ( 1, 'NONE'  ) ),
           ( 'Necessitation',  [ 'N:',  u'\u25A1' ],  'PREFIX OP',  [ 'it is necessary that', 'it is necessarilly the case that' ] ),
           ( 'Possibility',    [ 'P:',  u'\u25C7' ],  'PREFIX OP',  [ 'it is possible that', 'it is possibly the case that' ] ),
           ( 'Entailment',     [ '|-',  u'\u22A6' ],  'ENTAILS',    [ 'entails' ] )
@@ -193,31 +307,62 @@ FitchLexicon = [
 
 FitchLanguage = Language( FitchLexicon, [ '<->', u'\u2194' ] )
 
-FitchRules =   [
-#           Name                            Abbreviation  Form (Sequent)
+_fitchRuleTexts = [
+#           Name                            Abbreviation  Form (Sequent text)
 #           ==============================  ============  =============================================
-          ( 'Assumption',                   'A',          FitchLanguage.parseSeq( '                       |-  P'                ) ),
-          ( 'Hypothesis',                   'H',          FitchLanguage.parseSeq( '                       |-  P'                ) ),
+          ( 'Assumption',                   'A',          '                       |-  P'                 ),
+          ( 'Hypothesis',                   'H',          '                       |-  P'                 ),
 
-          ( 'Negation Elimination',         '-E',         FitchLanguage.parseSeq( '--P                    |-  P'                ) ),
-          ( 'Negation Introduction',        '-I',         FitchLanguage.parseSeq( '( P  |-  Q ^ -Q )      |-  -P'               ) ),
+          ( 'Negation Elimination',         '-E',         '--P                    |-  P'                 ),
+          ( 'Negation Introduction',        '-I',         '( P  |-  Q ^ -Q )      |-  -P'                ),
 
-          ( 'Conjunction Elimination',      '^E',         FitchLanguage.parseSeq( 'P ^ Q                  |-  P, Q'             ) ),
-          ( 'Conjunction Introduction',     '^I',         FitchLanguage.parseSeq( 'P, Q                   |-  P ^ Q, Q ^ P'     ) ),
+          ( 'Conjunction Elimination',      '^E',         'P ^ Q                  |-  P, Q'              ),
+          ( 'Conjunction Introduction',     '^I',         'P, Q                   |-  P ^ Q, Q ^ P'      ),
 
-          ( 'Disjunction Elimination',      'vE',         FitchLanguage.parseSeq( 'P v Q, P -> R, Q -> R  |-  R'                ) ),
-          ( 'Disjunction Introduction',     'vI',         FitchLanguage.parseSeq( 'P                      |-  P v Q, Q v P'     ) ),
+          ( 'Disjunction Elimination',      'vE',         'P v Q, P -> R, Q -> R  |-  R'                 ),
+          ( 'Disjunction Introduction',     'vI',         'P                      |-  P v Q, Q v P'      ),
 
-          ( 'Conditional Elimination',      '->E',        FitchLanguage.parseSeq( 'P -> Q, P              |-  Q'                ) ),
-          ( 'Conditional Introduction',     '->I',        FitchLanguage.parseSeq( '( P  |-  Q )           |-  P -> Q'           ) ),
+          ( 'Conditional Elimination',      '->E',        'P -> Q, P              |-  Q'                 ),
+          ( 'Conditional Introduction',     '->I',        '( P  |-  Q )           |-  P -> Q'            ),
 
-          ( 'Biconditional Elimination',    '<->E',       FitchLanguage.parseSeq( 'P <-> Q                |-  P -> Q, Q -> P'   ) ),
-          ( 'Biconditional Introduction',   '<->I',       FitchLanguage.parseSeq( 'P -> Q, Q -> P         |-  P <-> Q, Q <-> P' ) ),
+          ( 'Biconditional Elimination',    '<->E',       'P <-> Q                |-  P -> Q, Q -> P'    ),
+          ( 'Biconditional Introduction',   '<->I',       'P -> Q, Q -> P         |-  P <-> Q, Q <-> P'  ),
 
-          ( 'Demorgan\'s Rule',             'DM',         FitchLanguage.parseSeq( ' |- -(P ^ Q)  <->  (-P v -Q)'                ) )
+          ( 'Demorgan\'s Rule',             'DM',         ' |- -(P ^ Q)  <->  (-P v -Q)'                 )
           ]
 
-FitchCalculus = Calculus( FitchRules, 'A', 'TI', 'AxI', True, 'H' )
+def _fitchCalculus( ):
+   return Calculus( _compiledRules( 'Fitch' ), 'A', 'TI', 'AxI', True, 'H' )
+
+Fitch = Logic( FitchLanguage, _fitchCalculus, 'Fitch' )
+
+
+# Registry of the predefined logics by name.
+Logics = { logic.name( ) : logic for logic in ( Gentzen, Gensler, Fitch ) }
+
+_ruleTexts = { 'Gentzen' : ( GentzenLanguage, _gentzenRuleTexts ),
+               'Gensler' : ( GenslerLanguage, _genslerRuleTexts ),
+               'Fitch'   : ( FitchLanguage,   _fitchRuleTexts   ) }
+_rules     = { }                            # logic name : compiled rule list
+
+
+def _compiledRules( logicName ):
+   """Returns the compiled rules of a predefined logic, compiling them once."""
+   rules = _rules.get( logicName )
+   if rules is None:
+      language, ruleTable = _ruleTexts[ logicName ]
+      rules = _rules[ logicName ] = compileRules( language, ruleTable, logicName )
+   return rules
+
 
-Fitch = Logic( FitchLanguage, FitchCalculus )
+def __getattr__( name ):
+   """Builds GentzenRules, GentzenCalculus and the like on first use.  The
+   rules are the ( name, abbreviation, Sequent ) list the calculus was built
+   from, and the calculus is the logic's own."""
+   for logicName in Logics:
+      if name == logicName + 'Rules':
+         return _compiledRules( logicName )
+      if name == logicName + 'Calculus':
+         return Logics[ logicName ].calculus( )
 
+   raise AttributeError( "module {0!r} has no attribute {1!r}".format( __name__, name ) )
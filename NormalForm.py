@@ -0,0 +1,743 @@
+"""This module implements NormalForm, the conversion of wffs to negation,
+conjunctive and disjunctive normal form.
+
+The conversion is driven by the truth tables of a Language's lexicon:  each
+truth-functional operator is given a role by its table,
+
+   ( 1, 0 )          negation
+   ( 0, 0, 0, 1 )    conjunction
+   ( 0, 1, 1, 1 )    disjunction
+   ( 1, 1, 0, 1 )    conditional
+   ( 1, 0, 0, 1 )    biconditional
+
+whatever its symbol.  Any other table is expanded by its rows.  The results
+are written with the language's own negation, conjunction and disjunction.
+
+   nnf( )    negation normal form:  negations on atoms only, no conditionals
+             or biconditionals.  Linear in the size of the wff, since wffs
+             are shared (a biconditional refers to its operands twice).
+   cnf( )    conjunctive normal form, by distribution.
+   dnf( )    disjunctive normal form, by distribution.
+   clauses( )
+             the clauses of the cnf, simplified:  repeated literals and
+             clauses and tautological clauses are dropped.  When the
+             distributed cnf would exceed CLAUSE_LIMIT clauses, the clauses
+             of the definitional cnf are returned instead.
+   definitionalCNF( )
+             the Plaisted-Greenbaum (or, on request, Tseitin) definitional
+             cnf:  each compound sub-wff of the nnf is named by a fresh atom,
+             so the result is linear in the size of the wff.  It is
+             satisfiable exactly when the wff is, but not equivalent to it.
+
+Conversions are memoized per sub-wff, in a cache shared by the calls made
+on one NormalForm.
+
+nnf( ), cnf( ) and dnf( ) can also trace the conversion as a series of
+rewrites (Calculus.EquivalenceRewrite) by the equivalence theorems of a
+calculus:  double negation, DeMorgan's, material implication and
+equivalence, distribution and commutation.  Each rewrite can be entered in a
+proof as an equivalence step citing the step before, and the last yields the
+converted wff.  The calculus must have the theorems the conversion uses.
+
+   normalForm = NormalForm( Logic.Gentzen.language( ), Logic.Gentzen.calculus( ) )
+   trace      = [ ]
+   normalForm.cnf( wff, trace )
+"""
+
+from collections import OrderedDict
+
+from Form import WFF, AtomicWFF, StructuredWFF
+from Calculus import Calculus, EquivalenceRewrite
+from Language import Language
+from PatternCompiler import compileMatcher, compileInstantiator
+from Semantics import NotTruthFunctionalError
+from Substitution import Substitution
+import Validation
+
+
+class NormalFormError( Exception ):
+   """The language or calculus lacks what a conversion needs."""
+
+
+# Operator roles
+NEGATION      = 'Negation'
+CONJUNCTION   = 'Conjunction'
+DISJUNCTION   = 'Disjunction'
+CONDITIONAL   = 'Conditional'
+BICONDITIONAL = 'Biconditional'
+OTHER         = 'Other'            # Truth-functional, expanded by its rows
+
+_ROLES = { ( 1, 0 )       : NEGATION,
+           ( 0, 0, 0, 1 ) : CONJUNCTION,
+           ( 0, 1, 1, 1 ) : DISJUNCTION,
+           ( 1, 1, 0, 1 ) : CONDITIONAL,
+           ( 1, 0, 0, 1 ) : BICONDITIONAL }
+
+
+class _TooManyClauses( Exception ):
+   pass
+
+
+class NormalForm( object ):
+   """Implementation of the normal form conversions of a Language."""
+   CACHE_SIZE       = 4096
+   CLAUSE_LIMIT     = 256
+   DEFINITION_ATOM  = '_d{0}'
+
+   def __init__( self, language, calculus=None ):
+      """Initialize a new instance of the class.  Build a new instance if the
+      lexicon of the language changes.
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Initializes an instance.
+      Preconditions: [AssertionError] 'language' must be a Language.
+                     [AssertionError] 'calculus' the Calculus whose
+                        equivalence theorems trace the conversions, or None.
+                     [NormalFormError] The language must have a negation, a
+                        conjunction and a disjunction.
+      """
+      Validation.requireType( language, Language,                   'language' )
+      Validation.requireType( calculus, ( Calculus, type( None ) ), 'calculus' )
+
+      self._language = language
+      self._calculus = calculus
+
+      self._roles   = { }      # operator symbol : role
+      self._symbols = { }      # role : the operator symbol written for it
+      for lex in language.lexemes( ):
+         if lex.truth is None:
+            continue
+
+         role = _ROLES.get( tuple( lex.truth ), OTHER )
+         for sym in lex.symbol:
+            self._roles[ sym ] = role
+         if role not in self._symbols:
+            self._symbols[ role ] = lex.symbol[ 0 ]
+
+      for role in ( NEGATION, CONJUNCTION, DISJUNCTION ):
+         if role not in self._symbols:
+            raise NormalFormError( 'The language has no {0}.'.format( role.lower( ) ) )
+
+      self._not = self._symbols[ NEGATION ]
+      self._and = self._symbols[ CONJUNCTION ]
+      self._or  = self._symbols[ DISJUNCTION ]
+
+      self._cache      = OrderedDict( )     # ( kind, wff, ... ) : result
+      self._cacheHits  = 0
+      self._cacheMiss  = 0
+
+      self._traceRules = { }                # rewrite name : ( rule, direction, matcher, instantiator )
+
+   def operatorRole( self, anOperator ):
+      """Returns the role of an operator, judged by its truth table.
+      Category:      Pure Function.
+      Returns:       (str) NEGATION, CONJUNCTION, DISJUNCTION, CONDITIONAL,
+                     BICONDITIONAL or OTHER.
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'anOperator' must be a str.
+                     [NotTruthFunctionalError] The operator must have a
+                        truth table.
+      """
+      Validation.requireType( anOperator, str, 'anOperator' )
+
+      role = self._roles.get( anOperator )
+      if role is None:
+         raise NotTruthFunctionalError( 'No truth table for operator {0}.'.format( anOperator ) )
+      return role
+
+   # Conversions
+   def nnf( self, aWFF, trace=None ):
+      """Returns the negation normal form of aWFF.
+      Category:      Pure Function.
+      Returns:       (WFF)
+      Side Effects:  Appends the rewrites of the conversion to 'trace'.
+      Preconditions: [AssertionError] 'aWFF' must be a WFF.
+                     [AssertionError] 'trace' a list, or None for no trace.
+                     [NotTruthFunctionalError] Every operator of aWFF must
+                        have a truth table.
+                     [NormalFormError] To trace, the calculus must have the
+                        equivalence theorems the conversion uses.
+      """
+      self._validate( aWFF, trace )
+
+      result = self._nnf( aWFF, True )
+      if trace is not None:
+         self._traceNNF( aWFF, ( ), trace )
+      return result
+
+   def cnf( self, aWFF, trace=None ):
+      """Returns the conjunctive normal form of aWFF, by distributing
+      disjunctions over the conjunctions of its nnf.  The result may be
+      exponentially larger than aWFF; see clauses( ).
+      Category:      Pure Function.
+      Returns:       (WFF)
+      Side Effects:  Appends the rewrites of the conversion to 'trace'.
+      Preconditions: See nnf( ).
+      """
+      self._validate( aWFF, trace )
+
+      result = self._normal( self._nnf( aWFF, True ), CONJUNCTION )
+      if trace is not None:
+         current = self._traceNNF( aWFF, ( ), trace )
+         self._traceNormal( current, ( ), CONJUNCTION, trace )
+      return result
+
+   def dnf( self, aWFF, trace=None ):
+      """Returns the disjunctive normal form of aWFF, by distributing
+      conjunctions over the disjunctions of its nnf.  The result may be
+      exponentially larger than aWFF.
+      Category:      Pure Function.
+      Returns:       (WFF)
+      Side Effects:  Appends the rewrites of the conversion to 'trace'.
+      Preconditions: See nnf( ).
+      """
+      self._validate( aWFF, trace )
+
+      result = self._normal( self._nnf( aWFF, True ), DISJUNCTION )
+      if trace is not None:
+         current = self._traceNNF( aWFF, ( ), trace )
+         self._traceNormal( current, ( ), DISJUNCTION, trace )
+      return result
+
+   def clauses( self, aWFF, definitional=None ):
+      """Returns the clauses of the cnf of aWFF.  Each clause is a tuple of
+      literals:  atoms and negated atoms.  Repeated literals and clauses and
+      tautological clauses are dropped, so a tautology has no clauses.
+      Category:      Pure Function.
+      Returns:       (tuple) ( list of clauses, definitions ).  The
+                     definitions map the symbol of each atom introduced by
+                     the definitional cnf to the (nnf) sub-wff it names;
+                     they are empty if the clauses are those of the cnf.
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'aWFF' must be a WFF.
+                     [AssertionError] 'definitional' True for the clauses of
+                        definitionalCNF( ), False for those of the cnf
+                        however many, or None for the cnf unless it would
+                        have more than CLAUSE_LIMIT clauses.
+                     [NotTruthFunctionalError] Every operator of aWFF must
+                        have a truth table.
+      """
+      Validation.requireType( aWFF,         WFF,                  'aWFF' )
+      Validation.requireType( definitional, ( bool, type( None ) ), 'definitional' )
+
+      nnf = self._nnf( aWFF, True )
+      if definitional is not True:
+         try:
+            return list( self._clauseSet( nnf, None if definitional is False else NormalForm.CLAUSE_LIMIT ) ), { }
+         except _TooManyClauses:
+            pass
+
+      return self._definitionalClauses( nnf, True )
+
+   def definitionalCNF( self, aWFF, polarityAware=True ):
+      """Returns the definitional cnf of aWFF.  Every compound sub-wff of the
+      nnf is named by a fresh atom, defined by clauses of its own.  With
+      'polarityAware' (Plaisted-Greenbaum) only the half of each definition
+      needed is given, since every sub-wff of an nnf occurs positively;
+      otherwise (Tseitin) both halves are.
+      Category:      Pure Function.
+      Returns:       (tuple) ( WFF, definitions ), see clauses( ).
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'aWFF' must be a WFF.
+                     [AssertionError] 'polarityAware' must be a bool.
+                     [NotTruthFunctionalError] Every operator of aWFF must
+                        have a truth table.
+      """
+      Validation.requireType( aWFF,          WFF,  'aWFF' )
+      Validation.requireType( polarityAware, bool, 'polarityAware' )
+
+      clauses, definitions = self._definitionalClauses( self._nnf( aWFF, True ), polarityAware )
+      return self._formOfClauses( clauses ), definitions
+
+   # Predicates
+   def isNNF( self, aWFF ):
+      """Is aWFF in negation normal form?
+      Category:      Predicate.
+      Returns:       (bool)
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'aWFF' must be a WFF.
+      """
+      Validation.requireType( aWFF, WFF, 'aWFF' )
+
+      pending = [ aWFF ]
+      while pending:
+         wff = pending.pop( )
+         if self._isLiteral( wff ):
+            continue
+         if self._roles.get( wff.primary( ) ) not in ( CONJUNCTION, DISJUNCTION ):
+            return False
+         pending.extend( wff.subordinates( ) )
+
+      return True
+
+   def isCNF( self, aWFF ):
+      """Is aWFF a conjunction of disjunctions of literals?
+      Category:      Predicate.
+      Returns:       (bool)
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'aWFF' must be a WFF.
+      """
+      Validation.requireType( aWFF, WFF, 'aWFF' )
+
+      return self._isNormal( aWFF, CONJUNCTION, DISJUNCTION )
+
+   def isDNF( self, aWFF ):
+      """Is aWFF a disjunction of conjunctions of literals?
+      Category:      Predicate.
+      Returns:       (bool)
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'aWFF' must be a WFF.
+      """
+      Validation.requireType( aWFF, WFF, 'aWFF' )
+
+      return self._isNormal( aWFF, DISJUNCTION, CONJUNCTION )
+
+   # Cache
+   def cacheInfo( self ):
+      """Returns the cache statistics.
+      Category:      Pure Function.
+      Returns:       (dict) with the keys 'hits', 'misses', 'size' and 'maxSize'.
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      return { 'hits'    : self._cacheHits,
+               'misses'  : self._cacheMiss,
+               'size'    : len( self._cache ),
+               'maxSize' : NormalForm.CACHE_SIZE }
+
+   def invalidateCache( self ):
+      """Discard every memoized conversion.
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Empties the cache and resets its counters.
+      Preconditions: None.
+      """
+      self._cache.clear( )
+      self._cacheHits = 0
+      self._cacheMiss = 0
+
+   # Implementation
+   def _validate( self, aWFF, trace ):
+      Validation.requireType( aWFF,  WFF,                  'aWFF' )
+      Validation.requireType( trace, ( list, type( None ) ), 'trace' )
+
+   def _cached( self, key ):
+      result = self._cache.get( key )
+      if result is None:
+         self._cacheMiss += 1
+      else:
+         self._cacheHits += 1
+         self._cache.move_to_end( key )
+      return result
+
+   def _cacheResult( self, key, result ):
+      self._cache[ key ] = result
+      if len( self._cache ) > NormalForm.CACHE_SIZE:
+         self._cache.popitem( last=False )
+      return result
+
+   def _role( self, aWFF ):
+      """Returns the role of the main operator of aWFF, or None for an atom."""
+      if aWFF.isAtomic( ):
+         return None
+
+      role = self._roles.get( aWFF.primary( ) )
+      if role is None:
+         raise NotTruthFunctionalError( 'No truth table for operator {0}.'.format( aWFF.primary( ) ) )
+      return role
+
+   def _isLiteral( self, aWFF ):
+      return aWFF.isAtomic( ) or ( ( self._roles.get( aWFF.primary( ) ) is NEGATION ) and aWFF.subordinates( )[ 0 ].isAtomic( ) )
+
+   def _isNormal( self, aWFF, outer, inner ):
+      pending = [ aWFF ]
+      while pending:
+         wff = pending.pop( )
+         if self._isLiteral( wff ):
+            continue
+         if self._roles.get( wff.primary( ) ) is not outer:
+            return self._isJunction( wff, inner )
+         pending.extend( wff.subordinates( ) )
+
+      return True
+
+   def _isJunction( self, aWFF, role ):
+      pending = [ aWFF ]
+      while pending:
+         wff = pending.pop( )
+         if self._isLiteral( wff ):
+            continue
+         if self._roles.get( wff.primary( ) ) is not role:
+            return False
+         pending.extend( wff.subordinates( ) )
+
+      return True
+
+   def _negate( self, aWFF ):
+      return StructuredWFF( self._not, aWFF )
+
+   def _complement( self, literal ):
+      if literal.isAtomic( ):
+         return StructuredWFF( self._not, literal )
+      return literal.subordinates( )[ 0 ]
+
+   # Negation normal form
+   def _nnf( self, aWFF, positive ):
+      """Returns the nnf of aWFF, or of its negation if not 'positive'."""
+      if aWFF.isAtomic( ):
+         return aWFF if positive else self._negate( aWFF )
+
+      key    = ( 'nnf', aWFF, positive )
+      result = self._cached( key )
+      if result is not None:
+         return result
+
+      role     = self._role( aWFF )
+      operands = aWFF.subordinates( )
+      if role is NEGATION:
+         result = self._nnf( operands[ 0 ], not positive )
+      elif role is CONJUNCTION:
+         result = self._junction( CONJUNCTION if positive else DISJUNCTION,
+                                  self._nnf( operands[ 0 ], positive ), self._nnf( operands[ 1 ], positive ) )
+      elif role is DISJUNCTION:
+         result = self._junction( DISJUNCTION if positive else CONJUNCTION,
+                                  self._nnf( operands[ 0 ], positive ), self._nnf( operands[ 1 ], positive ) )
+      elif role is CONDITIONAL:
+         # P > Q is ~P v Q;  ~(P > Q) is P & ~Q.
+         result = self._junction( DISJUNCTION if positive else CONJUNCTION,
+                                  self._nnf( operands[ 0 ], not positive ), self._nnf( operands[ 1 ], positive ) )
+      elif role is BICONDITIONAL:
+         # P <-> Q is (P & Q) v (~P & ~Q);  ~(P <-> Q) is (~P v ~Q) & (P v Q).
+         posP, posQ = self._nnf( operands[ 0 ], True  ), self._nnf( operands[ 1 ], True  )
+         negP, negQ = self._nnf( operands[ 0 ], False ), self._nnf( operands[ 1 ], False )
+         if positive:
+            result = StructuredWFF( self._or,  StructuredWFF( self._and, posP, posQ ), StructuredWFF( self._and, negP, negQ ) )
+         else:
+            result = StructuredWFF( self._and, StructuredWFF( self._or,  negP, negQ ), StructuredWFF( self._or,  posP, posQ ) )
+      else:
+         result = self._expand( aWFF, positive )
+
+      return self._cacheResult( key, result )
+
+   def _junction( self, role, left, right ):
+      return StructuredWFF( self._and if role is CONJUNCTION else self._or, left, right )
+
+   def _expand( self, aWFF, positive ):
+      """The nnf of an operator of any other truth table:  the disjunction,
+      over the rows in which it takes the value wanted, of the conjunction
+      of its operands taking the row's values."""
+      table    = self._language.truthTable( aWFF.primary( ) )
+      operands = aWFF.subordinates( )
+      arity    = len( operands )
+      if len( table ) != ( 1 << arity ):
+         raise NotTruthFunctionalError( 'No truth table for operator {0}.'.format( aWFF.primary( ) ) )
+
+      result = None
+      for inputs, value in enumerate( table ):
+         if bool( value ) != positive:
+            continue
+
+         term = None
+         for position, operand in enumerate( operands ):
+            literal = self._nnf( operand, bool( ( inputs >> ( arity - 1 - position ) ) & 1 ) )
+            term    = literal if term is None else StructuredWFF( self._and, term, literal )
+         result = term if result is None else StructuredWFF( self._or, result, term )
+
+      if result is None:
+         # Never takes the value wanted:  a contradiction.
+         first  = self._nnf( operands[ 0 ], True )
+         result = StructuredWFF( self._and, first, self._nnf( operands[ 0 ], False ) )
+
+      return result
+
+   # Conjunctive and disjunctive normal form
+   def _normal( self, nnf, outer ):
+      """Returns the cnf (outer CONJUNCTION) or dnf (outer DISJUNCTION) of an nnf."""
+      if self._isLiteral( nnf ):
+         return nnf
+
+      key    = ( outer, nnf )
+      result = self._cached( key )
+      if result is not None:
+         return result
+
+      left, right = ( self._normal( operand, outer ) for operand in nnf.subordinates( ) )
+      if self._roles[ nnf.primary( ) ] is outer:
+         result = StructuredWFF( nnf.primary( ), left, right )
+      else:
+         result = self._distribute( left, right, outer )
+
+      return self._cacheResult( key, result )
+
+   def _distribute( self, left, right, outer ):
+      """Returns left (inner) right, in normal form, where both are in
+      normal form, by distributing the inner operator over the outer."""
+      inner = DISJUNCTION if outer is CONJUNCTION else CONJUNCTION
+      if self._role( right ) is outer:
+         # P v (Q & R) is (P v Q) & (P v R)
+         right1, right2 = right.subordinates( )
+         return self._junction( outer, self._distribute( left, right1, outer ), self._distribute( left, right2, outer ) )
+      elif self._role( left ) is outer:
+         # (Q & R) v P is P v (Q & R)
+         left1, left2 = left.subordinates( )
+         return self._junction( outer, self._distribute( right, left1, outer ), self._distribute( right, left2, outer ) )
+      else:
+         return self._junction( inner, left, right )
+
+   # Clauses
+   def _clauseSet( self, nnf, limit ):
+      """Returns the simplified clauses of the cnf of an nnf, as a tuple of
+      tuples of literals.  Raises _TooManyClauses past 'limit' (if any)."""
+      key    = ( 'clauses', nnf )
+      result = self._cached( key )
+      if result is not None:
+         return result
+
+      if self._isLiteral( nnf ):
+         result = ( ( nnf, ), )
+      else:
+         left, right = ( self._clauseSet( operand, limit ) for operand in nnf.subordinates( ) )
+         seen   = set( )
+         result = [ ]
+         if self._roles[ nnf.primary( ) ] is CONJUNCTION:
+            candidates = left + right
+         else:
+            if ( limit is not None ) and ( len( left ) * len( right ) > limit ):
+               raise _TooManyClauses
+            candidates = ( leftClause + tuple( literal for literal in rightClause if literal not in leftClause )
+                           for leftClause in left for rightClause in right )
+
+         for clause in candidates:
+            members = frozenset( clause )
+            if ( members in seen ) or any( self._complement( literal ) in members for literal in clause ):
+               continue
+            seen.add( members )
+            result.append( clause )
+
+         if ( limit is not None ) and ( len( result ) > limit ):
+            raise _TooManyClauses
+         result = tuple( result )
+
+      return self._cacheResult( key, result )
+
+   def _definitionalClauses( self, nnf, polarityAware ):
+      """Returns ( clauses, definitions ) of the definitional cnf of an nnf."""
+      clauses     = [ ]
+      definitions = { }
+      names       = { }      # sub-wff : the atom naming it
+      taken       = set( nnf.atomList( ) )
+      counter     = [ 0 ]
+
+      def fresh( ):
+         while True:
+            counter[ 0 ] += 1
+            symbol = NormalForm.DEFINITION_ATOM.format( counter[ 0 ] )
+            if symbol not in taken:
+               return symbol
+
+      def literalOf( wff ):
+         """Returns a literal standing for wff, defining it if need be."""
+         if self._isLiteral( wff ):
+            return wff
+
+         name = names.get( wff )
+         if name is not None:
+            return name
+
+         symbol = fresh( )
+         name   = names[ wff ] = AtomicWFF( symbol )
+         definitions[ symbol ] = wff
+
+         role     = self._roles[ wff.primary( ) ]
+         literals = [ literalOf( member ) for member in self._members( wff, role ) ]
+         notName  = self._negate( name )
+         if role is CONJUNCTION:
+            # name > each member;  (all members) > name
+            for literal in literals:
+               clauses.append( ( notName, literal ) )
+            if not polarityAware:
+               clauses.append( ( name, ) + tuple( self._complement( literal ) for literal in literals ) )
+         else:
+            # name > some member;  each member > name
+            clauses.append( ( notName, ) + tuple( literals ) )
+            if not polarityAware:
+               for literal in literals:
+                  clauses.append( ( name, self._complement( literal ) ) )
+         return name
+
+      for conjunct in self._members( nnf, CONJUNCTION ):
+         if self._isLiteral( conjunct ):
+            clauses.append( ( conjunct, ) )
+         else:
+            clauses.append( tuple( literalOf( member ) for member in self._members( conjunct, DISJUNCTION ) ) )
+
+      return clauses, definitions
+
+   def _members( self, nnf, role ):
+      """Returns the operands of a chain of role operators, flattened."""
+      members = [ ]
+      pending = [ nnf ]
+      while pending:
+         wff = pending.pop( )
+         if ( not self._isLiteral( wff ) ) and ( self._roles[ wff.primary( ) ] is role ):
+            pending.extend( reversed( wff.subordinates( ) ) )
+         else:
+            members.append( wff )
+      return members
+
+   def _formOfClauses( self, clauses ):
+      result = None
+      for clause in clauses:
+         disjunction = None
+         for literal in clause:
+            disjunction = literal if disjunction is None else StructuredWFF( self._or, disjunction, literal )
+         result = disjunction if result is None else StructuredWFF( self._and, result, disjunction )
+      return result
+
+   # Traces
+   def _traceRule( self, name ):
+      """Returns ( rule, direction, matcher, instantiator ) of the equivalence
+      theorem which rewrites the left side of the named template into its
+      right side."""
+      found = self._traceRules.get( name )
+      if found is not None:
+         return found
+
+      if self._calculus is None:
+         raise NormalFormError( 'A calculus is needed to trace a conversion.' )
+
+      template = self._template( name )
+      if template is None:
+         raise NormalFormError( 'The language has no operator for {0}.'.format( name ) )
+      fromTemplate, toTemplate = template
+
+      for rule in self._calculus.ruleList( ):
+         if not self._language.isEquivalenceTheorem( rule.sequent ):
+            continue
+
+         sides = rule.sequent.conclusionFormSet( )[ 0 ].subordinates( )
+         for direction in ( EquivalenceRewrite.FORWARD, EquivalenceRewrite.BACKWARD ):
+            fromSide, toSide = sides[ direction ], sides[ 1 - direction ]
+            mapping = compileMatcher( fromSide )( fromTemplate, Substitution.EMPTY )
+            if ( mapping is None ) or any( not value.isAtomic( ) for value in mapping.values( ) ):
+               continue
+            if len( set( mapping.values( ) ) ) != len( mapping ):
+               continue
+
+            try:
+               if toSide.makeInstance( mapping ) is not toTemplate:
+                  continue
+            except ( KeyError, ValueError ):
+               continue
+
+            found = self._traceRules[ name ] = ( rule, direction, compileMatcher( fromSide ), compileInstantiator( toSide ) )
+            return found
+
+      raise NormalFormError( 'The calculus has no equivalence theorem for {0}.'.format( name ) )
+
+   def _template( self, name ):
+      P, Q, R = AtomicWFF( 'P' ), AtomicWFF( 'Q' ), AtomicWFF( 'R' )
+      NOT = lambda wff: StructuredWFF( self._not, wff )
+      AND = lambda left, right: StructuredWFF( self._and, left, right )
+      OR  = lambda left, right: StructuredWFF( self._or,  left, right )
+
+      if name == 'Double Negation':
+         return NOT( NOT( P ) ), P
+      elif name == "DeMorgan's (Conj)":
+         return NOT( AND( P, Q ) ), OR( NOT( P ), NOT( Q ) )
+      elif name == "DeMorgan's (Disj)":
+         return NOT( OR( P, Q ) ), AND( NOT( P ), NOT( Q ) )
+      elif name == 'Material Implication':
+         if CONDITIONAL not in self._symbols:
+            return None
+         return StructuredWFF( self._symbols[ CONDITIONAL ], P, Q ), OR( NOT( P ), Q )
+      elif name == 'Material Equivalence':
+         if BICONDITIONAL not in self._symbols:
+            return None
+         return StructuredWFF( self._symbols[ BICONDITIONAL ], P, Q ), OR( AND( P, Q ), AND( NOT( P ), NOT( Q ) ) )
+      elif name == 'Distribution (Disj)':
+         return OR( P, AND( Q, R ) ), AND( OR( P, Q ), OR( P, R ) )
+      elif name == 'Distribution (Conj)':
+         return AND( P, OR( Q, R ) ), OR( AND( P, Q ), AND( P, R ) )
+      elif name == 'Commutation (Disj)':
+         return OR( P, Q ), OR( Q, P )
+      elif name == 'Commutation (Conj)':
+         return AND( P, Q ), AND( Q, P )
+      return None
+
+   def _rewrite( self, current, path, name, trace ):
+      """Rewrite the sub-wff of current at path by the named template."""
+      rule, direction, matcher, instantiator = self._traceRule( name )
+      subWFF  = current.subWFFAt( path )
+      mapping = matcher( subWFF, Substitution.EMPTY )
+      if mapping is None:
+         raise NormalFormError( '{0} does not apply to {1}.'.format( rule.name, subWFF ) )
+
+      replacement = instantiator( mapping )
+      result      = current.replaceAt( path, replacement )
+      trace.append( EquivalenceRewrite( rule, path, direction, mapping, subWFF, replacement, result ) )
+      return result
+
+   def _traceNNF( self, current, path, trace ):
+      """Rewrite the sub-wff of current at path into its nnf, as _nnf( )."""
+      while True:
+         subWFF = current.subWFFAt( path )
+         role   = self._role( subWFF )
+         if role is None:
+            return current
+
+         if role is NEGATION:
+            innerRole = self._role( subWFF.subordinates( )[ 0 ] )
+            if innerRole is None:
+               return current
+            elif innerRole is NEGATION:
+               current = self._rewrite( current, path, 'Double Negation', trace )
+            elif innerRole is CONJUNCTION:
+               current = self._rewrite( current, path, "DeMorgan's (Conj)", trace )
+            elif innerRole is DISJUNCTION:
+               current = self._rewrite( current, path, "DeMorgan's (Disj)", trace )
+            elif innerRole is CONDITIONAL:
+               current = self._rewrite( current, path + ( 0, ), 'Material Implication', trace )
+            elif innerRole is BICONDITIONAL:
+               current = self._rewrite( current, path + ( 0, ), 'Material Equivalence', trace )
+            else:
+               raise NormalFormError( 'No equivalence theorem rewrites {0}.'.format( subWFF.subordinates( )[ 0 ].primary( ) ) )
+         elif role is CONDITIONAL:
+            current = self._rewrite( current, path, 'Material Implication', trace )
+         elif role is BICONDITIONAL:
+            current = self._rewrite( current, path, 'Material Equivalence', trace )
+         elif role in ( CONJUNCTION, DISJUNCTION ):
+            current = self._traceNNF( current, path + ( 0, ), trace )
+            return self._traceNNF( current, path + ( 1, ), trace )
+         else:
+            raise NormalFormError( 'No equivalence theorem rewrites {0}.'.format( subWFF.primary( ) ) )
+
+   def _traceNormal( self, current, path, outer, trace ):
+      """Rewrite the nnf at path of current into normal form, as _normal( )."""
+      subWFF = current.subWFFAt( path )
+      if self._isLiteral( subWFF ):
+         return current
+
+      current = self._traceNormal( current, path + ( 0, ), outer, trace )
+      current = self._traceNormal( current, path + ( 1, ), outer, trace )
+      if self._roles[ subWFF.primary( ) ] is outer:
+         return current
+      return self._traceDistribute( current, path, outer, trace )
+
+   def _traceDistribute( self, current, path, outer, trace ):
+      """Rewrite the sub-wff of current at path, left (inner) right, as
+      _distribute( )."""
+      distribution, commutation = ( ( 'Distribution (Disj)', 'Commutation (Disj)' ) if outer is CONJUNCTION else
+                                    ( 'Distribution (Conj)', 'Commutation (Conj)' ) )
+
+      left, right = current.subWFFAt( path ).subordinates( )
+      if self._role( right ) is outer:
+         current = self._rewrite( current, path, distribution, trace )
+      elif self._role( left ) is outer:
+         current = self._rewrite( current, path, commutation,  trace )
+         current = self._rewrite( current, path, distribution, trace )
+      else:
+         return current
+
+      current = self._traceDistribute( current, path + ( 0, ), outer, trace )
+      return self._traceDistribute( current, path + ( 1, ), outer, trace )
@@ -0,0 +1,224 @@
+"""This module compiles the pattern forms of inference rules into Python
+functions specialized to each pattern.
+
+compileMatcher( pattern ) returns a function equivalent to pattern._mapTo:
+it checks the operator structure of an instance against the pattern, then
+binds (or compares) the pattern's atoms in a fixed order.  For the pattern
+(P > Q) > P the generated source is:
+
+   def match( x0, m ):
+      if ( x0.__class__ is not StructuredWFF ) or ( x0._operator != '>' ) or ( len( x0._operands ) != 2 ):
+         return None
+      x1, x2 = x0._operands
+      if ( x1.__class__ is not StructuredWFF ) or ( x1._operator != '>' ) or ( len( x1._operands ) != 2 ):
+         return None
+      x3, x4 = x1._operands
+      b0 = m.get( 'P' )
+      if b0 is None:
+         b0 = x2
+         m = m.extend( 'P', x2 )
+      elif b0 is not x2:
+         return None
+      if x3 is not b0:
+         return None
+      ...
+      return m
+
+compileSetMatcher( formSet ) returns a generator of the mappings of a set of
+patterns one-to-one onto a list of instances, as nested loops over the
+instances with one compiled matcher per pattern.
+
+compileInstantiator( pattern ) returns a function equivalent to
+pattern.makeInstance, which builds the instance with one constructor call
+per operator.
+
+Wffs are interned, so each pattern is compiled once however many rules it
+occurs in.  Patterns which are not wffs (nested sequents) are matched and
+instantiated by their own methods.
+"""
+
+import threading
+
+from Form import WFF, AtomicWFF, StructuredWFF, FormSet
+
+
+_matchers       = { }        # pattern WFF : compiled matcher
+_instantiators  = { }        # pattern WFF : compiled instantiator
+_lock           = threading.Lock( )
+
+
+def compileMatcher( pattern ):
+   """Returns the compiled matcher of a pattern.
+   Category:      Pure Function.
+   Returns:       (function) f( instance, mapping ) -> Substitution or None,
+                  equivalent to pattern._mapTo( instance, mapping ).
+   Side Effects:  Caches the matcher of a wff pattern.
+   Preconditions: [AssertionError] 'pattern' must be a Form.
+   """
+   if not isinstance( pattern, WFF ):
+      return pattern._mapTo
+
+   matcher = _matchers.get( pattern )
+   if matcher is None:
+      matcher = _compile( _matcherSource( pattern ), 'match' )
+      with _lock:
+         matcher = _matchers.setdefault( pattern, matcher )
+   return matcher
+
+
+def compileSetMatcher( formSet, observer=None ):
+   """Returns the compiled matcher of a set of patterns.
+   Category:      Pure Function.
+   Returns:       (function) f( instances, mapping ), where 'instances' is a
+                  list of Forms, generating each consistent mapping
+                  (Substitution) of the patterns one-to-one onto the
+                  instances which extends 'mapping', as
+                  formSet.iterMappings( ) does.  The patterns with operators
+                  are matched first, each against the instances in order.
+   Side Effects:  None.
+   Preconditions: [AssertionError] 'formSet' must be a FormSet.
+                  [AssertionError] 'observer' if given, a function of no
+                     arguments called each time a pattern fails to match an
+                     instance and the search backtracks (see Profiling).
+   """
+   assert isinstance( formSet, FormSet )
+
+   patterns  = sorted( formSet, key=lambda form: isinstance( form, AtomicWFF ) )
+   namespace = { 'observer' : observer }
+   lines     = [ 'def matchSet( xs, m0 ):',
+                 '   if len( xs ) != {0}:'.format( len( patterns ) ),
+                 '      return' ]
+   indent    = '   '
+   for index, pattern in enumerate( patterns ):
+      namespace[ 'p{0}'.format( index ) ] = _shapeCheckedMatcher( pattern )
+      lines.append( '{0}for i{1} in range( {2} ):'.format( indent, index, len( patterns ) ) )
+      indent += '   '
+      if index > 0:
+         lines.append( '{0}if i{1} in ( {2}, ):'.format( indent, index, ', '.join( 'i{0}'.format( k ) for k in range( index ) ) ) )
+         lines.append( '{0}   continue'.format( indent ) )
+      lines.append( '{0}m{1} = p{2}( xs[ i{2} ], m{2} )'.format( indent, index + 1, index ) )
+      lines.append( '{0}if m{1} is None:'.format( indent, index + 1 ) )
+      if observer is not None:
+         lines.append( '{0}   observer( )'.format( indent ) )
+      lines.append( '{0}   continue'.format( indent ) )
+   lines.append( '{0}yield m{1}'.format( indent, len( patterns ) ) )
+
+   return _compile( '\n'.join( lines ) + '\n', 'matchSet', namespace )
+
+
+def _shapeCheckedMatcher( pattern ):
+   # The compiled matcher of a wff checks the shape of the instance itself;
+   # _mapTo of other forms presumes an instance of the same kind.
+   if isinstance( pattern, WFF ):
+      return compileMatcher( pattern )
+
+   def match( instance, mapping ):
+      if pattern._shapeMatches( instance ):
+         return pattern._mapTo( instance, mapping )
+      return None
+
+   return match
+
+
+def compileInstantiator( pattern ):
+   """Returns the compiled instantiator of a pattern.
+   Category:      Pure Function.
+   Returns:       (function) f( mapping ) -> Form, equivalent to
+                  pattern.makeInstance( mapping ).  A FormSet pattern yields
+                  a new FormSet of the instances of its members, in order.
+   Side Effects:  Caches the instantiator of a wff pattern.
+   Preconditions: [AssertionError] 'pattern' must be a Form.
+   """
+   if isinstance( pattern, FormSet ):
+      memberInstantiators = [ compileInstantiator( member ) for member in pattern ]
+
+      def instantiateSet( mapping ):
+         result = FormSet( )
+         for instantiate in memberInstantiators:
+            result.append( instantiate( mapping ) )
+         return result
+
+      return instantiateSet
+
+   if not isinstance( pattern, WFF ):
+      return pattern.makeInstance
+
+   instantiator = _instantiators.get( pattern )
+   if instantiator is None:
+      instantiator = _compile( _instantiatorSource( pattern ), 'instantiate' )
+      with _lock:
+         instantiator = _instantiators.setdefault( pattern, instantiator )
+   return instantiator
+
+
+def _compile( source, name, namespace=None ):
+   namespace = dict( namespace or { }, WFF=WFF, StructuredWFF=StructuredWFF )
+   exec( compile( source, '<pattern>', 'exec' ), namespace )
+   return namespace[ name ]
+
+
+def _matcherSource( pattern ):
+   """Returns the source of the matcher of a wff pattern.  Every operator
+   is tested before any atom is bound, so a mismatch costs no bindings."""
+   lines    = [ 'def match( x0, m ):' ]
+   bindings = [ ]               # ( atom symbol, instance variable ), preorder
+   numVars  = 1
+
+   if isinstance( pattern, AtomicWFF ):
+      lines.append( '   if not isinstance( x0, WFF ):' )
+      lines.append( '      return None' )
+
+   pending = [ ( pattern, 'x0' ) ]
+   while pending:
+      form, var = pending.pop( 0 )
+      if isinstance( form, AtomicWFF ):
+         bindings.append( ( form.primary( ), var ) )
+         continue
+
+      operands = form.subordinates( )
+      lines.append( '   if ( {0}.__class__ is not StructuredWFF ) or ( {0}._operator != {1!r} ) or ( len( {0}._operands ) != {2} ):'.format( var, form.primary( ), len( operands ) ) )
+      lines.append( '      return None' )
+
+      operandVars = [ 'x{0}'.format( numVars + index ) for index in range( len( operands ) ) ]
+      numVars    += len( operands )
+      lines.append( '   {0}{1} = {2}._operands'.format( ', '.join( operandVars ), ',' if len( operandVars ) == 1 else '', var ) )
+      pending.extend( zip( operands, operandVars ) )
+
+   bound = { }                  # atom symbol : binding variable
+   for symbol, var in bindings:
+      bindingVar = bound.get( symbol )
+      if bindingVar is None:
+         bindingVar = bound[ symbol ] = 'b{0}'.format( len( bound ) )
+         lines.append( '   {0} = m.get( {1!r} )'.format( bindingVar, symbol ) )
+         lines.append( '   if {0} is None:'.format( bindingVar ) )
+         lines.append( '      {0} = {1}'.format( bindingVar, var ) )
+         lines.append( '      m = m.extend( {0!r}, {1} )'.format( symbol, var ) )
+         lines.append( '   elif {0} is not {1}:'.format( bindingVar, var ) )
+         lines.append( '      return None' )
+      else:
+         lines.append( '   if {0} is not {1}:'.format( var, bindingVar ) )
+         lines.append( '      return None' )
+
+   lines.append( '   return m' )
+   return '\n'.join( lines ) + '\n'
+
+
+def _instantiatorSource( pattern ):
+   """Returns the source of the instantiator of a wff pattern."""
+   lines = [ 'def instantiate( m ):' ]
+   bound = { }                  # atom symbol : binding variable
+
+   def expression( form ):
+      if isinstance( form, AtomicWFF ):
+         symbol = form.primary( )
+         if symbol not in bound:
+            bound[ symbol ] = 'b{0}'.format( len( bound ) )
+            lines.append( '   {0} = m[ {1!r} ]'.format( bound[ symbol ], symbol ) )
+         return bound[ symbol ]
+
+      operands = [ expression( operand ) for operand in form.subordinates( ) ]
+      return 'StructuredWFF( {0!r}, {1} )'.format( form.primary( ), ', '.join( operands ) )
+
+   result = expression( pattern )
+   lines.append( '   return {0}'.format( result ) )
+   return '\n'.join( lines ) + '\n'
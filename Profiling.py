@@ -0,0 +1,290 @@
+"""This module instruments the inference pipeline for profiling.
+
+While profiling is enabled, each call of these is counted and timed, per
+inference rule where there is one:
+
+   Calculus.applyInference            by rule
+   InferenceRule.applyTo              by rule
+   InferenceRule.matchPremises        by rule:  mapping the premise forms
+   InferenceRule.instantiateConclusions
+                                      by rule:  building the conclusions
+   EquivalenceInference.resolve       by rule
+   FormSet._mapSets
+   Language.parseSeq
+
+and two events are counted against every call in progress when they occur:
+
+   backtracks   a pattern tried against an instance which it does not match
+   copies       a Substitution made by extending or converting a mapping
+
+The times are wall-clock and inclusive:  the time of applyInference includes
+that of the applyTo it calls, and so on.
+
+Profiling works by replacing the methods above with counting versions when it
+is enabled and restoring the originals when it is disabled, so it costs
+nothing while it is off.
+
+   with Profiling.profiling( ) as stats:
+      calculus.applyInference( 'MP', premises )
+   print( Profiling.report( stats ) )
+
+Each thread keeps its own stack of calls in progress; the counters are
+shared, so profile one thread at a time.
+"""
+
+import contextlib
+import threading
+import time
+
+
+class Counters( object ):
+   """The counters of one instrumented method (and rule)."""
+   __slots__ = ( 'calls', 'seconds', 'backtracks', 'copies' )
+
+   def __init__( self ):
+      self.calls      = 0
+      self.seconds    = 0.0
+      self.backtracks = 0
+      self.copies     = 0
+
+   def __repr__( self ):
+      return 'Counters( calls={0}, seconds={1:.6f}, backtracks={2}, copies={3} )'.format( self.calls, self.seconds, self.backtracks, self.copies )
+
+   def copy( self ):
+      result = Counters( )
+      result.calls      = self.calls
+      result.seconds    = self.seconds
+      result.backtracks = self.backtracks
+      result.copies     = self.copies
+      return result
+
+
+# The counters of events outside any instrumented call.
+UNATTRIBUTED = ( '(none)', None )
+
+_counters  = { }                   # ( site, rule name or None ) : Counters
+_local     = threading.local( )    # .stack:  Counters of the calls in progress
+_enabled   = 0                     # Nesting depth of enable( )
+_originals = [ ]                   # ( owner, attribute name, original ) to restore
+_premiseMatchers = { }             # InferenceRule : set matcher reporting backtracks
+
+
+def isEnabled( ):
+   """Returns True if profiling is enabled.
+   Category:      Pure Function.
+   Returns:       (bool)
+   Side Effects:  None.
+   Preconditions: None.
+   """
+   return _enabled > 0
+
+
+def enable( ):
+   """Start profiling.  Calls nest:  profiling stops at the matching disable( ).
+   Category:      Mutator.
+   Returns:       Nothing.
+   Side Effects:  Instruments the inference pipeline.
+   Preconditions: None.
+   """
+   global _enabled
+
+   _enabled += 1
+   if _enabled == 1:
+      _instrument( )
+
+
+def disable( ):
+   """Stop profiling (see enable( )).  The counters are kept.
+   Category:      Mutator.
+   Returns:       Nothing.
+   Side Effects:  Restores the inference pipeline.
+   Preconditions: [AssertionError] Profiling must be enabled.
+   """
+   global _enabled
+
+   assert _enabled > 0
+
+   _enabled -= 1
+   if _enabled == 0:
+      _restore( )
+
+
+def reset( ):
+   """Clear the counters.
+   Category:      Mutator.
+   Returns:       Nothing.
+   Side Effects:  Clears the counters.
+   Preconditions: None.
+   """
+   _counters.clear( )
+
+
+def snapshot( ):
+   """Returns a copy of the counters.
+   Category:      Pure Function.
+   Returns:       (dict) ( site, rule name or None ) : Counters
+   Side Effects:  None.
+   Preconditions: None.
+   """
+   return { key : counters.copy( ) for key, counters in _counters.items( ) }
+
+
+@contextlib.contextmanager
+def profiling( clear=True ):
+   """Profile a block of code.
+   Category:      Mutator.
+   Returns:       (context manager) Yields a dict which is filled with the
+                  snapshot( ) of the counters when the block exits.
+   Side Effects:  Enables profiling for the block.
+   Preconditions: [AssertionError] 'clear' if True, the counters are reset
+                     first.
+   """
+   if clear:
+      reset( )
+
+   stats = { }
+   enable( )
+   try:
+      yield stats
+   finally:
+      disable( )
+      stats.update( snapshot( ) )
+
+
+def report( stats=None ):
+   """Format counters as a table, slowest first.
+   Category:      Pure Function.
+   Returns:       (str)
+   Side Effects:  None.
+   Preconditions: [AssertionError] 'stats' a snapshot( ), or None for the
+                     current counters.
+   """
+   if stats is None:
+      stats = snapshot( )
+
+   lines = [ '{0:<38}{1:<30}{2:>9}{3:>12}{4:>12}{5:>11}'.format( 'site', 'rule', 'calls', 'ms', 'backtracks', 'copies' ) ]
+   for ( site, ruleName ), counters in sorted( stats.items( ), key=lambda item: -item[ 1 ].seconds ):
+      lines.append( '{0:<38}{1:<30}{2:>9}{3:>12.3f}{4:>12}{5:>11}'.format( site, ruleName or '', counters.calls, counters.seconds * 1000.0,
+                                                                           counters.backtracks, counters.copies ) )
+   return '\n'.join( lines )
+
+
+# Implementation
+def _countersOf( site, ruleName ):
+   counters = _counters.get( ( site, ruleName ) )
+   if counters is None:
+      counters = _counters[ ( site, ruleName ) ] = Counters( )
+   return counters
+
+
+def _stack( ):
+   stack = getattr( _local, 'stack', None )
+   if stack is None:
+      stack = _local.stack = [ ]
+   return stack
+
+
+def _noteBacktrack( ):
+   stack = _stack( )
+   for counters in stack or ( _countersOf( *UNATTRIBUTED ), ):
+      counters.backtracks += 1
+
+
+def _noteCopy( ):
+   stack = _stack( )
+   for counters in stack or ( _countersOf( *UNATTRIBUTED ), ):
+      counters.copies += 1
+
+
+def _timed( site, function, ruleOf=None ):
+   """Returns a version of function which is counted and timed under site.
+   'ruleOf' maps the call's arguments to the name of its rule."""
+   def timed( *args, **kwargs ):
+      counters = _countersOf( site, ruleOf( args ) if ruleOf is not None else None )
+      counters.calls += 1
+      stack = _stack( )
+      stack.append( counters )
+      start = time.perf_counter( )
+      try:
+         return function( *args, **kwargs )
+      finally:
+         counters.seconds += time.perf_counter( ) - start
+         stack.pop( )
+
+   timed.__wrapped__ = function
+   return timed
+
+
+def _replace( owner, name, replacement ):
+   _originals.append( ( owner, name, owner.__dict__[ name ] ) )
+   setattr( owner, name, replacement )
+
+
+def _instrument( ):
+   from Calculus import Calculus, InferenceRule, EquivalenceInference
+   from Form import FormSet
+   from Language import Language
+   from PatternCompiler import compileSetMatcher
+   from Substitution import Substitution
+
+   def matchPremises( rule, premises, additionalMappedSymbols ):
+      # As InferenceRule._matchPremises, with a set matcher which reports backtracks.
+      matcher = _premiseMatchers.get( rule )
+      if matcher is None:
+         matcher = _premiseMatchers[ rule ] = compileSetMatcher( rule.sequent.premiseFormSet( ), _noteBacktrack )
+      return next( matcher( list( premises ), Substitution.fromMapping( additionalMappedSymbols ) ), None )
+
+   iterMapSets = FormSet._iterMapSets
+
+   def countingIterMapSets( patterns, instances, aMapping, matchers=None ):
+      if matchers is None:
+         matchers = [ pattern._mapTo for pattern in patterns ]
+      return iterMapSets( patterns, instances, aMapping, [ _countingMatcher( matcher ) for matcher in matchers ] )
+
+   extend      = Substitution.extend
+   fromMapping = Substitution.fromMapping
+
+   def countingExtend( self, key, value ):
+      _noteCopy( )
+      return extend( self, key, value )
+
+   def countingFromMapping( aMapping ):
+      if not isinstance( aMapping, Substitution ):
+         _noteCopy( )
+      return fromMapping( aMapping )
+
+   ruleName = lambda args: args[ 0 ].name
+   _replace( Calculus,             'applyInference',          _timed( 'Calculus.applyInference',              Calculus.applyInference,              _calculusRuleName ) )
+   _replace( InferenceRule,        '_applyTo',                _timed( 'InferenceRule.applyTo',                InferenceRule._applyTo,               ruleName ) )
+   _replace( InferenceRule,        '_matchPremises',          _timed( 'InferenceRule.matchPremises',          matchPremises,                        ruleName ) )
+   _replace( InferenceRule,        '_instantiateConclusions', _timed( 'InferenceRule.instantiateConclusions', InferenceRule._instantiateConclusions, ruleName ) )
+   _replace( EquivalenceInference, 'resolve',                 _timed( 'EquivalenceInference.resolve',         EquivalenceInference.resolve,         lambda args: args[ 0 ].ruleName ) )
+   _replace( FormSet,              '_mapSets',                staticmethod( _timed( 'FormSet._mapSets',       FormSet._mapSets ) ) )
+   _replace( FormSet,              '_iterMapSets',            staticmethod( countingIterMapSets ) )
+   _replace( Language,             'parseSeq',                _timed( 'Language.parseSeq',                    Language.parseSeq ) )
+   _replace( Substitution,         'extend',                  countingExtend )
+   _replace( Substitution,         'fromMapping',             staticmethod( countingFromMapping ) )
+
+
+def _calculusRuleName( args ):
+   # applyInference( ) takes the rule's name or abbreviation; report its name.
+   calculus, ruleName = args[ 0 ], args[ 1 ]
+   if calculus.hasRule( ruleName ):
+      return calculus.rule( ruleName ).name
+   return ruleName
+
+
+def _countingMatcher( matcher ):
+   def match( instance, mapping ):
+      result = matcher( instance, mapping )
+      if result is None:
+         _noteBacktrack( )
+      return result
+
+   return match
+
+
+def _restore( ):
+   while _originals:
+      owner, name, original = _originals.pop( )
+      setattr( owner, name, original )
@@ -2,6 +2,21 @@
 
 from Form import *
 from Calculus import InferenceRule, Resolver, Inference, RegularInference, EquivalenceInference
+import Validation
+
+
+class ProofStructureError( Exception ):
+   """A subproof was begun or ended where the proof does not allow it."""
+
+
+def _validateCitations( citList ):
+   """In strict mode, check that each citation is a step number or a
+   ( first, last ) pair of step numbers."""
+   if Validation.isStrict( ):
+      for citation in citList:
+         Validation.require( isinstance( citation, int ) or
+                             ( isinstance( citation, tuple ) and ( len( citation ) == 2 ) and all( isinstance( num, int ) for num in citation ) ),
+                             'Invalid citation {0!r}.'.format( citation ) )
 
 
 class Step( object ):
@@ -11,21 +26,15 @@ class Step( object ):
       Category:      Mutator.
       Returns:       Nothing.
       Side Effects:  Initialize the new instance.
-      Preconditions: [AssertionError] 'level' must be an int, 0 represents the top level,
+      Preconditions: Unchecked; Proof.addStep( ) validates the arguments.
+                     'level' must be an int, 0 represents the top level,
                         1 is the first nested subproof level.
-                     [AssertionError] 'prop' must be a WFF.
-                     [AssertionError] 'premiseCitationList' list of step numbers.
-                     [AssertionError] 'inferenceRule' the Inference rule.
-                     [AssertionError] 'mapping' mapping of rule sequent symbols to WFFs.
-                     [AssertionError] 'conclusionForm' (int).
+                     'prop' must be a WFF.
+                     'premiseCitationList' list of step numbers.
+                     'inferenceRule' the Inference rule.
+                     'mapping' mapping of rule sequent symbols to WFFs.
+                     'conclusionIndex' (int).
       """
-      assert isinstance( level,               int           )
-      assert isinstance( prop,                WFF           )
-      assert isinstance( premiseCitationList, list          )
-      assert isinstance( inferenceRule,       InferenceRule )
-      assert isinstance( mapping,             dict          )
-      assert isinstance( conclusionIndex,     int           )
-
       self.level               = level
       self.prop                = prop
       self.citationList        = premiseCitationList
@@ -46,10 +55,6 @@ class Step( object ):
       Side Effects:   None.
       Preconditions:  None.
       """
-      assert isinstance( self.level,              int       )
-      assert isinstance( self.prop,               WFF       )
-      assert isinstance( self.justification,      Inference )
-
       return "Step( %d, %s, %s )" % ( self.num, repr( self.prop ), repr( self.justification ) )
 
    def __repr__( self ):
@@ -59,10 +64,6 @@ class Step( object ):
       Side Effects:  None.
       Preconditions: None.
       """
-      assert isinstance( self.level,              int       )
-      assert isinstance( self.prop,               WFF       )
-      assert isinstance( self.justification,      Inference )
-
       return str( self )
 
    def justificationString( self ):
@@ -101,23 +102,31 @@ class Step( object ):
 
 class Env( object ):
    """The environment stack tracks which steps, objects, possible worlds, etc.
-   are currently active and available for use."""
+   are currently active and available for use.
+
+   All the Envs of a proof share one table from each citation to the Env
+   it was added to.  An Env is active from its creation until close( ) is
+   called, which is when its subproof ends; a citation is available exactly
+   when its Env is active (and, for a subproof range, is the current Env).
+   So availability is decided in constant time.
+   """
    def __init__( self, level, outter = None ):
       """Initialize a new instance of the class.
       Category:      Mutator.
       Returns:       Nothing.
       Side Effects:  Initialize the new instance.
-      Preconditions: [AssertionError] 'level' must be an int.  Represents the
+      Preconditions: Unchecked; Envs are made only by Proof.
+                     'level' must be an int.  Represents the
                         scope level.  0 is top-level.  1 is the first nested subproof.
-                     [AssertionError] 'outter' must be Env or None.  If provided,
+                     'outter' must be Env or None.  If provided,
                         'outter' must be a reference to the Env for the enclosing scope.
       """
-      assert isinstance( level,  int )
-      assert isinstance( outter, Env ) or ( outter is None )
-
-      self._level   = level
-      self._steps   = []
-      self._outter  = outter
+      self._level    = level
+      self._steps    = []                  # Step numbers and subproof ranges, in order
+      self._stepNums = []                  # Just the step numbers
+      self._outter   = outter
+      self._active   = True
+      self._owners   = outter._owners if outter is not None else { }   # citation -> Env
 
    def level( self ):
       """Return the current nesting level.  0 is the top level, 1 is the first
@@ -125,14 +134,8 @@ class Env( object ):
       Category:      Pure Function.
       Returns:       (int)
       Side Effects:  None.
-      Preconditions: [AssertionError] 'level' must be an int.
-                     [outter] 'outter' must be None (for the top-level scope)
-                        or an Env representing the enclosing scope (sub-proof).
+      Preconditions: None.
       """
-      assert isinstance( self._level,  int  )
-      assert isinstance( self._steps,  list )
-      assert isinstance( self._outter, Env  ) or ( self._outter is None )
-
       return self._level
 
    def outter( self ):
@@ -142,10 +145,6 @@ class Env( object ):
       Side Effects:  None.
       Preconditions: None.
       """
-      assert isinstance( self._level,  int  )
-      assert isinstance( self._steps,  list )
-      assert isinstance( self._outter, Env  ) or ( self._outter is None )
-
       return self._outter
 
    def addStep( self, stepNum ):
@@ -153,15 +152,44 @@ class Env( object ):
       Category:      Mutator.
       Returns:       Nothing.
       Side Effects:  Adds 'stepNum' to the Env instance.
-      Preconditions: [AssertionError] 'stepNum' must be an int.
+      Preconditions: Unchecked.  'stepNum' must be an int, or a
+                        ( first, last ) subproof range.
       """
-      assert isinstance( stepNum, (int, tuple) )
+      self._steps.append( stepNum )
+      if isinstance( stepNum, int ):
+         self._stepNums.append( stepNum )
+      self._owners[ stepNum ] = self
 
-      assert isinstance( self._level,  int  )
-      assert isinstance( self._steps,  list )
-      assert isinstance( self._outter, Env  ) or ( self._outter is None )
+   def close( self ):
+      """End the scope.  Its steps are no longer available.
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Deactivates the Env.
+      Preconditions: None.
+      """
+      self._active = False
 
-      self._steps.append( stepNum )
+   def reopen( self ):
+      """Resume a closed scope.  The inverse of close( ).
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Reactivates the Env.
+      Preconditions: None.
+      """
+      self._active = True
+
+   def removeStep( self ):
+      """Remove the most recently added step number or range.  The inverse
+      of addStep( ).
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Removes the last citation from the Env instance.
+      Preconditions: [IndexError] The Env must not be empty.
+      """
+      citation = self._steps.pop( )
+      if isinstance( citation, int ):
+         self._stepNums.pop( )
+      del self._owners[ citation ]
 
    def __contains__( self, citation ):
       """Does the Env stack contain the citation?
@@ -169,16 +197,22 @@ class Env( object ):
       Category:      Predicate.
       Returns:       (bool) True if 'citation' is somewhere in the Env stack.
       Side Effects:  None.
-      Preconditions: [AssertionError] 'citation' is an in or tuple citation.
+      Preconditions: Unchecked.  'citation' is an int or tuple citation.
       """
-      assert isinstance( citation, (int,tuple)  )
+      owner = self._owners.get( citation )
+      if ( owner is None ) or not owner._active:
+         return False
 
-      assert isinstance( self._level,  int  )
-      assert isinstance( self._steps,  list )
-      assert isinstance( self._outter, Env  ) or ( self._outter is None )
+      return isinstance( citation, int ) or ( owner is self )
 
-      lst = self.availableSteps( )
-      return citation in lst
+   def isEmpty( self ):
+      """Is the scope free of steps?
+      Category:      Predicate.
+      Returns:       (bool) True if no step or subproof was added to this Env.
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      return len( self._steps ) == 0
 
    def range( self ):
       """Returns the range of steps covered by the subproof as a tuple.
@@ -189,51 +223,44 @@ class Env( object ):
       Side Effects:  None.
       Preconditions: None.
       """
-      assert isinstance( self._level,  int  )
-      assert isinstance( self._steps,  list )
-      assert isinstance( self._outter, Env  ) or ( self._outter is None )
-
       return ( self._steps[0], self._steps[-1] )
 
    def availableSteps( self ):
       """Returns the complete list of valid citations.
 
       Category:      Pure Function.
-      Returns:       Nothing.
+      Returns:       (list) The step numbers of the enclosing scopes, outermost
+                     first, followed by the step numbers and subproof ranges
+                     of this scope.
       Parameters:    None.
       Side Effects:  None.
       Preconditions: None.
       """
-      assert isinstance( self._level,  int  )
-      assert isinstance( self._steps,  list )
-      assert isinstance( self._outter, Env  ) or ( self._outter is None )
+      enclosing = [ ]
+      env = self._outter
+      while env is not None:
+         enclosing.append( env._stepNums )
+         env = env._outter
 
       lst = [ ]
-      self._availableSteps( lst )
+      for stepNums in reversed( enclosing ):
+         lst.extend( stepNums )
+      lst.extend( self._steps )
       return lst
 
-   def _availableSteps( self, lst, includeSubproofs=True ):
-      """Implementation for the public method availableSteps( )."""
-      assert isinstance( lst,              list )
-      assert isinstance( includeSubproofs, bool )
-
-      assert isinstance( self._level,      int  )
-      assert isinstance( self._steps,      list )
-      assert isinstance( self._outter,     Env  ) or ( self._outter is None )
-
-      if self._outter:
-         self._outter._availableSteps( lst, False )
 
-      for entry in self._steps:
-         if isinstance( entry, tuple ):
-            if includeSubproofs:
-               lst.append( entry )
-         else:
-            lst.append( entry )
+class Proof( object ):
+   """The actual proof.
 
+   Every change to the proof (addStep, beginHypo, endHypo) is recorded in a
+   journal along with what is needed to reverse it, so undo( ), redo( ) and
+   truncateTo( ) cost only the number of changes they revert or reapply.
+   """
+   # Journal entry kinds
+   ADD_STEP    = 'addStep'        # ( ADD_STEP, step )
+   BEGIN_HYPO  = 'beginHypo'      # ( BEGIN_HYPO, subproofEnv )
+   END_HYPO    = 'endHypo'        # ( END_HYPO, subproofEnv, addedRange )
 
-class Proof( object ):
-   """The actual proof."""
    def __init__( self ):
       """Initialize a new instance of the class.
       Category:      Mutator.
@@ -244,6 +271,8 @@ class Proof( object ):
       """
       self._env          = None
       self._steps        = None
+      self._journal      = None
+      self._redoLog      = None
 
       self._initialize( )
 
@@ -253,13 +282,13 @@ class Proof( object ):
       Category:      Mutator
       Returns:       Nothing.
       Side Effects:  Reinitializes the instance.
-      Preconditions: [AssertionError] 'steps' must either be None or a list of
+      Preconditions: Unchecked.  'steps' must either be None or a list of
                         Step instances which constitutes a valid proof.
       """
-      assert isinstance( steps, list ) or ( steps is None )
-
       self._env         = Env( 0 )
       self._steps       = [ ]
+      self._journal     = [ ]
+      self._redoLog     = [ ]
 
       if not steps:
          return
@@ -274,7 +303,7 @@ class Proof( object ):
             self.endHypo( )
             currentLevel -= 1
 
-         self.addStep( step.prop, step.rsn )
+         self.addStep( step.prop, step.citationList, step.inferenceRule, step.mapping, step.conclusionIndex )
 
    def currentLevel( self ):
       """Return the current nesting level.  0 represents the top level, 1
@@ -285,9 +314,6 @@ class Proof( object ):
       Side Effects:  None.
       Preconditions: None.
       """
-      assert isinstance( self._env,         Env  )
-      assert isinstance( self._steps,       list )
-
       return self._env.level( )
 
    def availablePremises( self ):
@@ -298,9 +324,6 @@ class Proof( object ):
       Side Effects:  None.
       Preconditions: None.
       """
-      assert isinstance( self._env,           Env    )
-      assert isinstance( self._steps,         list   )
-
       return self._env.availableSteps( )
 
    def addStep( self, prop, premiseCitationList, inferenceRule, mapping, conclusionIndex ):
@@ -314,44 +337,118 @@ class Proof( object ):
                         A rule application returns a list of all valid conclusion forms.
                         'conclusionForm' is an index into this list to specify the
                         correct form.
-                     [AssertionError] 'AdditionalMappings' must be None or a dict.
+                     [AssertionError] 'AdditionalMappings' must be None, a dict or a Substitution.
                         The conclusion form of some inference rules contains contain
                         Atomic WFF not found in the premises.  So they cannot be
                         mapped to WFFs when the premise forms are mapped to a set
                         of premises.  This map should go from these atomic wffs
                         to instance wffs.
       """
-      # Add the step to the Proof
-      assert isinstance( prop,                WFF           )
-      assert isinstance( premiseCitationList, list          )
-      assert isinstance( inferenceRule,       InferenceRule )
-      assert isinstance( mapping,             dict          )
-      assert isinstance( conclusionIndex,      int           )
-
-      assert isinstance( self._env,           Env       )
-      assert isinstance( self._steps,         list      )
+      Validation.requireType( prop,                WFF,           'prop' )
+      Validation.requireType( premiseCitationList, list,          'premiseCitationList' )
+      Validation.requireType( inferenceRule,       InferenceRule, 'inferenceRule' )
+      Validation.requireType( conclusionIndex,     int,           'conclusionIndex' )
+      Validation.requireMapping( mapping, 'mapping', optional=False )
+      _validateCitations( premiseCitationList )
 
-      self._steps.append( Step( self._env.level( ), prop, premiseCitationList, inferenceRule, mapping, conclusionIndex ) )
+      # Add the step to the Proof
+      self._redoLog = [ ]
+      self._addStep( Step( self._env.level( ), prop, premiseCitationList, inferenceRule, mapping, conclusionIndex ) )
 
+   def _addStep( self, step ):
+      self._steps.append( step )
       self._env.addStep( len(self._steps) )
+      self._journal.append( ( Proof.ADD_STEP, step ) )
 
    def deleteStep( self ):
-      """Remove the last tesp from the proof.  .
+      """Remove the last step from the proof.  Any subproof begun or ended
+      since the step was added is undone with it.
 
       Category:      Mutator
       Returns:       Nothing.
       Side Effects:  None.
       Preconditions: None.
       """
-      assert isinstance( self._env,         Env  )
-      assert isinstance( self._steps,       list )
+      if len( self._steps ) > 0:
+         self.truncateTo( len( self._steps ) - 1 )
+
+   def history( self ):
+      """Returns the changes which built the proof, oldest first.  Replaying
+      them on a new Proof rebuilds this one.
+
+      Category:      Pure Function
+      Returns:       (list) of ( Proof.ADD_STEP, step ), ( Proof.BEGIN_HYPO, env )
+                     and ( Proof.END_HYPO, env, addedRange ) entries.
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      return list( self._journal )
+
+   def truncateTo( self, numSteps ):
+      """Undo changes until the proof has no more than numSteps steps.  The
+      proof is left as it was just before step numSteps + 1 was added.
+
+      Category:      Mutator
+      Returns:       Nothing.
+      Side Effects:  The undone changes can be redone with redo( ).
+      Preconditions: [AssertionError] 'numSteps' must be a non-negative int.
+      """
+      Validation.require( isinstance( numSteps, int ) and ( numSteps >= 0 ), "'numSteps' must be a non-negative int." )
+
+      while len( self._steps ) > numSteps:
+         self.undo( )
+
+   def undo( self ):
+      """Undo the most recent change (step, beginHypo or endHypo).
+
+      Category:      Mutator
+      Returns:       (bool) False if there was nothing to undo.
+      Side Effects:  The change can be redone with redo( ).
+      Preconditions: None.
+      """
+      if len( self._journal ) == 0:
+         return False
+
+      entry = self._journal.pop( )
+      kind  = entry[ 0 ]
+      if kind == Proof.ADD_STEP:
+         self._steps.pop( )
+         self._env.removeStep( )
+      elif kind == Proof.BEGIN_HYPO:
+         self._env.close( )
+         self._env = self._env.outter( )
+      else:
+         subproof, addedRange = entry[ 1 ], entry[ 2 ]
+         if addedRange:
+            self._env.removeStep( )
+         subproof.reopen( )
+         self._env = subproof
 
-      # Save the stuff we need
-      oldSteps = self._steps
-      oldSteps.pop( )
+      self._redoLog.append( entry )
+      return True
 
-      # Reinitialize this instance
-      self._initialize( oldSteps )
+   def redo( self ):
+      """Redo the most recently undone change.
+
+      Category:      Mutator
+      Returns:       (bool) False if there was nothing to redo.  Any new
+                     change discards the changes which could be redone.
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      if len( self._redoLog ) == 0:
+         return False
+
+      entry = self._redoLog.pop( )
+      kind  = entry[ 0 ]
+      if kind == Proof.ADD_STEP:
+         self._addStep( entry[ 1 ] )
+      elif kind == Proof.BEGIN_HYPO:
+         self._beginHypo( entry[ 1 ] )
+      else:
+         self._endHypo( )
+
+      return True
 
    def buildPremiseSet( self, citList ):
       """Expand a list of citations into a list of premises.  .
@@ -361,10 +458,8 @@ class Proof( object ):
       Side Effects:  None.
       Preconditions: [AssertionError] 'citList' must be a list.
       """
-      assert isinstance( citList,           list )
-
-      assert isinstance( self._env,         Env  )
-      assert isinstance( self._steps,       list )
+      Validation.requireType( citList, list, 'citList' )
+      _validateCitations( citList )
 
       premiseSet = FormSet( )
 
@@ -395,18 +490,21 @@ class Proof( object ):
       Side Effects:  Adds a new Env to the environment stack.
       Preconditions: None.
       """
-      assert isinstance( self._env,         Env  )
-      assert isinstance( self._steps,       list )
-
       if len(self._steps) == 0:
          prevStepLevel = 0
       else:
          prevStepLevel = self._steps[ len(self._steps) - 1 ].level
 
       if self._env.level() not in ( prevStepLevel, prevStepLevel - 1 ):
-         raise Exception( 'Cannot nest more than one level in a single step.' )
+         raise ProofStructureError( 'Cannot nest more than one level in a single step.' )
+
+      self._redoLog = [ ]
+      self._beginHypo( Env( self._env.level() + 1, self._env ) )
 
-      self._env = Env( self._env.level() + 1, self._env )
+   def _beginHypo( self, subproof ):
+      subproof.reopen( )
+      self._env = subproof
+      self._journal.append( ( Proof.BEGIN_HYPO, subproof ) )
 
    def endHypo( self ):
       """End the most current hypothetical proof.
@@ -414,36 +512,40 @@ class Proof( object ):
       Category:      Mutator.
       Returns:       Nothing.
       Side Effects:  Pop one Env off from the environment stack.
-      Preconditions: [Exception] At least one hypothetical proof must be started.
+      Preconditions: [ProofStructureError] At least one hypothetical proof
+                        must be started.
       """
-      assert isinstance( self._env,         Env  )
-      assert isinstance( self._steps,       list )
-
       if len(self._steps) == 0:
          prevStepLevel = 0
       else:
          prevStepLevel = self._steps[ len(self._steps) - 1 ].level
 
       if self._env.level() == 0:
-         raise Exception( 'No more levels to exit.' )
+         raise ProofStructureError( 'No more levels to exit.' )
 
       if self._env.level() not in ( prevStepLevel, prevStepLevel + 1 ):
-         raise Exception( 'Cannot exit more than one level in a single step.' )
+         raise ProofStructureError( 'Cannot exit more than one level in a single step.' )
 
-      if self._env.level() == prevStepLevel:
-         # Then the env is not empty.
-         subproofRange = self._env.range( )
+      self._redoLog = [ ]
+      self._endHypo( )
 
-         self._env = self._env.outter( )
+   def _endHypo( self ):
+      subproof   = self._env
+      addedRange = not subproof.isEmpty( )
+
+      if addedRange:
+         subproofRange = subproof.range( )
+
+         self._env = subproof.outter( )
          self._env.addStep( subproofRange )
       else:
-         self._env = self._env.outter( )
+         self._env = subproof.outter( )
+
+      subproof.close( )
+      self._journal.append( ( Proof.END_HYPO, subproof, addedRange ) )
 
    def __iter__( self ):
       """Implement the public function iter( )."""
-      assert isinstance( self._env,         Env  )
-      assert isinstance( self._steps,       list )
-
       return iter( self._steps )
 
    def __getitem__( self, stepNum ):
@@ -452,12 +554,9 @@ class Proof( object ):
       Category:      Pure Function
       Returns:       (Step) the step.
       Side Effects:  None.
-      Preconditions: [AssertionError] 'StepNum' must be an int.
+      Preconditions: [AssertionError] 'stepNum' must be an int.
       """
-      assert isinstance( stepNum,           int  )
-
-      assert isinstance( self._env,         Env  )
-      assert isinstance( self._steps,       list )
+      Validation.requireType( stepNum, int, 'stepNum' )
 
       return self._steps[ stepNum - 1 ]
 
@@ -469,8 +568,5 @@ class Proof( object ):
       Side Effects:  None.
       Preconditions: None.
       """
-      assert isinstance( self._env,         Env  )
-      assert isinstance( self._steps,       list )
-
       return len( self._steps )
 
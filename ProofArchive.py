@@ -0,0 +1,305 @@
+"""This module implements ProofArchive, an append-only file of proofs.
+
+The archive is two files:
+
+   <path>       'ARSA' version, then one record per proof
+   <path>.idx   per proof, its record's offset (8 bytes) and length
+                (4 bytes), little endian
+
+A record is the metadata used for filtering, then the proof in the
+encoding of the Serialization module:
+
+   length of the metadata (varint)
+   logic name (varint length + utf-8)
+   number of rules used, then each rule's name (varint length + utf-8)
+   proof encoding
+
+Both files are memory-mapped, so loading proof n reads only its index entry
+and its record, and filtering by logic or rule reads only the metadata.
+The index can be rebuilt from the records; it is brought up to date when
+the archive is opened (e.g. after a crash between the two writes).
+"""
+
+import mmap
+import os
+import struct
+
+from Proof import Proof
+import Serialization
+
+
+MAGIC       = b'ARSA'
+VERSION     = 1
+HEADER      = struct.Struct( '<4sI' )
+INDEX_ENTRY = struct.Struct( '<QI' )
+
+
+class ArchiveError( Exception ):
+   """The archive files are missing, damaged or of an unknown version."""
+
+
+def _readString( buffer, pos ):
+   length, pos = Serialization.readVarint( buffer, pos )
+   return str( buffer[ pos : pos + length ], 'utf-8' ), pos + length
+
+
+def _writeString( out, aString ):
+   data = aString.encode( 'utf-8' )
+   Serialization.writeVarint( out, len( data ) )
+   out += data
+
+
+class ProofArchive( object ):
+   """An append-only, memory-mapped archive of proofs, addressed by id (the
+   order in which they were appended, from 0)."""
+   def __init__( self, path, logics=None ):
+      """Open the archive at path, creating it if it does not exist.
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Opens (and may create or repair) the archive files.
+      Preconditions: [AssertionError] 'path' must be a str.
+                     [AssertionError] 'logics' must be a dict from logic name
+                        to Logic, or None for Logic.Logics.
+                     [ArchiveError] An existing file at path must be an
+                        archive.
+      """
+      assert isinstance( path,   str  )
+      assert isinstance( logics, dict ) or ( logics is None )
+
+      if logics is None:
+         import Logic
+         logics = Logic.Logics
+
+      self._path      = path
+      self._logics    = logics
+      self._dataMap   = None
+      self._indexMap  = None
+
+      if not os.path.exists( path ) or os.path.getsize( path ) == 0:
+         with open( path, 'wb' ) as newFile:
+            newFile.write( HEADER.pack( MAGIC, VERSION ) )
+         with open( path + '.idx', 'wb' ):
+            pass
+
+      self._dataFile  = open( path, 'r+b' )
+      self._indexFile = open( path + '.idx', 'a+b' )
+
+      magic, version = HEADER.unpack( self._dataFile.read( HEADER.size ) )
+      if magic != MAGIC:
+         raise ArchiveError( '{0} is not a proof archive.'.format( path ) )
+      if version != VERSION:
+         raise ArchiveError( 'Unsupported archive version {0}.'.format( version ) )
+
+      self._recoverIndex( )
+
+   def __enter__( self ):
+      return self
+
+   def __exit__( self, excType, excValue, traceback ):
+      self.close( )
+      return False
+
+   def __len__( self ):
+      """Returns the number of proofs in the archive."""
+      return self._indexSize // INDEX_ENTRY.size
+
+   def close( self ):
+      """Close the archive files.
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Unmaps and closes the files.
+      Preconditions: None.
+      """
+      self._unmap( )
+      self._dataFile.close( )
+      self._indexFile.close( )
+
+   # Writing
+   def append( self, logic, aProof ):
+      """Add a proof to the end of the archive.
+      Category:      Mutator.
+      Returns:       (int) The id of the proof.
+      Side Effects:  Appends to the archive files.
+      Preconditions: [AssertionError] 'logic' must be a named Logic.
+                     [AssertionError] 'aProof' must be a Proof in that logic.
+      """
+      assert isinstance( logic.name( ), str   )
+      assert isinstance( aProof,        Proof )
+
+      ruleNames = [ ]
+      for step in aProof:
+         if step.inferenceRule.name not in ruleNames:
+            ruleNames.append( step.inferenceRule.name )
+
+      meta = bytearray( )
+      _writeString( meta, logic.name( ) )
+      Serialization.writeVarint( meta, len( ruleNames ) )
+      for name in ruleNames:
+         _writeString( meta, name )
+
+      record = bytearray( )
+      Serialization.writeVarint( record, len( meta ) )
+      record += meta
+      record += Serialization.dumpProof( logic, aProof )
+
+      self._unmap( )
+
+      self._dataFile.seek( 0, os.SEEK_END )
+      offset = self._dataFile.tell( )
+      self._dataFile.write( record )
+      self._dataFile.flush( )
+
+      self._indexFile.write( INDEX_ENTRY.pack( offset, len( record ) ) )
+      self._indexFile.flush( )
+      self._indexSize += INDEX_ENTRY.size
+
+      return len( self ) - 1
+
+   # Reading
+   def load( self, proofId ):
+      """Load a proof.
+      Category:      Pure Function.
+      Returns:       (Proof)
+      Side Effects:  None.
+      Preconditions: [IndexError] 'proofId' must be the id of a proof in the archive.
+                     [KeyError] The proof's logic must be one of the archive's logics.
+      """
+      offset, length = self._entry( proofId )
+      data    = self._data( )
+      metaLen, pos = Serialization.readVarint( data, offset )
+      logicName, unused = _readString( data, pos )
+      return Serialization.loadProof( self._logics[ logicName ], data, pos + metaLen )
+
+   def logicName( self, proofId ):
+      """Returns the name of the logic of a proof, without loading it.
+      Category:      Pure Function.
+      Returns:       (str)
+      Side Effects:  None.
+      Preconditions: [IndexError] 'proofId' must be the id of a proof in the archive.
+      """
+      return self._metadata( proofId )[ 0 ]
+
+   def ruleNames( self, proofId ):
+      """Returns the names of the inference rules a proof uses, without
+      loading it.
+      Category:      Pure Function.
+      Returns:       (list) of str, in order of first use.
+      Side Effects:  None.
+      Preconditions: [IndexError] 'proofId' must be the id of a proof in the archive.
+      """
+      return self._metadata( proofId )[ 1 ]
+
+   def ids( self, logicName=None, ruleName=None ):
+      """Iterate over the ids of the proofs which match the filters.
+      Category:      Pure Function.
+      Returns:       (generator) of int.
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'logicName' if given, only proofs in
+                        the logic of that name match.
+                     [AssertionError] 'ruleName' if given, only proofs with a
+                        step justified by the rule of that name match.
+      """
+      assert isinstance( logicName, str ) or ( logicName is None )
+      assert isinstance( ruleName,  str ) or ( ruleName  is None )
+
+      for proofId in range( len( self ) ):
+         if ( logicName is None ) and ( ruleName is None ):
+            yield proofId
+            continue
+
+         proofLogic, proofRules = self._metadata( proofId )
+         if ( logicName is not None ) and ( proofLogic != logicName ):
+            continue
+         if ( ruleName is not None ) and ( ruleName not in proofRules ):
+            continue
+         yield proofId
+
+   def proofs( self, logicName=None, ruleName=None ):
+      """Iterate over the proofs which match the filters (see ids( )).  Each
+      proof is loaded only when it is reached.
+      Category:      Pure Function.
+      Returns:       (generator) of ( id, Proof ).
+      Side Effects:  None.
+      Preconditions: See ids( ).
+      """
+      for proofId in self.ids( logicName, ruleName ):
+         yield proofId, self.load( proofId )
+
+   # Implementation
+   def _entry( self, proofId ):
+      if not ( 0 <= proofId < len( self ) ):
+         raise IndexError( 'No proof {0} in the archive.'.format( proofId ) )
+
+      if self._indexMap is None:
+         self._indexMap = mmap.mmap( self._indexFile.fileno( ), 0, access=mmap.ACCESS_READ )
+      return INDEX_ENTRY.unpack_from( self._indexMap, proofId * INDEX_ENTRY.size )
+
+   def _data( self ):
+      if self._dataMap is None:
+         self._dataMap = mmap.mmap( self._dataFile.fileno( ), 0, access=mmap.ACCESS_READ )
+      return self._dataMap
+
+   def _metadata( self, proofId ):
+      offset, length = self._entry( proofId )
+      data = self._data( )
+
+      metaLen, pos = Serialization.readVarint( data, offset )
+      logicName, pos = _readString( data, pos )
+      numRules, pos = Serialization.readVarint( data, pos )
+      ruleNames = [ ]
+      for index in range( numRules ):
+         name, pos = _readString( data, pos )
+         ruleNames.append( name )
+      return logicName, ruleNames
+
+   def _unmap( self ):
+      # The maps are remade on the next read, covering any appended data.
+      if self._dataMap is not None:
+         self._dataMap.close( )
+         self._dataMap = None
+      if self._indexMap is not None:
+         self._indexMap.close( )
+         self._indexMap = None
+
+   def _recoverIndex( self ):
+      """Drop a partial trailing index entry and index any records written
+      after the last entry."""
+      self._indexFile.seek( 0, os.SEEK_END )
+      indexSize = self._indexFile.tell( )
+      indexSize -= indexSize % INDEX_ENTRY.size
+      self._indexFile.truncate( indexSize )
+      self._indexSize = indexSize
+
+      self._dataFile.seek( 0, os.SEEK_END )
+      dataSize = self._dataFile.tell( )
+
+      if len( self ) > 0:
+         offset, length = self._entry( len( self ) - 1 )
+         nextOffset = offset + length
+      else:
+         nextOffset = HEADER.size
+
+      self._unmap( )
+      if nextOffset >= dataSize:
+         return
+
+      # Each record is self-delimiting:  its metadata is prefixed by its
+      # length and the proof encoding is read to its end.
+      data = self._data( )
+      while nextOffset < dataSize:
+         try:
+            metaLen, pos = Serialization.readVarint( data, nextOffset )
+            pos += metaLen
+            end = Serialization.encodingEnd( data, pos )
+         except ( IndexError, Serialization.SerializationError ):
+            break
+         self._indexFile.write( INDEX_ENTRY.pack( nextOffset, end - nextOffset ) )
+         self._indexSize += INDEX_ENTRY.size
+         nextOffset = end
+
+      self._indexFile.flush( )
+      self._unmap( )
+
+      # Discard an incomplete trailing record.
+      if nextOffset < dataSize:
+         self._dataFile.truncate( nextOffset )
@@ -0,0 +1,256 @@
+"""This module implements batch verification of proofs.
+
+A proof travels as a record, a tuple of plain strings and ints which can be
+pickled or written as JSON:
+
+   ( logicName, sequentText, ops )
+
+'sequentText' is the sequent the proof claims to prove (or None) and 'ops'
+is the sequence of proof-building operations:
+
+   ( BEGIN, )                      begin a subproof
+   ( END, )                        end the current subproof
+   ( STEP, propText, citations, ruleName, mappingItems, conclusionIndex )
+
+where 'citations' holds step numbers and ( first, last ) subproof ranges and
+'mappingItems' holds ( symbol, wffText ) pairs.
+
+ProofChecker verifies records one at a time.  checkProofs( ) distributes
+records over a pool of worker processes, each of which loads the logics
+once when it starts.
+"""
+
+import multiprocessing
+
+from Form import WFF, Sequent, SequentApplicationError
+from Proof import Proof
+
+
+BEGIN = 'begin'
+END   = 'end'
+STEP  = 'step'
+
+
+def proofRecord( logic, proof, sequent=None ):
+   """Serialize a proof into a record.
+   Category:      Pure Function.
+   Returns:       (tuple) The record.
+   Side Effects:  None.
+   Preconditions: [AssertionError] 'logic' must be a named Logic.
+                  [AssertionError] 'proof' must be a Proof of that logic.
+                  [AssertionError] 'sequent' must be a Sequent or None.
+   """
+   assert isinstance( logic.name( ), str )
+   assert isinstance( proof,   Proof   )
+   assert isinstance( sequent, Sequent ) or ( sequent is None )
+
+   hypothesisRule = logic.calculus( ).subproofPremiseRule( )
+
+   ops   = [ ]
+   level = 0
+   for step in proof:
+      # A hypothesis at the same level as the previous step starts a new
+      # sibling subproof.
+      startsSubproof = ( step.level > 0 ) and ( step.inferenceRule is hypothesisRule ) and ( len( step.citationList ) == 0 )
+      while level > step.level or ( startsSubproof and level == step.level ):
+         ops.append( ( END, ) )
+         level -= 1
+      while level < step.level:
+         ops.append( ( BEGIN, ) )
+         level += 1
+
+      mappingItems = tuple( sorted( ( sym, str( wff ) ) for sym, wff in step.mapping.items( ) ) )
+      ops.append( ( STEP, str( step.prop ), tuple( step.citationList ), step.inferenceRule.name, mappingItems, step.conclusionIndex ) )
+
+   return ( logic.name( ), str( sequent ) if sequent is not None else None, tuple( ops ) )
+
+
+class ProofVerdict( object ):
+   """The result of checking one proof record."""
+   __slots__ = ( 'steps', 'complete', 'error' )
+
+   def __init__( self ):
+      self.steps    = [ ]      # ( ok, message ) per step, in step order
+      self.complete = False    # Every conclusion of the sequent was derived at the top level.
+      self.error    = None     # Why checking stopped early, or None.
+
+   def __repr__( self ):
+      return 'ProofVerdict( valid={0}, complete={1}, steps={2}, error={3!r} )'.format( self.isValid( ), self.complete, len( self.steps ), self.error )
+
+   def isValid( self ):
+      """Is every step of the proof correctly justified?
+      Category:      Predicate.
+      Returns:       (bool)
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      return ( self.error is None ) and all( ok for ok, message in self.steps )
+
+
+class ProofChecker( object ):
+   """Checks proof records against the rules of one Logic."""
+   def __init__( self, logic ):
+      """Initialize a new instance of the class.
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Initializes an instance.
+      Preconditions: [AssertionError] 'logic' must be a Logic.
+      """
+      self._logic    = logic
+      self._language = logic.language( )
+      self._calculus = logic.calculus( )
+
+   def check( self, record ):
+      """Check every step of a proof record.
+      Category:      Pure Function.
+      Returns:       (ProofVerdict)
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'record' must be a proof record of this logic.
+      """
+      logicName, sequentText, ops = record
+      assert logicName == self._logic.name( )
+
+      verdict  = ProofVerdict( )
+      proof    = Proof( )
+      premises = None
+
+      try:
+         if sequentText is not None:
+            sequent  = self._language.parseSeq( sequentText )
+            premises = set( sequent.premiseFormSet( ) )
+      except Exception as ex:
+         verdict.error = 'Invalid sequent: {0}'.format( ex )
+         return verdict
+
+      for op in ops:
+         try:
+            if op[ 0 ] == BEGIN:
+               proof.beginHypo( )
+            elif op[ 0 ] == END:
+               proof.endHypo( )
+            elif op[ 0 ] == STEP:
+               self._checkStep( proof, op, premises, verdict )
+            else:
+               raise Exception( 'Unknown proof operation {0!r}.'.format( op[ 0 ] ) )
+         except Exception as ex:
+            verdict.error = 'Step {0}: {1}'.format( len( verdict.steps ) + 1, ex )
+            return verdict
+
+      if sequentText is not None:
+         derived = set( step.prop for step in proof if step.level == 0 )
+         verdict.complete = ( proof.currentLevel( ) == 0 ) and all( conclusion in derived for conclusion in sequent.conclusionFormSet( ) )
+
+      return verdict
+
+   def _checkStep( self, proof, op, premises, verdict ):
+      tag, propText, citations, ruleName, mappingItems, conclusionIndex = op
+
+      prop      = self._language.parseProp( propText )
+      rule      = self._calculus.rule( ruleName )
+      mapping   = { sym : self._language.parseProp( wffText ) for sym, wffText in mappingItems }
+      citations = [ cit if isinstance( cit, int ) else tuple( cit ) for cit in citations ]
+
+      verdict.steps.append( self._judge( proof, prop, rule, mapping, citations, conclusionIndex, premises ) )
+
+      # Record the step whatever the verdict, so later citations line up.
+      proof.addStep( prop, citations, rule, mapping, conclusionIndex )
+
+   def _judge( self, proof, prop, rule, mapping, citations, conclusionIndex, premises ):
+      """Returns ( ok, message ) for one step."""
+      premiseForms = rule.sequent.premiseFormSet( )
+
+      if len( citations ) == 0 and len( premiseForms ) == 0 and not self._language.isEquivalenceTheorem( rule.sequent ):
+         try:
+            instance = rule.sequent.conclusionFormSet( ).makeInstance( mapping )[ conclusionIndex ]
+         except ( KeyError, ValueError, IndexError ):
+            return ( False, 'The mapping does not instantiate the rule.' )
+
+         if instance is not prop:
+            return ( False, 'The rule does not introduce this wff.' )
+
+         if ( rule is self._calculus.premiseAssertionRule( ) ) and ( proof.currentLevel( ) == 0 ) and ( premises is not None ) and ( prop not in premises ):
+            return ( False, 'Not a premise of the sequent.' )
+
+         return ( True, '' )
+
+      premiseSet = proof.buildPremiseSet( citations )
+      if len( premiseSet ) != len( citations ):
+         return ( False, 'A cited step is not available.' )
+
+      if self._language.isEquivalenceTheorem( rule.sequent ):
+         if ( len( premiseSet ) != 1 ) or not isinstance( premiseSet[ 0 ], WFF ):
+            return ( False, 'An equivalence requires exactly one premise.' )
+
+         sideA, sideB = rule.sequent.conclusionFormSet( )[ 0 ].subordinates( )
+         try:
+            sideA.makeInstance( mapping )
+            sideB.makeInstance( mapping )
+         except ( KeyError, ValueError ):
+            return ( False, 'The mapping does not instantiate the rule.' )
+
+         if self._calculus.isEquivalenceRewrite( premiseSet[ 0 ], prop, rule, mapping ):
+            return ( True, '' )
+
+         return ( False, 'The wff is not an equivalent rewriting of the premise.' )
+
+      try:
+         conclusions = rule.applyTo( premiseSet, mapping )
+      except SequentApplicationError:
+         return ( False, 'Cannot map the inference rule to the cited premises.' )
+      except Exception as ex:
+         return ( False, str( ex ) )
+
+      if ( conclusionIndex >= len( conclusions ) ) or ( conclusions[ conclusionIndex ] is not prop ):
+         return ( False, 'The rule does not yield this wff from the cited premises.' )
+
+      return ( True, '' )
+
+
+# Worker process state:  one checker per logic, built when the worker starts.
+_workerCheckers = None
+
+
+def _initWorker( logicNames ):
+   global _workerCheckers
+
+   import Logic
+   _workerCheckers = { name : ProofChecker( Logic.Logics[ name ] ) for name in logicNames }
+
+
+def _checkInWorker( record ):
+   checker = _workerCheckers.get( record[ 0 ] )
+   if checker is None:
+      verdict = ProofVerdict( )
+      verdict.error = 'Unknown logic {0!r}.'.format( record[ 0 ] )
+      return verdict
+
+   return checker.check( record )
+
+
+def checkProofs( records, processes=None, chunksize=16, logicNames=None ):
+   """Check a stream of proof records, in parallel.
+   Category:      Pure Function.
+   Returns:       (list) A ProofVerdict for each record, in order.
+   Side Effects:  Starts and stops a pool of worker processes.
+   Preconditions: [AssertionError] 'records' must be an iterable of proof records.
+                  [AssertionError] 'processes' must be a positive int or None
+                     for one worker per CPU.  With 1 the records are checked
+                     in this process.
+                  [AssertionError] 'chunksize' the number of records handed
+                     to a worker at a time.
+                  [AssertionError] 'logicNames' the names of the logics the
+                     workers preload; None for all of Logic.Logics.
+   """
+   assert isinstance( processes, int ) or ( processes is None )
+   assert isinstance( chunksize, int ) and ( chunksize > 0 )
+
+   if logicNames is None:
+      import Logic
+      logicNames = list( Logic.Logics )
+
+   if processes == 1:
+      _initWorker( logicNames )
+      return [ _checkInWorker( record ) for record in records ]
+
+   with multiprocessing.Pool( processes, initializer=_initWorker, initargs=( list( logicNames ), ) ) as pool:
+      return list( pool.imap( _checkInWorker, records, chunksize ) )
@@ -0,0 +1,270 @@
+"""This module implements SATSolver, a small conflict-driven clause learning
+(CDCL) satisfiability solver.
+
+Variables are positive ints handed out by newVar( ); a literal is a variable
+(true) or its negation (false), as in the DIMACS format.  The solver uses
+two watched literals per clause for unit propagation, learns a first-UIP
+clause from every conflict and backjumps non-chronologically, picks
+branching variables by activity (VSIDS) with phase saving, and restarts
+on a geometric schedule.
+"""
+
+import heapq
+
+
+class SATSolver( object ):
+   """Implementation of a CDCL SAT solver."""
+   ACTIVITY_DECAY  = 0.95
+   RESTART_FIRST   = 100
+   RESTART_GROWTH  = 1.5
+
+   def __init__( self ):
+      """Initialize a new, empty instance of the class.
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Initializes an instance.
+      Preconditions: None.
+      """
+      self._numVars  = 0
+      self._clauses  = [ ]      # Each clause watches its first two literals.
+      self._watches  = { }      # literal -> [ clauseIndex ]
+      self._units    = [ ]
+      self._hasEmpty = False
+      self._model    = None
+
+   def newVar( self ):
+      """Allocate a new variable.
+      Category:      Mutator.
+      Returns:       (int) The variable.
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      self._numVars += 1
+      return self._numVars
+
+   def numVars( self ):
+      return self._numVars
+
+   def addClause( self, literals ):
+      """Add the clause (disjunction) of literals.
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Constrains the problem.
+      Preconditions: [AssertionError] Every literal must be a non-zero int
+                        naming a variable from newVar( ).
+      """
+      clause = [ ]
+      for lit in literals:
+         assert isinstance( lit, int ) and ( lit != 0 ) and ( abs( lit ) <= self._numVars )
+         if -lit in clause:
+            return          # Tautology
+         if lit not in clause:
+            clause.append( lit )
+
+      if len( clause ) == 0:
+         self._hasEmpty = True
+      elif len( clause ) == 1:
+         self._units.append( clause[ 0 ] )
+      else:
+         self._watch( clause )
+
+   def solve( self ):
+      """Decide whether the clauses are satisfiable.
+      Category:      Mutator.
+      Returns:       (bool) True if satisfiable; see model( ).
+      Side Effects:  May add learnt clauses (implied by the others).
+      Preconditions: None.
+      """
+      self._model = None
+      if self._hasEmpty:
+         return False
+
+      numVars  = self._numVars
+      clauses  = self._clauses
+      watches  = self._watches
+
+      values   = [ 0 ] * ( numVars + 1 )       # 1 true, -1 false, 0 unassigned
+      levels   = [ 0 ] * ( numVars + 1 )
+      reasons  = [ None ] * ( numVars + 1 )
+      phases   = [ -1 ] * ( numVars + 1 )
+      activity = [ 0.0 ] * ( numVars + 1 )
+      trail    = [ ]
+      trailLim = [ ]
+      order    = [ ( 0.0, var ) for var in range( 1, numVars + 1 ) ]
+      state    = { 'qhead' : 0, 'increment' : 1.0 }
+
+      def litValue( lit ):
+         value = values[ lit if lit > 0 else -lit ]
+         return value if lit > 0 else -value
+
+      def enqueue( lit, reason ):
+         var = lit if lit > 0 else -lit
+         values[ var ]  = 1 if lit > 0 else -1
+         levels[ var ]  = len( trailLim )
+         reasons[ var ] = reason
+         trail.append( lit )
+
+      def propagate( ):
+         """Returns the index of a conflicting clause, or None."""
+         while state[ 'qhead' ] < len( trail ):
+            falseLit = -trail[ state[ 'qhead' ] ]
+            state[ 'qhead' ] += 1
+
+            watching = watches.get( falseLit )
+            if not watching:
+               continue
+
+            kept = [ ]
+            for position, clauseIndex in enumerate( watching ):
+               clause = clauses[ clauseIndex ]
+               if clause[ 0 ] == falseLit:
+                  clause[ 0 ], clause[ 1 ] = clause[ 1 ], clause[ 0 ]
+
+               if litValue( clause[ 0 ] ) == 1:
+                  kept.append( clauseIndex )
+                  continue
+
+               # Look for a new literal to watch.
+               for k in range( 2, len( clause ) ):
+                  if litValue( clause[ k ] ) != -1:
+                     clause[ 1 ], clause[ k ] = clause[ k ], clause[ 1 ]
+                     watches.setdefault( clause[ 1 ], [ ] ).append( clauseIndex )
+                     break
+               else:
+                  kept.append( clauseIndex )
+                  if litValue( clause[ 0 ] ) == -1:
+                     kept.extend( watching[ position + 1 : ] )
+                     watches[ falseLit ] = kept
+                     return clauseIndex
+                  enqueue( clause[ 0 ], clauseIndex )
+
+            watches[ falseLit ] = kept
+
+         return None
+
+      def bump( var ):
+         activity[ var ] += state[ 'increment' ]
+         if activity[ var ] > 1e100:
+            for v in range( 1, numVars + 1 ):
+               activity[ v ] *= 1e-100
+            state[ 'increment' ] *= 1e-100
+            order[ : ] = [ ( -activity[ v ], v ) for v in range( 1, numVars + 1 ) ]
+            heapq.heapify( order )
+         else:
+            heapq.heappush( order, ( -activity[ var ], var ) )
+
+      def analyze( conflictIndex ):
+         """Returns ( learntClause, backjumpLevel ) by first-UIP resolution."""
+         currentLevel = len( trailLim )
+         learnt  = [ 0 ]
+         seen    = set( )
+         pending = 0
+         index   = len( trail ) - 1
+         lit     = None
+         clause  = clauses[ conflictIndex ]
+
+         while True:
+            for other in ( clause if lit is None else clause[ 1: ] ):
+               var = abs( other )
+               if ( var not in seen ) and ( levels[ var ] > 0 ):
+                  seen.add( var )
+                  bump( var )
+                  if levels[ var ] == currentLevel:
+                     pending += 1
+                  else:
+                     learnt.append( other )
+
+            while abs( trail[ index ] ) not in seen:
+               index -= 1
+            lit    = trail[ index ]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+               break
+            clause = clauses[ reasons[ abs( lit ) ] ]
+
+         learnt[ 0 ] = -lit
+
+         backjumpLevel = 0
+         if len( learnt ) > 1:
+            best = max( range( 1, len( learnt ) ), key=lambda i: levels[ abs( learnt[ i ] ) ] )
+            learnt[ 1 ], learnt[ best ] = learnt[ best ], learnt[ 1 ]
+            backjumpLevel = levels[ abs( learnt[ 1 ] ) ]
+
+         return learnt, backjumpLevel
+
+      def backtrack( level ):
+         if len( trailLim ) <= level:
+            return
+         limit = trailLim[ level ]
+         for lit in trail[ limit: ]:
+            var = abs( lit )
+            phases[ var ]  = values[ var ]
+            values[ var ]  = 0
+            reasons[ var ] = None
+            heapq.heappush( order, ( -activity[ var ], var ) )
+         del trail[ limit: ]
+         del trailLim[ level: ]
+         state[ 'qhead' ] = len( trail )
+
+      def pickBranch( ):
+         while order:
+            negActivity, var = heapq.heappop( order )
+            if values[ var ] == 0:
+               return var
+         return None
+
+      # Level 0 units
+      for lit in self._units:
+         value = litValue( lit )
+         if value == -1:
+            return False
+         if value == 0:
+            enqueue( lit, None )
+
+      conflicts    = 0
+      restartLimit = SATSolver.RESTART_FIRST
+      while True:
+         conflictIndex = propagate( )
+         if conflictIndex is not None:
+            if len( trailLim ) == 0:
+               return False
+
+            learnt, backjumpLevel = analyze( conflictIndex )
+            backtrack( backjumpLevel )
+            if len( learnt ) == 1:
+               enqueue( learnt[ 0 ], None )
+            else:
+               enqueue( learnt[ 0 ], self._watch( learnt ) )
+
+            state[ 'increment' ] /= SATSolver.ACTIVITY_DECAY
+            conflicts += 1
+            if conflicts >= restartLimit:
+               conflicts     = 0
+               restartLimit  = int( restartLimit * SATSolver.RESTART_GROWTH )
+               backtrack( 0 )
+
+         else:
+            var = pickBranch( )
+            if var is None:
+               self._model = { v : ( values[ v ] == 1 ) for v in range( 1, numVars + 1 ) }
+               return True
+
+            trailLim.append( len( trail ) )
+            enqueue( var if phases[ var ] == 1 else -var, None )
+
+   def model( self ):
+      """Returns the satisfying assignment found by the last solve( ).
+      Category:      Pure Function.
+      Returns:       (dict) variable -> bool, or None if unsatisfiable.
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      return self._model
+
+   def _watch( self, clause ):
+      clauseIndex = len( self._clauses )
+      self._clauses.append( clause )
+      self._watches.setdefault( clause[ 0 ], [ ] ).append( clauseIndex )
+      self._watches.setdefault( clause[ 1 ], [ ] ).append( clauseIndex )
+      return clauseIndex
@@ -0,0 +1,220 @@
+"""This module implements Semantics, truth-functional evaluation of forms and
+a validity test for sequents, using the truth tables declared in a
+Language's lexicon.
+
+A sequent is valid when every valuation of its atoms which makes all its
+premises true also makes all its conclusions true.  (Conclusions are read
+conjunctively, as the inference rules read them:  'P & Q |- P, Q'.)  A
+sequent nested as a premise is read as the conditional from the
+conjunction of its premises to the conjunction of its conclusions.
+
+Sequents with few atoms are decided by bit-parallel truth tables:  each atom
+is an int with one bit per row of the table, so a whole column is computed
+with a handful of integer operations.  Larger sequents are decided by the
+SAT solver:  the sequent is refuted by a Tseitin encoding of its premises
+and negated conclusions.
+"""
+
+from Form import WFF, Sequent
+from SATSolver import SATSolver
+
+
+class NotTruthFunctionalError( Exception ):
+   """The form uses an operator with no truth table."""
+
+
+class Semantics( object ):
+   """Implementation of the truth-functional semantics of a Language."""
+   TRUTH_TABLE_ATOM_LIMIT = 16
+
+   def __init__( self, language ):
+      """Initialize a new instance of the class.
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Initializes an instance.
+      Preconditions: [AssertionError] 'language' must be a Language.
+      """
+      self._language = language
+
+   def evaluate( self, aForm, valuation ):
+      """Returns the truth value of aForm under valuation.
+      Category:      Pure Function.
+      Returns:       (bool)
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'aForm' must be a WFF or Sequent.
+                     [AssertionError] 'valuation' must be a dict from atom
+                        symbols to bool, defined for every atom of aForm.
+                     [NotTruthFunctionalError] Every operator of aForm must
+                        have a truth table.
+      """
+      assert isinstance( aForm,     ( WFF, Sequent ) )
+      assert isinstance( valuation, dict             )
+
+      symbols = list( valuation )
+      columns = { sym : ( 1 if valuation[ sym ] else 0 ) for sym in symbols }
+      return self._column( aForm, columns, 1, { } ) == 1
+
+   def isValid( self, aSequent ):
+      """Is aSequent valid?
+      Category:      Predicate.
+      Returns:       (bool)
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'aSequent' must be a Sequent.
+                     [NotTruthFunctionalError] Every operator of aSequent
+                        must have a truth table.
+      """
+      return self.counterexample( aSequent ) is None
+
+   def counterexample( self, aSequent ):
+      """Returns a valuation under which the premises of aSequent are true
+      and some conclusion is false.
+      Category:      Pure Function.
+      Returns:       (dict) atom symbol -> bool, or None if aSequent is valid.
+      Side Effects:  None.
+      Preconditions: [AssertionError] 'aSequent' must be a Sequent.
+                     [NotTruthFunctionalError] Every operator of aSequent
+                        must have a truth table.
+      """
+      assert isinstance( aSequent, Sequent )
+
+      symbols = aSequent.atomList( )
+      if len( symbols ) <= Semantics.TRUTH_TABLE_ATOM_LIMIT:
+         return self._truthTableCounterexample( aSequent, symbols )
+      else:
+         return self._satCounterexample( aSequent, symbols )
+
+   # Bit-parallel truth tables
+   def _truthTableCounterexample( self, aSequent, symbols ):
+      rows = 1 << len( symbols )
+      full = ( 1 << rows ) - 1
+
+      # Atom k is true in the rows whose number has bit k set.
+      columns = { }
+      for k, sym in enumerate( symbols ):
+         block = 1 << k
+         columns[ sym ] = ( full // ( ( 1 << ( 2 * block ) ) - 1 ) ) * ( ( ( 1 << block ) - 1 ) << block )
+
+      memo     = { }
+      premises = self._conjunction( aSequent.premiseFormSet( ),    columns, full, memo )
+      holds    = self._conjunction( aSequent.conclusionFormSet( ), columns, full, memo )
+
+      refuting = premises & ~holds & full
+      if refuting == 0:
+         return None
+
+      row = ( refuting & -refuting ).bit_length( ) - 1
+      return { sym : bool( ( row >> k ) & 1 ) for k, sym in enumerate( symbols ) }
+
+   def _conjunction( self, aFormSet, columns, full, memo ):
+      result = full
+      for member in aFormSet:
+         result &= self._column( member, columns, full, memo )
+      return result
+
+   def _column( self, aForm, columns, full, memo ):
+      """Returns the column (bitmask over the rows) of aForm."""
+      if isinstance( aForm, Sequent ):
+         premises = self._conjunction( aForm.premiseFormSet( ),    columns, full, memo )
+         holds    = self._conjunction( aForm.conclusionFormSet( ), columns, full, memo )
+         return ( ~premises | holds ) & full
+
+      result = memo.get( aForm )
+      if result is not None:
+         return result
+
+      if aForm.isAtomic( ):
+         result = columns[ aForm.primary( ) ]
+      else:
+         table    = self._truthTable( aForm )
+         operands = [ self._column( operand, columns, full, memo ) for operand in aForm.subordinates( ) ]
+         arity    = len( operands )
+
+         result = 0
+         for inputs, value in enumerate( table ):
+            if value:
+               term = full
+               for position, operand in enumerate( operands ):
+                  if ( inputs >> ( arity - 1 - position ) ) & 1:
+                     term &= operand
+                  else:
+                     term &= ~operand
+               result |= term
+         result &= full
+
+      memo[ aForm ] = result
+      return result
+
+   def _truthTable( self, aWFF ):
+      table = self._language.truthTable( aWFF.primary( ) )
+      if ( table is None ) or ( len( table ) != ( 1 << len( aWFF.subordinates( ) ) ) ):
+         raise NotTruthFunctionalError( 'No truth table for operator {0}.'.format( aWFF.primary( ) ) )
+      return table
+
+   # SAT
+   def _satCounterexample( self, aSequent, symbols ):
+      solver    = SATSolver( )
+      variables = { }
+      atomVars  = { }
+      for sym in symbols:
+         atomVars[ sym ] = solver.newVar( )
+
+      # Premises true, some conclusion false.
+      for premise in aSequent.premiseFormSet( ):
+         solver.addClause( [ self._tseitin( premise, solver, atomVars, variables ) ] )
+
+      solver.addClause( [ -self._tseitin( conclusion, solver, atomVars, variables ) for conclusion in aSequent.conclusionFormSet( ) ] )
+
+      if not solver.solve( ):
+         return None
+
+      model = solver.model( )
+      return { sym : model[ var ] for sym, var in atomVars.items( ) }
+
+   def _tseitin( self, aForm, solver, atomVars, variables ):
+      """Returns a variable equivalent to aForm, adding its defining clauses."""
+      if isinstance( aForm, Sequent ):
+         premiseVars    = [ self._tseitin( member, solver, atomVars, variables ) for member in aForm.premiseFormSet( ) ]
+         conclusionVars = [ self._tseitin( member, solver, atomVars, variables ) for member in aForm.conclusionFormSet( ) ]
+         premises       = self._tseitinAnd( premiseVars,    solver )
+         holds          = self._tseitinAnd( conclusionVars, solver )
+
+         # var <-> ( premises -> holds )
+         var = solver.newVar( )
+         solver.addClause( [ -var, -premises, holds ] )
+         solver.addClause( [ var, premises ] )
+         solver.addClause( [ var, -holds ] )
+         return var
+
+      var = variables.get( aForm )
+      if var is not None:
+         return var
+
+      if aForm.isAtomic( ):
+         var = atomVars[ aForm.primary( ) ]
+      else:
+         table       = self._truthTable( aForm )
+         operandVars = [ self._tseitin( operand, solver, atomVars, variables ) for operand in aForm.subordinates( ) ]
+         arity       = len( operandVars )
+
+         # One clause per row of the truth table:  if the operands take the
+         # row's values, var takes the table's value.
+         var = solver.newVar( )
+         for inputs, value in enumerate( table ):
+            clause = [ ]
+            for position, operandVar in enumerate( operandVars ):
+               if ( inputs >> ( arity - 1 - position ) ) & 1:
+                  clause.append( -operandVar )
+               else:
+                  clause.append( operandVar )
+            clause.append( var if value else -var )
+            solver.addClause( clause )
+
+      variables[ aForm ] = var
+      return var
+
+   def _tseitinAnd( self, memberVars, solver ):
+      var = solver.newVar( )
+      for memberVar in memberVars:
+         solver.addClause( [ -var, memberVar ] )
+      solver.addClause( [ var ] + [ -memberVar for memberVar in memberVars ] )
+      return var
@@ -0,0 +1,518 @@
+"""This module implements a compact binary encoding of forms and proofs.
+
+An encoding is laid out as:
+
+   MAGIC  version  kind  symbols  nodes  body
+
+'symbols' is the table of every string used (atom and operator symbols,
+mapping symbols and the logic name), each stored once.  'nodes' is the
+table of forms in dependency order:  every node refers to its parts by
+their earlier node numbers, so a subformula shared within a form, or
+between the steps of a proof, is stored once.  All integers are unsigned
+LEB128 varints.
+
+   ATOM       symbol
+   STRUCTURED operator arity operand...
+   FORMSET    count member...
+   SEQUENT    premiseFormSet conclusionFormSet
+
+The body of a FORM encoding is the root node.  The body of a PROOF encoding
+is the logic name, the number of rules in its calculus and the proof's
+history of changes (see Proof.history( )):
+
+   ADD_STEP   prop ruleId conclusionIndex #citations citation...
+              #mappings ( symbol wff )...
+   BEGIN_HYPO
+   END_HYPO
+
+where a rule id is the rule's index in the calculus (Calculus._ruleDict)
+and a citation is 2*step, or 2*first+1 followed by last for a subproof
+range.
+
+Decoding reads through a memoryview of the buffer (bytes, bytearray, mmap,
+...) without copying it, and builds the forms directly, without scanning
+or parsing any text.
+"""
+
+from Form import WFF, AtomicWFF, StructuredWFF, FormSet, Sequent
+from Proof import Proof, ProofStructureError
+from Validation import ValidationError
+
+
+MAGIC          = b'ARSF'
+VERSION        = 1
+
+# Encoding kinds
+FORM           = 1
+PROOF          = 2
+
+# Node tags
+ATOM           = 1
+STRUCTURED     = 2
+FORMSET        = 3
+SEQUENT        = 4
+
+# Proof operation tags
+ADD_STEP       = 1
+BEGIN_HYPO     = 2
+END_HYPO       = 3
+
+
+class SerializationError( Exception ):
+   """The buffer does not hold a valid encoding."""
+
+
+# Varints
+def writeVarint( out, value ):
+   """Append the varint encoding of value to the bytearray out."""
+   while value > 0x7F:
+      out.append( ( value & 0x7F ) | 0x80 )
+      value >>= 7
+   out.append( value )
+
+
+def readVarint( buffer, pos ):
+   """Decode the varint at pos in buffer.
+   Returns:       (tuple) The value and the position after it.
+   Preconditions: [IndexError] The varint must be complete.
+   """
+   result = 0
+   shift  = 0
+   while True:
+      value = buffer[ pos ]
+      pos  += 1
+      result |= ( value & 0x7F ) << shift
+      if value < 0x80:
+         return result, pos
+      shift += 7
+
+
+# Encoding
+
+def _partsOf( aForm ):
+   if isinstance( aForm, StructuredWFF ):
+      return aForm.subordinates( )
+   elif isinstance( aForm, AtomicWFF ):
+      return [ ]
+   elif isinstance( aForm, FormSet ):
+      return list( aForm )
+   elif isinstance( aForm, Sequent ):
+      return [ aForm.premiseFormSet( ), aForm.conclusionFormSet( ) ]
+   else:
+      raise SerializationError( 'Cannot encode {0!r}.'.format( aForm ) )
+
+
+class _Encoder( object ):
+   def __init__( self ):
+      self._symbols    = { }       # str -> symbol number
+      self._symbolList = [ ]
+      self._nodeIds    = { }       # id( form ) -> node number
+      self._keepAlive  = [ ]       # The encoded forms, so their ids stay unique
+      self._nodes      = bytearray( )
+      self._numNodes   = 0
+
+   def symbol( self, aString ):
+      num = self._symbols.get( aString )
+      if num is None:
+         num = len( self._symbolList )
+         self._symbols[ aString ] = num
+         self._symbolList.append( aString )
+      return num
+
+   def node( self, aForm ):
+      """Returns the node number of aForm, adding it and its parts to the
+      node table if they are not yet there."""
+      nodeIds = self._nodeIds
+
+      # Post-order walk with an explicit stack; each form is emitted once
+      # its parts have been.
+      pending = [ ( aForm, False ) ]
+      while pending:
+         form, partsDone = pending.pop( )
+         if id( form ) in nodeIds:
+            continue
+
+         parts = _partsOf( form )
+         if not partsDone:
+            pending.append( ( form, True ) )
+            pending.extend( ( part, False ) for part in reversed( parts ) if id( part ) not in nodeIds )
+            continue
+
+         partIds = [ nodeIds[ id( part ) ] for part in parts ]
+         if isinstance( form, StructuredWFF ):
+            self._emit( STRUCTURED, [ self.symbol( form.primary( ) ), len( partIds ) ] + partIds )
+         elif isinstance( form, AtomicWFF ):
+            self._emit( ATOM, [ self.symbol( form.primary( ) ) ] )
+         elif isinstance( form, FormSet ):
+            self._emit( FORMSET, [ len( partIds ) ] + partIds )
+         else:
+            self._emit( SEQUENT, partIds )
+
+         nodeIds[ id( form ) ] = self._numNodes - 1
+         self._keepAlive.append( form )
+
+      return nodeIds[ id( aForm ) ]
+
+   def _emit( self, tag, fields ):
+      self._nodes.append( tag )
+      for field in fields:
+         writeVarint( self._nodes, field )
+      self._numNodes += 1
+
+   def finish( self, kind, body ):
+      out = bytearray( MAGIC )
+      writeVarint( out, VERSION )
+      out.append( kind )
+
+      writeVarint( out, len( self._symbolList ) )
+      for sym in self._symbolList:
+         data = sym.encode( 'utf-8' )
+         writeVarint( out, len( data ) )
+         out += data
+
+      writeVarint( out, self._numNodes )
+      out += self._nodes
+      out += body
+      return bytes( out )
+
+
+def dumpForm( aForm ):
+   """Encode a form.
+   Category:      Pure Function.
+   Returns:       (bytes) The encoding.
+   Side Effects:  None.
+   Preconditions: [AssertionError] 'aForm' must be a WFF, FormSet or Sequent.
+   """
+   assert isinstance( aForm, ( WFF, FormSet, Sequent ) )
+
+   encoder = _Encoder( )
+   body    = bytearray( )
+   writeVarint( body, encoder.node( aForm ) )
+   return encoder.finish( FORM, body )
+
+
+def dumpProof( logic, aProof ):
+   """Encode a proof.
+   Category:      Pure Function.
+   Returns:       (bytes) The encoding.
+   Side Effects:  None.
+   Preconditions: [AssertionError] 'logic' must be a named Logic.
+                  [AssertionError] 'aProof' must be a Proof in that logic.
+   """
+   assert isinstance( logic.name( ), str )
+   assert isinstance( aProof,        Proof )
+
+   calculus = logic.calculus( )
+   encoder  = _Encoder( )
+   body     = bytearray( )
+
+   writeVarint( body, encoder.symbol( logic.name( ) ) )
+   writeVarint( body, len( calculus.ruleList( ) ) )
+
+   history = aProof.history( )
+   writeVarint( body, len( history ) )
+   for entry in history:
+      kind = entry[ 0 ]
+      if kind == Proof.BEGIN_HYPO:
+         body.append( BEGIN_HYPO )
+      elif kind == Proof.END_HYPO:
+         body.append( END_HYPO )
+      else:
+         step = entry[ 1 ]
+         body.append( ADD_STEP )
+         writeVarint( body, encoder.node( step.prop ) )
+         writeVarint( body, calculus._ruleDict[ step.inferenceRule.name ] )
+         writeVarint( body, step.conclusionIndex )
+
+         writeVarint( body, len( step.citationList ) )
+         for cit in step.citationList:
+            if isinstance( cit, int ):
+               writeVarint( body, 2 * cit )
+            else:
+               writeVarint( body, 2 * cit[ 0 ] + 1 )
+               writeVarint( body, cit[ 1 ] )
+
+         writeVarint( body, len( step.mapping ) )
+         for sym, wff in sorted( step.mapping.items( ) ):
+            writeVarint( body, encoder.symbol( sym ) )
+            writeVarint( body, encoder.node( wff ) )
+
+   return encoder.finish( PROOF, body )
+
+
+# Decoding
+class _Decoder( object ):
+   def __init__( self, buffer, offset ):
+      self._base = memoryview( buffer )
+      self._view = self._base.cast( 'B' )
+      self._pos  = offset
+
+   def release( self ):
+      """Release the views of the buffer, so an mmap can be closed."""
+      self._view.release( )
+      self._base.release( )
+
+   def byte( self ):
+      try:
+         value = self._view[ self._pos ]
+      except IndexError:
+         raise SerializationError( 'Unexpected end of buffer.' )
+      self._pos += 1
+      return value
+
+   def varint( self ):
+      view   = self._view
+      pos    = self._pos
+      result = 0
+      shift  = 0
+      try:
+         while True:
+            value = view[ pos ]
+            pos  += 1
+            result |= ( value & 0x7F ) << shift
+            if value < 0x80:
+               break
+            shift += 7
+      except IndexError:
+         raise SerializationError( 'Unexpected end of buffer.' )
+      self._pos = pos
+      return result
+
+   def header( self, expectedKind ):
+      if bytes( self._view[ self._pos : self._pos + len( MAGIC ) ] ) != MAGIC:
+         raise SerializationError( 'Not an encoded form or proof.' )
+      self._pos += len( MAGIC )
+
+      version = self.varint( )
+      if version != VERSION:
+         raise SerializationError( 'Unsupported encoding version {0}.'.format( version ) )
+
+      if self.byte( ) != expectedKind:
+         raise SerializationError( 'Wrong kind of encoding.' )
+
+      view    = self._view
+      symbols = [ ]
+      for index in range( self.varint( ) ):
+         length = self.varint( )
+         end    = self._pos + length
+         if end > len( view ):
+            raise SerializationError( 'Unexpected end of buffer.' )
+         try:
+            symbols.append( str( view[ self._pos : end ], 'utf-8' ) )
+         except UnicodeDecodeError:
+            raise SerializationError( 'Symbol {0} is not valid UTF-8.'.format( index ) )
+         self._pos = end
+      self.symbols = symbols
+
+      nodes = [ ]
+      try:
+         for index in range( self.varint( ) ):
+            tag = self.byte( )
+            if tag == ATOM:
+               nodes.append( AtomicWFF( symbols[ self.varint( ) ] ) )
+            elif tag == STRUCTURED:
+               operator = symbols[ self.varint( ) ]
+               operands = [ nodes[ self.varint( ) ] for k in range( self.varint( ) ) ]
+               if not all( isinstance( operand, WFF ) for operand in operands ):
+                  raise SerializationError( 'An operand of node {0} is not a wff.'.format( len( nodes ) ) )
+               nodes.append( StructuredWFF( operator, *operands ) )
+            elif tag == FORMSET:
+               # Appended one by one, as FormSet( list ) may reorder the members.
+               formSet = FormSet( )
+               for k in range( self.varint( ) ):
+                  formSet.append( nodes[ self.varint( ) ] )
+               nodes.append( formSet )
+            elif tag == SEQUENT:
+               premises    = nodes[ self.varint( ) ]
+               conclusions = nodes[ self.varint( ) ]
+               nodes.append( Sequent( premises, conclusions ) )
+            else:
+               raise SerializationError( 'Unknown node tag {0}.'.format( tag ) )
+      except IndexError:
+         raise SerializationError( 'Reference to an undefined symbol or node.' )
+      except ValidationError as error:
+         # e.g. a wff with three operands, or a sequent of wffs.
+         raise SerializationError( 'Malformed node {0}:  {1}'.format( len( nodes ), error ) )
+      self.nodes = nodes
+
+   def skip( self ):
+      """Move past the encoding without building anything."""
+      if bytes( self._view[ self._pos : self._pos + len( MAGIC ) ] ) != MAGIC:
+         raise SerializationError( 'Not an encoded form or proof.' )
+      self._pos += len( MAGIC )
+
+      if self.varint( ) != VERSION:
+         raise SerializationError( 'Unsupported encoding version.' )
+      kind = self.byte( )
+
+      for index in range( self.varint( ) ):
+         length     = self.varint( )
+         self._pos += length
+
+      for index in range( self.varint( ) ):
+         tag = self.byte( )
+         if tag == ATOM:
+            numFields = 1
+         elif tag == STRUCTURED:
+            self.varint( )                                # operator
+            numFields = self.varint( )
+         elif tag == FORMSET:
+            numFields = self.varint( )
+         elif tag == SEQUENT:
+            numFields = 2
+         else:
+            raise SerializationError( 'Unknown node tag {0}.'.format( tag ) )
+
+         for field in range( numFields ):
+            self.varint( )
+
+      if kind == FORM:
+         self.varint( )
+      elif kind == PROOF:
+         self.varint( )                                   # logic name
+         self.varint( )                                   # number of rules
+         for index in range( self.varint( ) ):
+            if self.byte( ) == ADD_STEP:
+               for field in range( 3 ):                   # prop, rule, conclusion index
+                  self.varint( )
+               for cit in range( self.varint( ) ):
+                  if self.varint( ) & 1:
+                     self.varint( )
+               for mapping in range( self.varint( ) ):
+                  self.varint( )
+                  self.varint( )
+      else:
+         raise SerializationError( 'Unknown kind of encoding.' )
+
+      if self._pos > len( self._view ):
+         raise SerializationError( 'Unexpected end of buffer.' )
+
+   def node( self ):
+      try:
+         return self.nodes[ self.varint( ) ]
+      except IndexError:
+         raise SerializationError( 'Reference to an undefined node.' )
+
+   def symbol( self ):
+      try:
+         return self.symbols[ self.varint( ) ]
+      except IndexError:
+         raise SerializationError( 'Reference to an undefined symbol.' )
+
+   def end( self ):
+      return self._pos
+
+
+def loadForm( buffer, offset=0 ):
+   """Decode a form.
+   Category:      Pure Function.
+   Returns:       (Form) The decoded WFF, FormSet or Sequent.
+   Side Effects:  None.
+   Preconditions: [AssertionError] 'buffer' must support the buffer protocol
+                     (bytes, bytearray, memoryview, mmap, ...).
+                  [AssertionError] 'offset' the position of the encoding
+                     within the buffer.
+                  [SerializationError] The buffer must hold an encoding made
+                     by dumpForm( ).
+   """
+   assert isinstance( offset, int ) and ( offset >= 0 )
+
+   decoder = _Decoder( buffer, offset )
+   try:
+      decoder.header( FORM )
+      return decoder.node( )
+   finally:
+      decoder.release( )
+
+
+def loadProof( logic, buffer, offset=0 ):
+   """Decode a proof.
+   Category:      Pure Function.
+   Returns:       (Proof) The decoded proof.
+   Side Effects:  None.
+   Preconditions: [AssertionError] 'logic' must be the named Logic the proof
+                     was encoded in.
+                  [AssertionError] 'buffer' must support the buffer protocol
+                     (bytes, bytearray, memoryview, mmap, ...).
+                  [AssertionError] 'offset' the position of the encoding
+                     within the buffer.
+                  [SerializationError] The buffer must hold an encoding made
+                     by dumpProof( ) with the same logic.
+   """
+   assert isinstance( offset, int ) and ( offset >= 0 )
+
+   decoder = _Decoder( buffer, offset )
+   try:
+      decoder.header( PROOF )
+
+      calculus = logic.calculus( )
+      ruleList = calculus.ruleList( )
+
+      logicName = decoder.symbol( )
+      if logicName != logic.name( ):
+         raise SerializationError( 'The proof is in the logic {0}.'.format( logicName ) )
+      if decoder.varint( ) != len( ruleList ):
+         raise SerializationError( 'The calculus of {0} has changed since the proof was saved.'.format( logicName ) )
+
+      proof = Proof( )
+      for index in range( decoder.varint( ) ):
+         tag = decoder.byte( )
+         try:
+            _replayOperation( decoder, proof, ruleList, tag )
+         except ( ValidationError, ProofStructureError ) as error:
+            raise SerializationError( 'Invalid proof operation {0}:  {1}'.format( index, error ) )
+
+      return proof
+   finally:
+      decoder.release( )
+
+
+def _replayOperation( decoder, proof, ruleList, tag ):
+   """Decode one operation of a proof's history and apply it to proof."""
+   if tag == BEGIN_HYPO:
+      proof.beginHypo( )
+   elif tag == END_HYPO:
+      proof.endHypo( )
+   elif tag == ADD_STEP:
+      prop            = decoder.node( )
+      ruleId          = decoder.varint( )
+      conclusionIndex = decoder.varint( )
+
+      citations = [ ]
+      for k in range( decoder.varint( ) ):
+         cit = decoder.varint( )
+         if cit & 1:
+            citations.append( ( cit >> 1, decoder.varint( ) ) )
+         else:
+            citations.append( cit >> 1 )
+
+      mapping = { }
+      for k in range( decoder.varint( ) ):
+         sym = decoder.symbol( )
+         mapping[ sym ] = decoder.node( )
+
+      if ruleId >= len( ruleList ):
+         raise SerializationError( 'Unknown rule id {0}.'.format( ruleId ) )
+
+      proof.addStep( prop, citations, ruleList[ ruleId ], mapping, conclusionIndex )
+   else:
+      raise SerializationError( 'Unknown proof operation {0}.'.format( tag ) )
+
+
+def encodingEnd( buffer, offset=0 ):
+   """Find the end of an encoding without decoding it.
+   Category:      Pure Function.
+   Returns:       (int) The position in buffer just past the encoding which
+                  starts at offset.
+   Side Effects:  None.
+   Preconditions: [SerializationError] The buffer must hold a complete
+                     encoding made by dumpForm( ) or dumpProof( ) at offset.
+   """
+   assert isinstance( offset, int ) and ( offset >= 0 )
+
+   decoder = _Decoder( buffer, offset )
+   try:
+      decoder.skip( )
+      return decoder.end( )
+   finally:
+      decoder.release( )
@@ -1,5 +1,5 @@
 """Utility methods for built-in classes."""
-import copy
+import bisect
 
 
 class InvalidRegionException( Exception ):
@@ -24,6 +24,7 @@ class StructuredStringRegion( object ):
       self._dominantIndecies = domIndecies
       self._regionIndecies   = regIndecies
       self._clientData       = clientData
+      self._path             = None
 
    def dominantIndecies( self ):
       return self._dominantIndecies
@@ -45,21 +46,34 @@ class StructuredStringRegion( object ):
    def setClientData( self, value ):
       self._clientData = value
 
+   def getPath( self ):
+      """The position of the region's form in the form the string was built
+      for (see WFF.subWFFAt( )), or None."""
+      return self._path
+
+   def setPath( self, path ):
+      self._path = path
+
+   def hasDominant( self ):
+      """A region of several members (e.g. a set of forms) has no dominant."""
+      return self._dominantIndecies != [ -1, -1 ]
+
    def validate( self, theCompleteString ):
       # reasonability checks on the region
-      if (self._primaryString is None) or (len(self._primaryString) == 0):
-         raise InvalidRegionException()
-
       maxIndex = len(theCompleteString) + 1
 
-      if len(self._dominantIndecies) != 2:
-         raise InvalidRegionException()
-      if not ( 0 <= self._dominantIndecies[0] <= maxIndex ):
-         raise InvalidRegionException()
-      if not ( 0 <= self._dominantIndecies[1] <= maxIndex ):
-         raise InvalidRegionException()
-      if self._dominantIndecies[0] > self._dominantIndecies[1]:
-         raise InvalidRegionException()
+      if self.hasDominant( ):
+         if (self._primaryString is None) or (len(self._primaryString) == 0):
+            raise InvalidRegionException()
+
+         if len(self._dominantIndecies) != 2:
+            raise InvalidRegionException()
+         if not ( 0 <= self._dominantIndecies[0] <= maxIndex ):
+            raise InvalidRegionException()
+         if not ( 0 <= self._dominantIndecies[1] <= maxIndex ):
+            raise InvalidRegionException()
+         if self._dominantIndecies[0] > self._dominantIndecies[1]:
+            raise InvalidRegionException()
 
       if len(self._regionIndecies) != 2:
          raise InvalidRegionException()
@@ -78,113 +92,179 @@ class StructuredString( object ):
    can be organized into a syntax tree.  A StructuredString instance provides
    means of working with structured string objects.
 
-   It's implemented as a string and corresponding list of the same length.
-   Each index position in the string has a corresponding set of data at the
-   same index position in the list.
-
-   Each entry in the list
-   It contains
-   a list of dominant substrings and their subordinates.
-
-   Internal dict object has the following organization:
-   #   #index           Dominant           Region            Client Data
-   #   <index>  :  [  [ dFirst, dLast ], [ sFirst, sLast ], <client>    ]
-
-   index is a character index in the string.  In practice for a given entry
-   index should be within the interval expressed by Dominant.  There should be
-   one entry for each position within the Dominant.
-
-   Dominant is the index of the first and last characters of the dominant.
-
-   Region is the index of the first and last characters of the complete
-   substring (dominanant and all subordinates) reigned over by the dominant.
-
-   Name is some unique name chosen for the dominant.
-
-   Client Data is some additional data to associate with the dominant.  This
-   is most likely some sort of reference back to the node in the syntax tree.
+   It's implemented as a string and a set of named regions
+   (StructuredStringRegion).  Each region has:
+
+      Dominant     the first index and the index past the last character of
+                   the dominant (e.g. the operator of a wff).
+      Region       the first index and the index past the last character of
+                   the complete substring (dominant and all subordinates)
+                   reigned over by the dominant.
+      Client Data  some additional data to associate with the dominant.  This
+                   is most likely some sort of reference back to the node in
+                   the syntax tree.
+
+   A region of several members, such as a set of forms, has no dominant.
+   Dominants may not overlap, and regions must nest as the nodes of a syntax
+   tree do.  For the queries by position the dominants are kept as sorted
+   arrays, and the regions as the sorted boundaries of the segments of the
+   string with the same innermost region, so each query is a binary search.
+   These are built by the first query.
    '''
-   def __init__( self, aMappedString, aNamedRegionMap, aRegionDefList ):
+   def __init__( self, aString, aNamedRegionMap ):
       """Initialize a new instance of this class.
       Category:      Mutator
       Returns:       Nothing.
       Side Effects:  None.
-      Preconditions: None.
+      Preconditions: [AssertionError] aString must be a str.
+                     [AssertionError] aNamedRegionMap must be a dict of name : StructuredStringRegion.
+                        Dominants may not overlap and regions may not
+                        partially overlap; the first query by position
+                        raises InvalidRegionException if they do.
       """
-      assert isinstance( aMappedString,     str  )
+      assert isinstance( aString,           str  )
       assert isinstance( aNamedRegionMap,   dict )
-      assert isinstance( aRegionDefList,    list )
 
-      self._completeString     = aMappedString
+      self._completeString     = aString
       self._namedRegions       = aNamedRegionMap
-      self._regionDefList      = aRegionDefList
+
+      # The indexes for the queries by position, built by the first query.
+      self._domStarts          = None
+      self._domEnds            = None
+      self._domNames           = None
+      self._segStarts          = None
+      self._segNames           = None
 
    def __str__( self ):
       """Implementation of function str( )."""
-      assert isinstance( self._completeString, str  )
-      assert isinstance( self._namedRegions,   dict )
-      assert isinstance( self._regionDefList,  list )
-
       return self._completeString
 
    def __repr__( self ):
       """Implementation of function repr( )."""
-      assert isinstance( self._completeString, str  )
-      assert isinstance( self._namedRegions,   dict )
-      assert isinstance( self._regionDefList,  list )
-
       return self._completeString
 
    def __len__( self ):
       """Implement the len() function."""
-      assert isinstance( self._completeString, str  )
-      assert isinstance( self._namedRegions,   dict )
-      assert isinstance( self._regionDefList,  list )
-
       return len(self._completeString)
 
-   def regionInfo( self, index ):
+   def regionAt( self, index ):
+      """Find the region whose dominant contains a position.
+      Category:      Pure Function.
+      Returns:       (tuple) ( name, StructuredStringRegion ) or None if no
+                     dominant contains index.  O(log n).
+      Side Effects:  None.
+      Preconditions: [AssertionError] index must be an int.
+      """
       assert isinstance( index,               int  )
 
-      assert isinstance( self._completeString, str  )
-      assert isinstance( self._namedRegions,   dict )
-      assert isinstance( self._regionDefList,  list )
+      if self._domStarts is None:
+         self._buildIndex( )
 
-      return self._regionDefList[ index ]
+      pos = bisect.bisect_right( self._domStarts, index ) - 1
+      if ( pos < 0 ) or ( index >= self._domEnds[ pos ] ):
+         return None
 
-   def regions( self ):
-      assert isinstance( self._completeString, str  )
-      assert isinstance( self._namedRegions,   dict )
-      assert isinstance( self._regionDefList,  list )
+      name = self._domNames[ pos ]
+      return ( name, self._namedRegions[ name ] )
 
+   def innermostRegionAt( self, index ):
+      """Find the innermost region containing a position.
+      Category:      Pure Function.
+      Returns:       (tuple) ( name, StructuredStringRegion ) or None if no
+                     region contains index.  O(log n).
+      Side Effects:  None.
+      Preconditions: [AssertionError] index must be an int.
+      """
+      assert isinstance( index,               int  )
+
+      if not ( 0 <= index < len( self._completeString ) ):
+         return None
+
+      if self._segStarts is None:
+         self._buildIndex( )
+
+      name = self._segNames[ bisect.bisect_right( self._segStarts, index ) - 1 ]
+      if name is None:
+         return None
+
+      return ( name, self._namedRegions[ name ] )
+
+   def _buildIndex( self ):
+      """Build the sorted arrays of dominants and region segments."""
+      # Dominants, sorted by their first index:  ( first, past last, name ).
+      domStarts = [ ]
+      domEnds   = [ ]
+      domNames  = [ ]
+      for begin, end, name in sorted( ( rgn.dominantIndecies( )[0], rgn.dominantIndecies( )[1], name )
+                                      for name, rgn in self._namedRegions.items( ) if rgn.hasDominant( ) ):
+         if domEnds and ( begin < domEnds[ -1 ] ):
+            raise InvalidRegionException( 'Dominants may not overlap.' )
+         domStarts.append( begin )
+         domEnds.append( end )
+         domNames.append( name )
+
+      # Segments of the string, each lying in the same innermost region:
+      # segment i runs from segStarts[i] to segStarts[i+1] (or the end).
+      segStarts = [ 0 ]
+      segNames  = [ None ]
+
+      def mark( pos, name ):
+         if segStarts[ -1 ] == pos:
+            segNames[ -1 ] = name
+         else:
+            segStarts.append( pos )
+            segNames.append( name )
+
+      entered = [ ]             # ( past last, name ) of the regions entered, innermost last
+      def leave( pos ):
+         while entered and ( entered[ -1 ][ 0 ] <= pos ):
+            end, name = entered.pop( )
+            mark( end, entered[ -1 ][ 1 ] if entered else None )
+
+      # Outer regions first where two begin at the same index; of two
+      # regions with the same extent, the one begun first is the outer.
+      for begin, negEnd, order, name in sorted( ( rgn.regionIndecies( )[0], -rgn.regionIndecies( )[1], order, name )
+                                                for order, ( name, rgn ) in enumerate( self._namedRegions.items( ) ) ):
+         leave( begin )
+         if entered and ( -negEnd > entered[ -1 ][ 0 ] ):
+            raise InvalidRegionException( 'Regions may not partially overlap.' )
+         mark( begin, name )
+         entered.append( ( -negEnd, name ) )
+      leave( len( self._completeString ) )
+
+      self._domStarts, self._domEnds, self._domNames = domStarts, domEnds, domNames
+      self._segStarts, self._segNames                = segStarts, segNames
+
+   def regionInfo( self, index ):
+      """Returns the region whose dominant contains index, or None."""
+      assert isinstance( index,               int  )
+
+      found = self.regionAt( index )
+      return found[ 1 ] if found is not None else None
+
+   def regions( self ):
       return self._namedRegions
 
    def iterIndexInfoList( self ):
-      assert isinstance( self._completeString, str  )
-      assert isinstance( self._namedRegions,   dict )
-      assert isinstance( self._regionDefList,  list )
-
-      return iter( self._regionDefList )
+      """Iterate over the positions of the string:  regionInfo( ) of each."""
+      for index in range( len( self._completeString ) ):
+         yield self.regionInfo( index )
 
 
 class StructuredStringBuilder( object ):
+   """Builds a StructuredString.  The text is kept as a list of chunks and
+   joined once, so building is linear in the length of the string."""
    def __init__( self ):
-      # What we're constructing
-      self._str          = ''
-
       # Things to assist in the construction
       self._nextName     = 0
-      self._map          = { }     # map of id : <index into self._position>
 
       self._initialize( )
 
    def _initialize( self ):
-      assert isinstance( self._str,      str  )
-      assert isinstance( self._nextName, int  )
-      assert isinstance( self._map,      dict )
-
-      self._str          = ''
-      self._map          = { }
+      # What we're constructing
+      self._chunks       = [ ]     # the text, in pieces
+      self._length       = 0       # the total length of self._chunks
+      self._map          = { }     # map of name : StructuredStringRegion
 
    def beginRegion( self, name=None ):
       """Mark the beginning of a region.
@@ -196,17 +276,11 @@ class StructuredStringBuilder( object ):
       """
       assert isinstance( name,           str  ) or ( name is None )
 
-      assert isinstance( self._str,      str  )
-      assert isinstance( self._nextName, int  )
-      assert isinstance( self._map,      dict )
-
-      theCurrentPos = len(self._str)
-
       if name is None:
          name = str( self._nextName )
          self._nextName += 1
 
-      self._map[ name ] = StructuredStringRegion( '', [ -1, -1 ], [ theCurrentPos, -1 ] )
+      self._map[ name ] = StructuredStringRegion( '', [ -1, -1 ], [ self._length, -1 ] )
 
       return name
 
@@ -219,13 +293,7 @@ class StructuredStringBuilder( object ):
       """
       assert isinstance( name,           str  )
 
-      assert isinstance( self._str,      str  )
-      assert isinstance( self._nextName, int  )
-      assert isinstance( self._map,      dict )
-
-      theCurrentPos = len(self._str)
-
-      self._map[ name ].regionIndecies( )[ 1 ] = theCurrentPos
+      self._map[ name ].regionIndecies( )[ 1 ] = self._length
 
    def beginDominantMember( self, name ):
       """Mark the beginning of a region's dominant member.
@@ -236,13 +304,7 @@ class StructuredStringBuilder( object ):
       """
       assert isinstance( name,           str  )
 
-      assert isinstance( self._str,      str  )
-      assert isinstance( self._map,      dict )
-      assert isinstance( self._nextName, int  )
-
-      theCurrentPos = len(self._str)
-
-      self._map[ name ].dominantIndecies( )[ 0 ] = theCurrentPos
+      self._map[ name ].dominantIndecies( )[ 0 ] = self._length
 
    def endDominantMember( self, name ):
       """Mark the terminating point of the named region's dominant member.
@@ -253,15 +315,7 @@ class StructuredStringBuilder( object ):
       """
       assert isinstance( name,           str  )
 
-      assert isinstance( self._str,      str  )
-      assert isinstance( self._map,      dict )
-      assert isinstance( self._nextName, int  )
-
-      currentPos = len(self._str)
-
-      entry = self._map[ name ]
-      entry.dominantIndecies( )[1] = currentPos
-      entry._primaryString = self._str[ entry.dominantIndecies( )[0] : ]
+      self._map[ name ].dominantIndecies( )[ 1 ] = self._length
 
    def append( self, val ):
       """Append text to the end of the string being built & mapped.
@@ -272,11 +326,8 @@ class StructuredStringBuilder( object ):
       """
       assert isinstance( val,            str  )
 
-      assert isinstance( self._str,      str  )
-      assert isinstance( self._map,      dict )
-      assert isinstance( self._nextName, int  )
-
-      self._str += val
+      self._chunks.append( val )
+      self._length += len( val )
 
    def appendDominant( self, name, val ):
       """Append text to the end of the string being built & mapped, mark this the dominant member of the region named by 'name'.
@@ -288,13 +339,11 @@ class StructuredStringBuilder( object ):
       assert isinstance( name,           str  )
       assert isinstance( val,            str  )
 
-      assert isinstance( self._str,      str  )
-      assert isinstance( self._map,      dict )
-      assert isinstance( self._nextName, int  )
-
-      self.beginDominantMember( name )
-      self.append( val )
-      self.endDominantMember( name )
+      dominant = self._map[ name ].dominantIndecies( )
+      dominant[ 0 ] = self._length
+      self._chunks.append( val )
+      self._length += len( val )
+      dominant[ 1 ] = self._length
 
    def setClientData( self, name, clientData ):
       """Sets the client data for a named region.
@@ -305,29 +354,37 @@ class StructuredStringBuilder( object ):
       """
       assert isinstance( name,           str  )
 
-      assert isinstance( self._str,      str  )
-      assert isinstance( self._map,      dict )
-      assert isinstance( self._nextName, int  )
-
       self._map[ name ].setClientData( clientData )
 
+   def setPath( self, name, path ):
+      """Sets the path of the form of a named region.
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Modifies the map.
+      Preconditions: [AssertionError] name must be an str.
+                     [AssertionError] path must be a tuple of int.
+      """
+      assert isinstance( name,           str   )
+      assert isinstance( path,           tuple )
+
+      self._map[ name ].setPath( path )
+
    def peekString( self ):
       """Returns the string constructed so far.
       Category:      View.
-      Returns:       str.  Reference to the constructed string.
+      Returns:       str.  The constructed string.
       Side Effects:  None.
-      Preconditions: [AssertionError] name must be an str.
+      Preconditions: None.
       """
-      assert isinstance( self._str,      str  )
-      assert isinstance( self._map,      dict )
-      assert isinstance( self._nextName, int  )
-
-      return self._str
+      theString = ''.join( self._chunks )
+      self._chunks = [ theString ]
+      return theString
 
    def diag( self ):
+      theString = self.peekString( )
       for name, rgn in self._map.items():
-         primaryStr     = rgn._primaryString
          domIndecies    = rgn._dominantIndecies
+         primaryStr     = theString[ domIndecies[0] : domIndecies[1] ]
          regionIndecies = rgn._regionIndecies
          clientData     = rgn._clientData
          print( '''{0:5} : DOM: {1:10} /{2:5}/  -- RGN {3:10} /{4}/'''.format( name, domIndecies, primaryStr, regionIndecies, clientData ) )
@@ -340,24 +397,16 @@ class StructuredStringBuilder( object ):
       Preconditions: [Exception] The builder must be in a valid construction state...
                      e.g. all 'begins' must have corresponding ends, etc.
       """
-      # Validate the underlying data.
-      for name,regionDef in self._map.items():
-         regionDef.validate( self._str )
-
-      # Create the region info list to be parallel to the string
-      theCompleteString = self._str
-      theIndexMap       = self._map
-      theIndexInfoList  = [ None for x in range(len(self._str)) ]
+      theCompleteString = ''.join( self._chunks )
 
-      for name, regionDef in self._map.items():
-         dominantFirstIndex, dominantLastIndex = regionDef.dominantIndecies( )
-         for dominantIndex in range( dominantFirstIndex, dominantLastIndex ):
-            if theIndexInfoList[ dominantIndex ] is not None:    # Insure that no dominants overlap
-               raise InvalidRegionException( 'Dominants may not overlap.' )
-
-            theIndexInfoList[ dominantIndex ] = regionDef
+      # Complete and validate the regions.
+      for name,regionDef in self._map.items():
+         begin, end = regionDef.dominantIndecies( )
+         regionDef._completeString = theCompleteString
+         regionDef._primaryString  = theCompleteString[ begin : end ] if begin >= 0 else None
+         regionDef.validate( theCompleteString )
 
-      structuredString = StructuredString( self._str, self._map, theIndexInfoList )
+      structuredString = StructuredString( theCompleteString, self._map )
 
       self._initialize( )
 
@@ -384,7 +433,7 @@ if __name__ == "__main__":
    ms.endRegion( 'B' )                 #
    ms.endRegion( '^' )
 
-   ss = StructuredString( ms )
+   ss = ms.structuredString( )
    print( 'Done!' )
 
    #val = u'\u00ACA \u2227 B'
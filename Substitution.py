@@ -0,0 +1,266 @@
+"""This module implements Substitution, the persistent symbol-to-WFF mapping
+used when matching forms (mapTo) and instantiating them (makeInstance).
+"""
+
+from collections.abc import Mapping
+
+
+_BITS    = 5
+_WIDTH   = 1 << _BITS
+_MASK    = _WIDTH - 1
+_MISSING = object( )
+
+
+class _Leaf( object ):
+   """A single key/value entry of the trie."""
+   __slots__ = ( 'hash', 'key', 'value' )
+
+   def __init__( self, hashValue, key, value ):
+      self.hash  = hashValue
+      self.key   = key
+      self.value = value
+
+
+class _Collision( object ):
+   """Entries whose keys have identical hashes."""
+   __slots__ = ( 'hash', 'leaves' )
+
+   def __init__( self, hashValue, leaves ):
+      self.hash   = hashValue
+      self.leaves = leaves
+
+
+class _Branch( object ):
+   """An interior node.  'bitmap' has a bit set for each of the 32 slots
+   which is occupied; 'children' holds the occupied slots in order."""
+   __slots__ = ( 'bitmap', 'children' )
+
+   def __init__( self, bitmap, children ):
+      self.bitmap   = bitmap
+      self.children = children
+
+
+def _hashOf( key ):
+   return hash( key ) & 0xFFFFFFFFFFFFFFFF
+
+
+def _lookup( node, hashValue, key ):
+   shift = 0
+   while node is not None:
+      nodeClass = node.__class__
+      if nodeClass is _Branch:
+         bit = 1 << ( ( hashValue >> shift ) & _MASK )
+         if not ( node.bitmap & bit ):
+            return _MISSING
+         node   = node.children[ ( node.bitmap & ( bit - 1 ) ).bit_count( ) ]
+         shift += _BITS
+      elif nodeClass is _Leaf:
+         if ( node.key is key ) or ( node.key == key ):
+            return node.value
+         return _MISSING
+      else:
+         for leaf in node.leaves:
+            if leaf.key == key:
+               return leaf.value
+         return _MISSING
+
+   return _MISSING
+
+
+def _merge( nodeA, nodeB, shift ):
+   """Return a branch holding nodeA and nodeB, whose hashes differ."""
+   idxA = ( nodeA.hash >> shift ) & _MASK
+   idxB = ( nodeB.hash >> shift ) & _MASK
+   if idxA == idxB:
+      return _Branch( 1 << idxA, ( _merge( nodeA, nodeB, shift + _BITS ), ) )
+   elif idxA < idxB:
+      return _Branch( ( 1 << idxA ) | ( 1 << idxB ), ( nodeA, nodeB ) )
+   else:
+      return _Branch( ( 1 << idxA ) | ( 1 << idxB ), ( nodeB, nodeA ) )
+
+
+def _assoc( node, shift, hashValue, key, value ):
+   """Return ( newNode, added ) where newNode is node with key bound to value.
+   Only the nodes on the path to key are copied."""
+   if node is None:
+      return _Leaf( hashValue, key, value ), True
+
+   nodeClass = node.__class__
+   if nodeClass is _Branch:
+      bit = 1 << ( ( hashValue >> shift ) & _MASK )
+      pos = ( node.bitmap & ( bit - 1 ) ).bit_count( )
+      children = node.children
+      if node.bitmap & bit:
+         newChild, added = _assoc( children[ pos ], shift + _BITS, hashValue, key, value )
+         return _Branch( node.bitmap, children[ : pos ] + ( newChild, ) + children[ pos + 1 : ] ), added
+      else:
+         newLeaf = _Leaf( hashValue, key, value )
+         return _Branch( node.bitmap | bit, children[ : pos ] + ( newLeaf, ) + children[ pos : ] ), True
+
+   elif nodeClass is _Leaf:
+      if node.key == key:
+         return _Leaf( hashValue, key, value ), False
+      elif node.hash == hashValue:
+         return _Collision( hashValue, ( node, _Leaf( hashValue, key, value ) ) ), True
+      else:
+         return _merge( node, _Leaf( hashValue, key, value ), shift ), True
+
+   else:
+      if node.hash != hashValue:
+         return _merge( node, _Leaf( hashValue, key, value ), shift ), True
+
+      for idx, leaf in enumerate( node.leaves ):
+         if leaf.key == key:
+            leaves = node.leaves[ : idx ] + ( _Leaf( hashValue, key, value ), ) + node.leaves[ idx + 1 : ]
+            return _Collision( hashValue, leaves ), False
+
+      return _Collision( hashValue, node.leaves + ( _Leaf( hashValue, key, value ), ) ), True
+
+
+def _iterLeaves( node ):
+   if node is None:
+      return
+   nodeClass = node.__class__
+   if nodeClass is _Branch:
+      for child in node.children:
+         yield from _iterLeaves( child )
+   elif nodeClass is _Leaf:
+      yield node
+   else:
+      yield from node.leaves
+
+
+class Substitution( Mapping ):
+   """Immutable.
+   A persistent mapping from atom symbols (str) to WFFs.
+
+   Extending a Substitution returns a new Substitution and leaves the
+   original untouched; the two share all but the O(log n) trie nodes on the
+   path to the new entry.  This lets the matcher explore alternative
+   bindings without copying, and roll back simply by returning to an earlier
+   version (see rollback( )).
+
+   Substitution is a collections.abc.Mapping, so it supports len(), 'in',
+   iteration, items() and compares equal to a dict with the same entries.
+   """
+   __slots__ = ( '_root', '_size', '_parent' )
+
+   def __init__( self, aMapping=None ):
+      """Initialize a new instance of the class.
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Initializes an instance.
+      Preconditions: [AssertionError] aMapping must be a Mapping or None.
+      """
+      assert isinstance( aMapping, Mapping ) or ( aMapping is None )
+
+      self._root   = None
+      self._size   = 0
+      self._parent = None
+
+      if aMapping:
+         for key, value in aMapping.items( ):
+            self._root, added = _assoc( self._root, 0, _hashOf( key ), key, value )
+            if added:
+               self._size += 1
+
+   @staticmethod
+   def fromMapping( aMapping ):
+      """Return aMapping as a Substitution.
+      Category:      Pure Function.
+      Returns:       (Substitution) aMapping itself if it already is one.
+      Side Effects:  None.
+      Preconditions: [AssertionError] aMapping must be a Mapping or None.
+      """
+      if isinstance( aMapping, Substitution ):
+         return aMapping
+      elif not aMapping:
+         return Substitution.EMPTY
+      else:
+         return Substitution( aMapping )
+
+   # Standard Methods
+   def __getitem__( self, key ):
+      value = _lookup( self._root, _hashOf( key ), key )
+      if value is _MISSING:
+         raise KeyError( key )
+      return value
+
+   def __contains__( self, key ):
+      return _lookup( self._root, _hashOf( key ), key ) is not _MISSING
+
+   def __len__( self ):
+      return self._size
+
+   def __iter__( self ):
+      for leaf in _iterLeaves( self._root ):
+         yield leaf.key
+
+   def __repr__( self ):
+      return 'Substitution(%s)' % ( dict( self.items( ) ), )
+
+   def __str__( self ):
+      return str( dict( self.items( ) ) )
+
+   def __copy__( self ):
+      return self
+
+   def __deepcopy__( self, memoDict ):
+      return self
+
+   def __reduce__( self ):
+      return ( Substitution, ( dict( self.items( ) ), ) )
+
+   # Extension
+   def get( self, key, default=None ):
+      """Return the value bound to key, or default.
+      Category:      Pure Function.
+      Returns:       The bound value or default.
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      value = _lookup( self._root, _hashOf( key ), key )
+      if value is _MISSING:
+         return default
+      return value
+
+   def items( self ):
+      """Iterate over the ( key, value ) pairs."""
+      for leaf in _iterLeaves( self._root ):
+         yield leaf.key, leaf.value
+
+   def extend( self, key, value ):
+      """Return a new Substitution which also binds key to value.
+      Category:      Pure Function.
+      Returns:       (Substitution)  O(log n); this instance is unchanged.
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      newRoot, added = _assoc( self._root, 0, _hashOf( key ), key, value )
+
+      result = Substitution.__new__( Substitution )
+      result._root   = newRoot
+      result._size   = self._size + 1 if added else self._size
+      result._parent = self
+      return result
+
+   def rollback( self ):
+      """Return the Substitution this one was extended from.
+      Category:      Pure Function.
+      Returns:       (Substitution) or None if this was not made by extend( ).
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      return self._parent
+
+   def asDict( self ):
+      """Return the entries as a new dict.
+      Category:      Pure Function.
+      Returns:       (dict)
+      Side Effects:  None.
+      Preconditions: None.
+      """
+      return dict( self.items( ) )
+
+
+Substitution.EMPTY = Substitution( )
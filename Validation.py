@@ -0,0 +1,138 @@
+"""This module defines the validation boundary of the library.
+
+Arguments are checked once, where they enter the library:
+
+   Language      parseProp( ), parseSeq( )
+   Form          mapTo( ), makeInstance( ), atomList( ), FormSet( ),
+                 FormSet.append( ), FormSet item assignment,
+                 FormSet.iterMappings( ),
+                 WFF.subWFFAt( ), WFF.replaceAt( ), WFF.pathsOf( ),
+                 Sequent( ), Sequent.mapPremisesTo( ), Sequent.applyTo( ),
+                 Sequent.makeConclusionSetInstance( ), and the creation of a
+                 new wff by AtomicWFF( ) or StructuredWFF( )
+   Calculus      InferenceRule( ), InferenceRule.applyTo( ),
+                 InferenceRule.isApplicableTo( ), Calculus( ),
+                 Calculus.applyInference( ), Calculus.applicableRules( ),
+                 Calculus.equivalenceRewrites( ),
+                 Calculus.isEquivalenceRewrite( )
+   NormalForm    NormalForm( ), operatorRole( ), nnf( ), cnf( ), dnf( ),
+                 clauses( ), definitionalCNF( ), isNNF( ), isCNF( ), isDNF( )
+   Proof         addStep( ), buildPremiseSet( ), truncateTo( ), and step
+                 access by proof[ stepNum ]
+
+Everything these call runs without checks:  the recursion of _mapTo( ) and
+_makeInstance( ), atom lists, form set reads and the bookkeeping of Proof
+and Env trust their arguments, and the types of an object's own attributes
+are never re-checked.  The docstrings of those methods mark their
+preconditions 'Unchecked' rather than naming an exception.
+
+The checks are not assert statements, so they are made with or without
+python -O.  A failed check raises ValidationError, a kind of AssertionError,
+as the '[AssertionError]' preconditions of the entry points promise.
+
+Strict mode also checks the contents of the arguments:  that every value of a
+mapping is a wff, every citation an int or a pair of ints, and so on.  It is
+meant for development and testing.  Turn it on with setStrict( True ) or by
+setting the environment variable ARISTOTLE_STRICT to 1.
+"""
+
+import os
+
+from Substitution import Substitution
+
+
+class ValidationError( AssertionError ):
+   """An argument passed to an entry point of the library is invalid."""
+
+
+_strict = os.environ.get( 'ARISTOTLE_STRICT', '' ) not in ( '', '0' )
+
+
+def isStrict( ):
+   """Returns True if strict validation is on.
+   Category:      Pure Function.
+   Returns:       (bool)
+   Side Effects:  None.
+   Preconditions: None.
+   """
+   return _strict
+
+
+def setStrict( strict ):
+   """Turn strict validation on or off.
+   Category:      Mutator.
+   Returns:       (bool) The previous setting.
+   Side Effects:  Changes the validation of every entry point.
+   Preconditions: [ValidationError] 'strict' must be a bool.
+   """
+   global _strict
+
+   requireType( strict, bool, 'strict' )
+
+   previous = _strict
+   _strict  = strict
+   return previous
+
+
+def require( condition, message ):
+   """Check a condition.
+   Category:      Pure Function.
+   Returns:       Nothing.
+   Side Effects:  None.
+   Preconditions: [ValidationError] 'condition' must be true; 'message'
+                     describes the failure.
+   """
+   if not condition:
+      raise ValidationError( message )
+
+
+def requireType( value, types, name ):
+   """Check the type of an argument.
+   Category:      Pure Function.
+   Returns:       Nothing.
+   Side Effects:  None.
+   Preconditions: [ValidationError] 'value' must be an instance of 'types'
+                     (a type or tuple of types, which may include
+                     type( None )).  'name' is the argument's name.
+   """
+   if not isinstance( value, types ):
+      raise ValidationError( "'{0}' must be {1}, not {2}.".format( name, _typeNames( types ), type( value ).__name__ ) )
+
+
+def requireMapping( value, name, optional=True ):
+   """Check a symbol mapping argument:  a dict or Substitution (or None if
+   optional).  In strict mode its keys must be str and its values wffs.
+   Category:      Pure Function.
+   Returns:       Nothing.
+   Side Effects:  None.
+   Preconditions: [ValidationError] See above.
+   """
+   if ( value is None ) and optional:
+      return
+
+   requireType( value, ( dict, Substitution ), name )
+
+   if _strict:
+      from Form import WFF
+      for symbol, wff in value.items( ):
+         require( isinstance( symbol, str ) and isinstance( wff, WFF ),
+                  "'{0}' must map symbols to wffs; {1!r} maps to {2!r}.".format( name, symbol, wff ) )
+
+
+def requireMembers( values, types, name ):
+   """In strict mode, check the type of every member of a collection argument.
+   Category:      Pure Function.
+   Returns:       Nothing.
+   Side Effects:  None.
+   Preconditions: [ValidationError] Each member of 'values' must be an
+                     instance of 'types'.
+   """
+   if _strict:
+      for index, value in enumerate( values ):
+         requireType( value, types, '{0}[{1}]'.format( name, index ) )
+
+
+def _typeNames( types ):
+   if not isinstance( types, tuple ):
+      types = ( types, )
+   return ' or '.join( 'None' if aType is type( None ) else aType.__name__ for aType in types )
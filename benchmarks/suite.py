@@ -0,0 +1,430 @@
+"""Benchmark suite for parsing, matching, instantiation and proof checking.
+
+For each logic (Gentzen, Gensler and Fitch) random wffs and sequents of a
+given depth and number of atoms are generated from a seed, in the logic's own
+notation, and these workloads are timed:
+
+   parseSeq           Language.parseSeq( ) of sequent texts, parse cache cleared
+   mapTo              Form.mapTo( ) of patterns onto instances (half of them
+                      substitution instances, half not)
+   mapSets            FormSet._mapSets( ) of sets of patterns onto shuffled
+                      sets of their instances
+   makeInstance       makeInstance( ) of patterns under a mapping
+   structuredString   structuredString( ) of wffs
+   structuredSequent  structuredString( ) of sequents
+   rewrites           Calculus.equivalenceRewrites( ) of wffs, every
+                      equivalence theorem at every position
+   normalForm         NormalForm.cnf( ) and clauses( ) of wffs, conversion
+                      cache cleared
+   proofReplay        ProofChecker.check( ) of random proofs, built forward by
+                      applying the logic's rules
+
+Every workload is run 'repeat' times; the best and median time per operation
+are reported, in microseconds.  The same seed, depth and atom count generate
+the same workloads, so results taken at different commits are comparable.
+
+Results are written as JSON, to stdout or to --output.  With --compare, the
+results are also compared, workload by workload, to an earlier JSON result
+and every ratio above --threshold is reported as a regression.
+
+Usage:  python benchmarks/suite.py [--seed n] [--depth n] [--atoms n]
+                                   [--repeat n] [--logic name]...
+                                   [--output file] [--compare file]
+                                   [--threshold ratio]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+sys.path.insert( 0, ROOT )
+
+import Logic
+from Form import WFF, AtomicWFF, StructuredWFF, FormSet
+from NormalForm import NormalForm
+from Proof import Proof
+from ProofChecker import ProofChecker, proofRecord
+from Substitution import Substitution
+
+
+FORMAT_VERSION = 1
+
+PATTERN_ATOMS  = [ 'P', 'Q', 'R' ]
+PATTERN_DEPTH  = 2
+
+
+class FormGenerator( object ):
+   """Generates random wffs and sequents in the notation of a logic."""
+   def __init__( self, language, seed, atomCount ):
+      """Initialize a new instance of the class.
+      Category:      Mutator.
+      Returns:       Nothing.
+      Side Effects:  Initializes an instance.
+      Preconditions: [AssertionError] 'language' must be a Language.
+                     [AssertionError] 'seed' any value accepted by random.Random.
+                     [AssertionError] 'atomCount' the number of distinct atoms
+                        the generated wffs draw on (at least 1).
+      """
+      assert isinstance( atomCount, int ) and ( atomCount > 0 )
+
+      self._random   = random.Random( seed )
+      self._atoms    = [ 'A{0}'.format( index ) for index in range( atomCount ) ]
+      self._unary    = [ ]
+      self._binary   = [ ]
+
+      # Only the truth-functional operators; the modal ones have no rules.
+      for lex in language.lexemes( ):
+         if lex.truth is None:
+            continue
+         if len( lex.truth ) == 2:
+            self._unary.append( lex.symbol[ 0 ] )
+         elif len( lex.truth ) == 4:
+            self._binary.append( lex.symbol[ 0 ] )
+
+   def random( self ):
+      """Returns the generator's random.Random, for choices consistent with
+      its seed."""
+      return self._random
+
+   def wff( self, depth, atoms=None ):
+      """Generate a random wff.
+      Category:      Mutator.
+      Returns:       (WFF) A wff whose operator nesting is exactly 'depth'
+                     deep, over 'atoms' (default, the generator's atoms).
+      Side Effects:  Advances the random state.
+      Preconditions: [AssertionError] 'depth' must be an int >= 0.
+      """
+      if atoms is None:
+         atoms = self._atoms
+
+      if depth == 0:
+         return AtomicWFF( self._random.choice( atoms ) )
+
+      # One in four operators is a negation.
+      if self._random.random( ) < 0.25:
+         return StructuredWFF( self._random.choice( self._unary ), self.wff( depth - 1, atoms ) )
+
+      # One operand (at random) carries the full depth; the other may be shallower.
+      deep    = self.wff( depth - 1, atoms )
+      shallow = self.wff( self._random.randint( 0, depth - 1 ), atoms )
+      if self._random.random( ) < 0.5:
+         deep, shallow = shallow, deep
+      return StructuredWFF( self._random.choice( self._binary ), deep, shallow )
+
+   def mapping( self, symbols, depth ):
+      """Generate a random mapping of each symbol to a wff of 'depth'.
+      Category:      Mutator.
+      Returns:       (dict) str : WFF
+      Side Effects:  Advances the random state.
+      Preconditions: None.
+      """
+      return { symbol : self.wff( depth ) for symbol in symbols }
+
+   def sequentText( self, numPremises, numConclusions, depth ):
+      """Generate the text of a random sequent of wffs of 'depth'.
+      Category:      Mutator.
+      Returns:       (str)
+      Side Effects:  Advances the random state.
+      Preconditions: None.
+      """
+      premises    = [ str( self.wff( depth ) ) for index in range( numPremises    ) ]
+      conclusions = [ str( self.wff( depth ) ) for index in range( numConclusions ) ]
+      return '{0}  |-  {1}'.format( ', '.join( premises ), ', '.join( conclusions ) )
+
+
+def _formSet( forms ):
+   # Built by append, which keeps the given order.
+   result = FormSet( )
+   for form in forms:
+      result.append( form )
+   return result
+
+
+def _premiseRules( calculus ):
+   """Returns the rules with premises, all of whose forms are wffs."""
+   rules = [ ]
+   for rule in calculus.ruleList( ):
+      forms = list( rule.sequent.premiseFormSet( ) ) + list( rule.sequent.conclusionFormSet( ) )
+      if ( len( rule.sequent.premiseFormSet( ) ) > 0 ) and all( isinstance( form, WFF ) for form in forms ):
+         rules.append( rule )
+   return rules
+
+
+def randomProof( logic, generator, numInferences, depth ):
+   """Build a random valid proof by applying randomly chosen rules forward.
+   Each rule's atoms are mapped to random wffs or, as often as not, to wffs
+   already in the proof, so later steps build on earlier ones.  The premises
+   of each application are cited where the proof has them and otherwise
+   added as premises of the sequent.
+   Category:      Mutator.
+   Returns:       (tuple) ( sequent text, Proof ) where the proof derives
+                  every conclusion of the sequent.
+   Side Effects:  Advances the generator's random state.
+   Preconditions: None.
+   """
+   calculus    = logic.calculus( )
+   rules       = _premiseRules( calculus )
+   premiseRule = calculus.premiseAssertionRule( )
+   premiseVar  = premiseRule.sequent.conclusionAdditions( )[ 0 ]
+   rand        = generator.random( )
+
+   proof       = Proof( )
+   stepNums    = { }            # wff : step number
+   premises    = [ ]
+   conclusions = [ ]
+
+   while len( conclusions ) < numInferences:
+      rule    = rand.choice( rules )
+      mapping = { }
+      for symbol in rule.sequent.atomList( ):
+         if stepNums and ( rand.random( ) < 0.5 ):
+            mapping[ symbol ] = rand.choice( list( stepNums ) )
+         else:
+            mapping[ symbol ] = generator.wff( rand.randint( 0, depth ) )
+
+      premiseWFFs = [ form.makeInstance( mapping ) for form in rule.sequent.premiseFormSet( ) ]
+      if len( set( premiseWFFs ) ) != len( premiseWFFs ):
+         continue
+
+      for premise in premiseWFFs:
+         if premise not in stepNums:
+            proof.addStep( premise, [ ], premiseRule, { premiseVar : premise }, 0 )
+            stepNums[ premise ] = len( proof )
+            premises.append( premise )
+
+      conclusionIndex = rand.randrange( len( rule.sequent.conclusionFormSet( ) ) )
+      conclusion      = rule.sequent.conclusionFormSet( )[ conclusionIndex ].makeInstance( mapping )
+      if conclusion in stepNums:
+         continue
+
+      proof.addStep( conclusion, [ stepNums[ premise ] for premise in premiseWFFs ], rule, mapping, conclusionIndex )
+      stepNums[ conclusion ] = len( proof )
+      conclusions.append( conclusion )
+
+   text = '{0}  |-  {1}'.format( ', '.join( str( form ) for form in premises ), ', '.join( str( form ) for form in conclusions ) )
+   return text, proof
+
+
+def workloads( logic, seed, depth, atomCount, size=100 ):
+   """Build the workloads of a logic.
+   Category:      Pure Function.
+   Returns:       (list) of ( name, function, operations ):  calling
+                  function( ) performs 'operations' operations.
+   Side Effects:  None.
+   Preconditions: None.
+   """
+   language  = logic.language( )
+   generator = FormGenerator( language, '{0}/{1}'.format( seed, logic.name( ) ), atomCount )
+   rand      = generator.random( )
+
+   # Sequent texts
+   texts = [ generator.sequentText( rand.randint( 1, 3 ), rand.randint( 1, 2 ), depth ) for index in range( size ) ]
+
+   def parseSequents( ):
+      language.invalidateParseCache( )
+      for text in texts:
+         language.parseSeq( text )
+
+   # Patterns, in the manner of rule forms, and their instances
+   patterns  = [ generator.wff( rand.randint( 1, PATTERN_DEPTH ), PATTERN_ATOMS ) for index in range( size ) ]
+   mappings  = [ generator.mapping( PATTERN_ATOMS, max( depth - PATTERN_DEPTH, 0 ) ) for index in range( size ) ]
+   instances = [ pattern.makeInstance( mapping ) for pattern, mapping in zip( patterns, mappings ) ]
+   others    = instances[ 1: ] + instances[ :1 ]
+   pairs     = [ ( pattern, instance ) for pattern, instance in zip( patterns[ : size // 2 ], instances ) ]
+   pairs    += [ ( pattern, other    ) for pattern, other    in zip( patterns[ size // 2 : ], others[ size // 2 : ] ) ]
+
+   def matchForms( ):
+      for pattern, instance in pairs:
+         pattern.mapTo( instance )
+
+   # Sets of three patterns onto their instances, shuffled
+   setPairs = [ ]
+   for index in range( size ):
+      members   = rand.sample( range( size ), 3 )
+      mapping   = generator.mapping( PATTERN_ATOMS, max( depth - PATTERN_DEPTH, 0 ) )
+      instList  = [ patterns[ member ].makeInstance( mapping ) for member in members ]
+      rand.shuffle( instList )
+      setPairs.append( ( _formSet( [ patterns[ member ] for member in members ] ), _formSet( instList ) ) )
+
+   def matchSets( ):
+      for patternSet, instanceSet in setPairs:
+         FormSet._mapSets( patternSet._set, instanceSet._set, Substitution.EMPTY )
+
+   def instantiateForms( ):
+      for pattern, mapping in zip( patterns, mappings ):
+         pattern.makeInstance( mapping )
+
+   # Wffs and sequents to display
+   displayForms    = [ generator.wff( depth ) for index in range( size ) ]
+   displaySequents = [ language.parseSeq( text ) for text in texts ]
+
+   def buildStructuredStrings( ):
+      for form in displayForms:
+         form.structuredString( )
+
+   def buildSequentStructuredStrings( ):
+      for sequent in displaySequents:
+         sequent.structuredString( )
+
+   calculus = logic.calculus( )
+
+   def enumerateRewrites( ):
+      for form in displayForms:
+         calculus.equivalenceRewrites( form )
+
+   normalForm = NormalForm( language )
+
+   def convertNormalForms( ):
+      normalForm.invalidateCache( )
+      for form in displayForms:
+         normalForm.cnf( form )
+         normalForm.clauses( form )
+
+   # Proofs
+   checker = ProofChecker( logic )
+   records = [ ]
+   for index in range( max( size // 10, 1 ) ):
+      text, proof = randomProof( logic, generator, 10, max( depth - PATTERN_DEPTH, 0 ) )
+      records.append( proofRecord( logic, proof, language.parseSeq( text ) ) )
+   for record in records:
+      verdict = checker.check( record )
+      if not ( verdict.isValid( ) and verdict.complete ):
+         raise Exception( 'Generated proof does not check: {0!r}'.format( verdict ) )
+
+   def replayProofs( ):
+      language.invalidateParseCache( )
+      for record in records:
+         checker.check( record )
+
+   return [ ( 'parseSeq',          parseSequents,                 len( texts )           ),
+            ( 'mapTo',             matchForms,                    len( pairs )           ),
+            ( 'mapSets',           matchSets,                     len( setPairs )        ),
+            ( 'makeInstance',      instantiateForms,              len( patterns )        ),
+            ( 'structuredString',  buildStructuredStrings,        len( displayForms )    ),
+            ( 'structuredSequent', buildSequentStructuredStrings, len( displaySequents ) ),
+            ( 'rewrites',          enumerateRewrites,             len( displayForms )    ),
+            ( 'normalForm',        convertNormalForms,            len( displayForms )    ),
+            ( 'proofReplay',       replayProofs,                  len( records )         ) ]
+
+
+def measure( function, operations, repeat ):
+   """Time a workload.
+   Category:      Pure Function.
+   Returns:       (dict) The best and median time per operation, in
+                  microseconds, and the operations per run.
+   Side Effects:  Runs the workload 'repeat' times.
+   Preconditions: None.
+   """
+   times = [ ]
+   for index in range( repeat ):
+      start = time.perf_counter( )
+      function( )
+      times.append( time.perf_counter( ) - start )
+
+   times.sort( )
+   perOp = 1e6 / max( operations, 1 )
+   return { 'operations' : operations,
+            'best'       : round( times[ 0 ] * perOp, 3 ),
+            'median'     : round( times[ len( times ) // 2 ] * perOp, 3 ) }
+
+
+def gitRevision( ):
+   """Returns the commit of the checkout being measured, or None."""
+   try:
+      return subprocess.check_output( [ 'git', 'rev-parse', 'HEAD' ], cwd=ROOT, stderr=subprocess.DEVNULL,
+                                      universal_newlines=True ).strip( )
+   except ( OSError, subprocess.CalledProcessError ):
+      return None
+
+
+def run( logicNames, seed, depth, atomCount, repeat ):
+   """Run the suite.
+   Category:      Pure Function.
+   Returns:       (dict) The results, as written to JSON.
+   Side Effects:  None.
+   Preconditions: [KeyError] Each name in 'logicNames' must be in Logic.Logics.
+   """
+   results = { }
+   for name in logicNames:
+      logic = Logic.Logics[ name ]
+      results[ name ] = { }
+      for workload, function, operations in workloads( logic, seed, depth, atomCount ):
+         function( )                    # Warm up:  compiled matchers, interned wffs.
+         results[ name ][ workload ] = measure( function, operations, repeat )
+
+   return { 'format'   : FORMAT_VERSION,
+            'revision' : gitRevision( ),
+            'python'   : platform.python_version( ),
+            'platform' : platform.platform( ),
+            'time'     : time.strftime( '%Y-%m-%dT%H:%M:%S' ),
+            'params'   : { 'seed' : seed, 'depth' : depth, 'atoms' : atomCount, 'repeat' : repeat },
+            'results'  : results }
+
+
+def compare( baseline, current, threshold ):
+   """Print the ratio of each current time to the baseline's.
+   Category:      Pure Function.
+   Returns:       (list) of ( logic, workload, ratio ) with ratio above
+                  'threshold'.
+   Side Effects:  Prints a table to stdout.
+   Preconditions: None.
+   """
+   if baseline.get( 'params' ) != current.get( 'params' ):
+      print( 'Warning: the parameters differ from the baseline\'s; the workloads are not the same.' )
+
+   regressions = [ ]
+   print( '{0:<10}{1:<18}{2:>12}{3:>12}{4:>9}'.format( 'logic', 'workload', 'base us', 'us', 'ratio' ) )
+   for logicName, workloads in current[ 'results' ].items( ):
+      for workload, result in workloads.items( ):
+         base = baseline[ 'results' ].get( logicName, { } ).get( workload )
+         if ( base is None ) or ( base[ 'best' ] == 0 ):
+            continue
+         ratio = result[ 'best' ] / base[ 'best' ]
+         flag  = '  <--' if ratio > threshold else ''
+         print( '{0:<10}{1:<18}{2:>12.2f}{3:>12.2f}{4:>9.2f}{5}'.format( logicName, workload, base[ 'best' ], result[ 'best' ], ratio, flag ) )
+         if ratio > threshold:
+            regressions.append( ( logicName, workload, ratio ) )
+
+   return regressions
+
+
+def main( args ):
+   parser = argparse.ArgumentParser( description='Benchmark parsing, matching, instantiation and proof checking.' )
+   parser.add_argument( '--seed',      type=int,   default=1 )
+   parser.add_argument( '--depth',     type=int,   default=4,   help='operator depth of the generated wffs' )
+   parser.add_argument( '--atoms',     type=int,   default=4,   help='number of distinct atoms in the generated wffs' )
+   parser.add_argument( '--repeat',    type=int,   default=7 )
+   parser.add_argument( '--logic',     action='append', choices=sorted( Logic.Logics ), help='default: every logic' )
+   parser.add_argument( '--output',    help='write the JSON results to this file instead of stdout' )
+   parser.add_argument( '--compare',   help='a JSON result to compare against' )
+   parser.add_argument( '--threshold', type=float, default=1.10, help='ratio over the baseline reported as a regression' )
+   options = parser.parse_args( args )
+
+   logicNames = options.logic or [ 'Gentzen', 'Gensler', 'Fitch' ]
+   results    = run( logicNames, options.seed, options.depth, options.atoms, options.repeat )
+
+   if options.output is not None:
+      with open( options.output, 'w' ) as outFile:
+         json.dump( results, outFile, indent=2, sort_keys=True )
+   elif options.compare is None:
+      json.dump( results, sys.stdout, indent=2, sort_keys=True )
+      print( )
+
+   if options.compare is not None:
+      with open( options.compare ) as inFile:
+         baseline = json.load( inFile )
+      if compare( baseline, results, options.threshold ):
+         return 1
+
+   return 0
+
+
+if __name__ == '__main__':
+   sys.exit( main( sys.argv[ 1: ] ) )
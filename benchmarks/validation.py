@@ -0,0 +1,121 @@
+"""Benchmark of the validation modes (see Validation).
+
+Times the hot paths of matching and instantiating forms, applying rules and
+building proofs in three configurations, each in a fresh interpreter:
+
+   default     entry points validated, internals unchecked
+   strict      entry points also validate the contents of their arguments
+   python -O   assert statements stripped
+
+Since the internals carry no assertions, default and python -O should take
+the same time; strict shows the cost of the deeper entry-point checks.
+
+With --against, the workloads are also timed, without and with python -O,
+on another checkout of the library (e.g. a git worktree of an earlier
+revision), for comparison.
+
+Usage:  python benchmarks/validation.py [--against checkout] [repeat]
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+
+
+def workloads( ):
+   """Returns a list of ( name, function ) to time."""
+   import Logic
+   from Form import FormSet
+   from Proof import Proof
+
+   logic    = Logic.Gentzen
+   language = logic.language( )
+   calculus = logic.calculus( )
+
+   pattern  = language.parseProp( '((P > Q) & (Q > R)) > (~R > ~P)' )
+   instance = language.parseProp( '(((A v B) > ~C) & (~C > (D & E))) > (~(D & E) > ~(A v B))' )
+   mapping  = pattern.mapTo( instance )
+
+   premises = FormSet( )
+   premises.append( language.parseProp( '(A & B) > ~C' ) )
+   premises.append( language.parseProp( 'A & B' ) )
+
+   given    = calculus.rule( 'Given' )
+   steps    = [ language.parseProp( text ) for text in ( 'A > B', 'B > C', 'A', 'B', 'C' ) ]
+
+   def matchForms( ):
+      for index in range( 2000 ):
+         pattern.mapTo( instance )
+
+   def instantiateForms( ):
+      for index in range( 2000 ):
+         pattern.makeInstance( mapping )
+
+   def applyRules( ):
+      for index in range( 2000 ):
+         calculus.applyInference( 'MP', premises )
+
+   def buildProofs( ):
+      for index in range( 200 ):
+         proof = Proof( )
+         for step in steps:
+            proof.addStep( step, [ ], given, { 'P' : step }, 0 )
+         proof.buildPremiseSet( [ 1, 2 ] )
+
+   return [ ( 'mapTo',          matchForms       ),
+            ( 'makeInstance',   instantiateForms ),
+            ( 'applyInference', applyRules       ),
+            ( 'addStep',        buildProofs      ) ]
+
+
+def measure( repeat, root ):
+   """Print the best time of each workload, in ms, one per line."""
+   sys.path.insert( 0, root )
+
+   for name, function in workloads( ):
+      best = None
+      for index in range( repeat ):
+         start   = time.perf_counter( )
+         function( )
+         elapsed = time.perf_counter( ) - start
+         best    = elapsed if best is None else min( best, elapsed )
+      print( '{0} {1:.3f}'.format( name, best * 1000.0 ) )
+
+
+def main( args ):
+   against = None
+   if ( len( args ) > 1 ) and ( args[ 0 ] == '--against' ):
+      against = os.path.abspath( args[ 1 ] )
+      args    = args[ 2: ]
+   repeat = int( args[ 0 ] ) if len( args ) > 0 else 5
+
+   configurations = [ ( 'default',   [ ],       { 'ARISTOTLE_STRICT' : '0' }, ROOT ),
+                      ( 'strict',    [ ],       { 'ARISTOTLE_STRICT' : '1' }, ROOT ),
+                      ( 'python -O', [ '-O' ],  { 'ARISTOTLE_STRICT' : '0' }, ROOT ) ]
+   if against is not None:
+      configurations.append( ( 'other',    [ ],      { }, against ) )
+      configurations.append( ( 'other -O', [ '-O' ], { }, against ) )
+
+   results = { }
+   for label, flags, env, root in configurations:
+      output = subprocess.check_output( [ sys.executable ] + flags + [ __file__, '--measure', str( repeat ), root ],
+                                        env=dict( os.environ, **env ), universal_newlines=True )
+      for line in output.splitlines( ):
+         name, ms = line.split( )
+         results.setdefault( name, { } )[ label ] = float( ms )
+
+   labels = [ label for label, flags, env, root in configurations ]
+   print( '{0:<16}'.format( 'ms (best of {0})'.format( repeat ) ) + ''.join( '{0:>12}'.format( label ) for label in labels ) )
+   for name, times in results.items( ):
+      print( '{0:<16}'.format( name ) + ''.join( '{0:>12.2f}'.format( times[ label ] ) for label in labels ) )
+
+
+if __name__ == '__main__':
+   if ( len( sys.argv ) > 3 ) and ( sys.argv[ 1 ] == '--measure' ):
+      measure( int( sys.argv[ 2 ] ), sys.argv[ 3 ] )
+   else:
+      main( sys.argv[ 1: ] )